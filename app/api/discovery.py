@@ -125,17 +125,19 @@ async def manual_discover(request: ManualDiscoveryRequest, db: AsyncSession = De
             vendor = "unknown"
             
             try:
-                from pysnmp.hlapi.asyncio import (
-                    getCmd, SnmpEngine, CommunityData, 
-                    UdpTransportTarget, ContextData, ObjectType, ObjectIdentity
+                from pysnmp.hlapi.asyncio import getCmd, ObjectType, ObjectIdentity
+                from app.core.snmp_engine_pool import SnmpCredentials, get_engine_pool
+                
+                engine, auth_data, target, context = get_engine_pool().acquire(
+                    ip, SnmpCredentials(community=community), timeout=5.0, retries=1
                 )
                 
                 # Get sysName
                 errorIndication, errorStatus, errorIndex, varBinds = await getCmd(
-                    SnmpEngine(),
-                    CommunityData(community),
-                    UdpTransportTarget((ip, 161), timeout=5.0, retries=1),
-                    ContextData(),
+                    engine,
+                    auth_data,
+                    target,
+                    context,
                     ObjectType(ObjectIdentity('1.3.6.1.2.1.1.5.0')),  # sysName
                     ObjectType(ObjectIdentity('1.3.6.1.2.1.1.1.0'))   # sysDescr
                 )
@@ -162,17 +164,19 @@ async def manual_discover(request: ManualDiscoveryRequest, db: AsyncSession = De
             neighbors = []
             
             try:
-                from pysnmp.hlapi.asyncio import (
-                    bulkCmd, SnmpEngine, CommunityData, 
-                    UdpTransportTarget, ContextData, ObjectType, ObjectIdentity
+                from pysnmp.hlapi.asyncio import bulkCmd, ObjectType, ObjectIdentity
+                from app.core.snmp_engine_pool import SnmpCredentials, get_engine_pool
+                
+                engine, auth_data, target, context = get_engine_pool().acquire(
+                    ip, SnmpCredentials(community=community), timeout=5.0, retries=1
                 )
                 
                 # Walk LLDP remote system names
                 iterator = bulkCmd(
-                    SnmpEngine(),
-                    CommunityData(community),
-                    UdpTransportTarget((ip, 161), timeout=5.0, retries=1),
-                    ContextData(),
+                    engine,
+                    auth_data,
+                    target,
+                    context,
                     0, 25,
                     ObjectType(ObjectIdentity(LLDP_REM_SYS_NAME)),
                     lexicographicMode=False
@@ -0,0 +1,230 @@
+"""
+Metrics API endpoints - history of device, link and port metrics
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+import numpy as np
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, and_
+
+from app.db.database import get_db
+from app.models.device import Device
+from app.models.link import MergedLink
+from app.models.group import DeviceGroup, DeviceGroupMember
+from app.core.timeseries import (
+    get_timeseries_store, lttb, interface_series, link_series, device_series
+)
+from app.schemas.metrics import MetricSeries, MetricsResponse, MetricsQuery
+
+router = APIRouter()
+
+DEVICE_METRICS = {"cpu": ("CPU", "%"), "memory": ("Memory", "%")}
+
+# (name, label, unit) of each series a response should hold
+SeriesSpec = Tuple[str, Optional[str], Optional[str]]
+
+
+def _epoch(value: datetime) -> float:
+    """Epoch seconds, naive datetimes are UTC like the rest of the API"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def _time_range(start: Optional[datetime], end: Optional[datetime]) -> Tuple[float, float]:
+    """Resolve the requested range, the last 24 hours by default"""
+    end_ts = _epoch(end) if end else datetime.now(timezone.utc).timestamp()
+    start_ts = _epoch(start) if start else end_ts - timedelta(hours=24).total_seconds()
+    if start_ts >= end_ts:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    return start_ts, end_ts
+
+
+def _parse_metrics(metrics: str) -> List[str]:
+    names = [m.strip() for m in metrics.split(",") if m.strip()]
+    unknown = [m for m in names if m not in DEVICE_METRICS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown metrics: {', '.join(unknown)}")
+    return names
+
+
+def _read(specs: List[SeriesSpec], start: float, end: float, points: int, aggregate: str) -> MetricsResponse:
+    """Query the coarsest resolution giving at least points samples and LTTB each series down to points"""
+    store = get_timeseries_store()
+    resolution = store.pick_resolution(start, end, points)
+    data = store.query([name for name, _, _ in specs], start, end, resolution)
+    source = data.maxima if aggregate == "max" else data.values
+    
+    series = []
+    for name, label, unit in specs:
+        values = source.get(name)
+        if values is None:
+            timestamps, samples = np.empty(0), np.empty(0)
+        else:
+            present = ~np.isnan(values)
+            timestamps, samples = lttb(
+                data.timestamps[present], values[present].astype(np.float64), points
+            )
+        series.append(MetricSeries(
+            name=name,
+            label=label,
+            unit=unit,
+            timestamps=timestamps.tolist(),
+            values=np.round(samples, 3).tolist()
+        ))
+    
+    return MetricsResponse(
+        start=datetime.fromtimestamp(start, tz=timezone.utc),
+        end=datetime.fromtimestamp(end, tz=timezone.utc),
+        resolution=data.resolution,
+        step=data.step,
+        series=series
+    )
+
+
+async def _respond(
+    specs: List[SeriesSpec],
+    start: Optional[datetime],
+    end: Optional[datetime],
+    points: int,
+    aggregate: str
+) -> MetricsResponse:
+    """Run the file-backed query off the event loop"""
+    start_ts, end_ts = _time_range(start, end)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, _read, specs, start_ts, end_ts, points, aggregate)
+
+
+def _device_specs(device: Device, metrics: List[str]) -> List[SeriesSpec]:
+    return [
+        (device_series(device.id, metric), f"{device.hostname} {DEVICE_METRICS[metric][0]}", DEVICE_METRICS[metric][1])
+        for metric in metrics
+    ]
+
+
+def _link_specs(link: MergedLink, label: str) -> List[SeriesSpec]:
+    return [
+        (link_series(link.device_a_id, link.device_b_id, "util_in"), f"{label} in", "%"),
+        (link_series(link.device_a_id, link.device_b_id, "util_out"), f"{label} out", "%")
+    ]
+
+
+def _port_specs(device_id: int, if_index: int, label: str) -> List[SeriesSpec]:
+    return [
+        (interface_series(device_id, if_index, "in_bps"), f"{label} in", "bps"),
+        (interface_series(device_id, if_index, "out_bps"), f"{label} out", "bps")
+    ]
+
+
+@router.get("/devices/{device_id}", response_model=MetricsResponse)
+async def get_device_metrics(
+    device_id: int,
+    metrics: str = Query("cpu,memory", description="Comma-separated: cpu, memory"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    points: int = Query(1000, ge=10, le=10000),
+    aggregate: str = Query("avg", pattern="^(avg|max)$"),
+    db: AsyncSession = Depends(get_db)
+):
+    """CPU/memory history of a device"""
+    device = await db.get(Device, device_id)
+    if not device:
+        raise HTTPException(status_code=404, detail="Device not found")
+    return await _respond(_device_specs(device, _parse_metrics(metrics)), start, end, points, aggregate)
+
+
+@router.get("/devices/{device_id}/interfaces/{if_index}", response_model=MetricsResponse)
+async def get_interface_metrics(
+    device_id: int,
+    if_index: int,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    points: int = Query(1000, ge=10, le=10000),
+    aggregate: str = Query("avg", pattern="^(avg|max)$"),
+    db: AsyncSession = Depends(get_db)
+):
+    """In/out bps history of one interface (port)"""
+    device = await db.get(Device, device_id)
+    if not device:
+        raise HTTPException(status_code=404, detail="Device not found")
+    port = (device.interface_rates or {}).get(str(if_index), {})
+    label = f"{device.hostname} {port.get('name', f'ifIndex {if_index}')}"
+    return await _respond(_port_specs(device_id, if_index, label), start, end, points, aggregate)
+
+
+@router.get("/links/{link_id}", response_model=MetricsResponse)
+async def get_link_metrics(
+    link_id: int,
+    ports: bool = Query(False, description="Also return in/out bps of each member port"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    points: int = Query(1000, ge=10, le=10000),
+    aggregate: str = Query("avg", pattern="^(avg|max)$"),
+    db: AsyncSession = Depends(get_db)
+):
+    """Utilization history of a merged link, optionally per port"""
+    link = await db.get(MergedLink, link_id)
+    if not link:
+        raise HTTPException(status_code=404, detail="Link not found")
+    
+    specs = _link_specs(link, "Link")
+    if ports:
+        for port in link.port_pairs or []:
+            if port.get("device_id") is not None and port.get("if_index") is not None:
+                specs += _port_specs(port["device_id"], port["if_index"], port.get("local_port", ""))
+    return await _respond(specs, start, end, points, aggregate)
+
+
+@router.get("/groups/{group_id}", response_model=MetricsResponse)
+async def get_group_metrics(
+    group_id: int,
+    metrics: str = Query("cpu,memory", description="Comma-separated: cpu, memory"),
+    links: bool = Query(False, description="Also return utilization of links between group members"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    points: int = Query(1000, ge=10, le=10000),
+    aggregate: str = Query("avg", pattern="^(avg|max)$"),
+    db: AsyncSession = Depends(get_db)
+):
+    """Metric history of every device in a group in one response"""
+    group = await db.get(DeviceGroup, group_id)
+    if not group:
+        raise HTTPException(status_code=404, detail="Group not found")
+    
+    members = await db.execute(
+        select(Device).join(DeviceGroupMember, DeviceGroupMember.device_id == Device.id)
+        .where(DeviceGroupMember.group_id == group_id)
+        .order_by(Device.hostname)
+    )
+    devices = members.scalars().all()
+    
+    names = _parse_metrics(metrics)
+    specs = []
+    for device in devices:
+        specs += _device_specs(device, names)
+    
+    if links and devices:
+        hostnames = {device.id: device.hostname for device in devices}
+        link_result = await db.execute(
+            select(MergedLink).where(
+                and_(
+                    MergedLink.device_a_id.in_(list(hostnames)),
+                    MergedLink.device_b_id.in_(list(hostnames)),
+                    MergedLink.is_excluded == False
+                )
+            )
+        )
+        for link in link_result.scalars():
+            specs += _link_specs(link, f"{hostnames[link.device_a_id]} - {hostnames[link.device_b_id]}")
+    
+    return await _respond(specs, start, end, points, aggregate)
+
+
+@router.post("/query", response_model=MetricsResponse)
+async def query_metrics(query: MetricsQuery):
+    """History of arbitrary series by name (e.g. if.12.3.in_bps, link.4.9.util_in, dev.7.cpu)"""
+    specs = [(name, None, None) for name in dict.fromkeys(query.series)]
+    return await _respond(specs, query.start, query.end, query.points, query.aggregate)
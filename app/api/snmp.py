@@ -29,18 +29,20 @@ async def test_snmp(request: SnmpTestRequest):
     Test SNMP connectivity to a device
     """
     try:
-        from pysnmp.hlapi.asyncio import (
-            getCmd, nextCmd, SnmpEngine, CommunityData, 
-            UdpTransportTarget, ContextData, ObjectType, ObjectIdentity
+        from pysnmp.hlapi.asyncio import getCmd, nextCmd, ObjectType, ObjectIdentity
+        from app.core.snmp_engine_pool import SnmpCredentials, get_engine_pool
+        
+        engine, auth_data, target, context = get_engine_pool().acquire(
+            request.ip, SnmpCredentials(community=request.community), timeout=5.0, retries=1
         )
         
         if request.method == "get":
             # SNMP GET
             errorIndication, errorStatus, errorIndex, varBinds = await getCmd(
-                SnmpEngine(),
-                CommunityData(request.community),
-                UdpTransportTarget((request.ip, 161), timeout=5.0, retries=1),
-                ContextData(),
+                engine,
+                auth_data,
+                target,
+                context,
                 ObjectType(ObjectIdentity(request.oid))
             )
             
@@ -61,10 +63,10 @@ async def test_snmp(request: SnmpTestRequest):
             # SNMP WALK
             results = []
             async for (errorIndication, errorStatus, errorIndex, varBinds) in nextCmd(
-                SnmpEngine(),
-                CommunityData(request.community),
-                UdpTransportTarget((request.ip, 161), timeout=5.0, retries=1),
-                ContextData(),
+                engine,
+                auth_data,
+                target,
+                context,
                 ObjectType(ObjectIdentity(request.oid)),
                 lexicographicMode=False
             ):
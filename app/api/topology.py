@@ -155,7 +155,8 @@ async def get_topology(
                         remote_port=pd.get("b", pd.get("remote_port", "")),
                         bandwidth_mbps=pd.get("bandwidth_mbps", 0),
                         in_bps=pd.get("in_bps"),
-                        out_bps=pd.get("out_bps")
+                        out_bps=pd.get("out_bps"),
+                        utilization_percent=pd.get("utilization_percent")
                     ))
             
             max_util = max(
@@ -3,19 +3,39 @@ Background collector service
 Runs periodic SNMP polling of all managed devices
 Integrates with Alert Engine and Topology Engine
 """
+import argparse
 import asyncio
+import json
 import logging
+import multiprocessing
+import queue
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
 from datetime import datetime
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
 
 from app.config import get_settings
 from app.db.database import async_session_maker
-from app.core.snmp_collector import SNMPCollector
+from app.core.snmp_collector import (
+    SNMPCollector, DeviceCapabilities, TIER_COUNTERS, TIER_INVENTORY, TIER_FULL
+)
+from app.core.rtt_estimator import get_rtt_tracker
+from app.core.table_cache import get_table_cache
+from app.core.rate_engine import get_rate_engine, make_counter_sample
+from app.core.timeseries import get_timeseries_store, interface_series, link_series, device_series
+from app.core.work_queue import RedisWorkQueue
+from app.core.identity_index import refresh_identity_index
+from app.core.neighbor_discovery import get_neighbor_discovery
+from app.core.collector_metrics import get_collector_metrics
+from app.core.poll_scheduler import PollScheduler, parse_type_intervals
 from app.core.topology_engine import TopologyEngine
 from app.core.alert_engine import AlertEngine
 from app.core.log_exporter import get_log_exporter, LogLevel
 from app.models.device import Device, DeviceStatus
 from app.models.link import RawLink, MergedLink
-from sqlalchemy import select
+from sqlalchemy import inspect, select, insert, update
 
 logging.basicConfig(
     level=logging.INFO,
@@ -25,101 +45,497 @@ logger = logging.getLogger(__name__)
 
 settings = get_settings()
 
+# Time series disk I/O runs here, one write at a time and in order, never on the event loop
+_history_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="timeseries")
+
+
+@dataclass
+class PollTarget:
+    """Picklable snapshot of what polling one device needs"""
+    device_id: int
+    hostname: str
+    ip_address: str
+    community: str
+    snmp_version: str = "v2c"
+    v3_username: Optional[str] = None
+    v3_auth_protocol: Optional[str] = None
+    v3_auth_password: Optional[str] = None
+    v3_priv_protocol: Optional[str] = None
+    v3_priv_password: Optional[str] = None
+    srtt_ms: Optional[float] = None
+    rttvar_ms: Optional[float] = None
+    capabilities: Optional[dict] = None
+    vendor: Optional[str] = None
+    device_type: Optional[str] = None
+    tier: str = TIER_FULL
+    deadline: Optional[float] = None  # Epoch time the poll should finish by, its next slot
+
+
+def make_poll_target(device: Device) -> PollTarget:
+    """Snapshot a device row for polling"""
+    return PollTarget(
+        device_id=device.id,
+        hostname=device.hostname,
+        ip_address=device.ip_address,
+        # Use device-specific community, fallback to default
+        community=device.snmp_community or settings.snmp_default_community,
+        snmp_version=device.snmp_version or "v2c",
+        v3_username=device.snmpv3_username,
+        v3_auth_protocol=device.snmpv3_auth_protocol,
+        v3_auth_password=device.snmpv3_auth_password,
+        v3_priv_protocol=device.snmpv3_priv_protocol,
+        v3_priv_password=device.snmpv3_priv_password,
+        srtt_ms=device.snmp_srtt_ms,
+        rttvar_ms=device.snmp_rttvar_ms,
+        capabilities=device.snmp_capabilities,
+        vendor=device.vendor,
+        device_type=device.device_type
+    )
+
+
+def shard_of(device_id: int, workers: int) -> int:
+    """Stable worker index for a device"""
+    return zlib.crc32(str(device_id).encode()) % workers
 
-async def auto_discover_neighbor(db, parent_device: Device, neighbor, community: str, log_exporter):
-    """Auto-discover and add neighbor device to database"""
+
+async def poll_target(target: PollTarget) -> Dict:
+    """Poll one device over SNMP, no database access"""
+    rtt_tracker = get_rtt_tracker() if settings.snmp_adaptive_timeout else None
+    if rtt_tracker:
+        # Pick up estimates persisted by a previous collector process
+        rtt_tracker.seed(target.ip_address, target.srtt_ms, target.rttvar_ms)
+    
+    collector = SNMPCollector(
+        community=target.community,
+        timeout=settings.snmp_timeout,
+        retries=settings.snmp_retries,
+        snmp_version=target.snmp_version,
+        max_repetitions=settings.snmp_max_repetitions,
+        max_walk_rows=settings.snmp_walk_max_rows,
+        max_inflight=settings.snmp_device_max_inflight,
+        port=settings.snmp_port,
+        rtt_tracker=rtt_tracker,
+        capability_reprobe_interval=settings.snmp_capability_reprobe_interval,
+        table_cache=get_table_cache() if settings.snmp_change_detection else None,
+        v3_username=target.v3_username,
+        v3_auth_protocol=target.v3_auth_protocol,
+        v3_auth_password=target.v3_auth_password,
+        v3_priv_protocol=target.v3_priv_protocol,
+        v3_priv_password=target.v3_priv_password
+    )
+    
+    started = time.monotonic()
     try:
-        from pysnmp.hlapi.asyncio import getCmd, SnmpEngine, CommunityData, UdpTransportTarget, ContextData, ObjectType, ObjectIdentity
-        from app.core.snmp_oids import detect_vendor, SYS_NAME, SYS_DESCR
-        import socket
-        
-        # Check if neighbor already exists by hostname
-        existing = await db.execute(
-            select(Device).where(Device.hostname == neighbor.remote_hostname)
+        result = await collector.poll_device(
+            target.ip_address, DeviceCapabilities.from_dict(target.capabilities),
+            tier=target.tier, vendor=target.vendor
         )
-        if existing.scalar_one_or_none():
-            return  # Already exists
-        
-        # Try to resolve neighbor IP
-        neighbor_ip = None
-        
-        # Method 1: Check if remote_chassis_id looks like an IP
-        if neighbor.remote_chassis_id:
-            try:
-                parts = neighbor.remote_chassis_id.split('.')
-                if len(parts) == 4 and all(0 <= int(p) <= 255 for p in parts):
-                    neighbor_ip = neighbor.remote_chassis_id
-            except:
-                pass
-        
-        # Method 2: Try DNS resolution
-        if not neighbor_ip and neighbor.remote_hostname:
-            try:
-                neighbor_ip = socket.gethostbyname(neighbor.remote_hostname)
-            except socket.gaierror:
-                pass
-        
-        if not neighbor_ip:
-            logger.debug(f"Could not resolve IP for neighbor {neighbor.remote_hostname}")
-            return
-        
-        # Check if IP already exists
-        existing_ip = await db.execute(
-            select(Device).where(Device.ip_address == neighbor_ip)
+    except Exception as e:
+        logger.error(f"Error polling {target.hostname}: {e}")
+        result = {
+            "ip": target.ip_address, "tier": target.tier, "success": False, "error": str(e),
+            "stats": collector.stats
+        }
+    
+    result["device_id"] = target.device_id
+    result["duration"] = round(time.monotonic() - started, 6)
+    result["deadline_missed"] = target.deadline is not None and time.time() > target.deadline
+    result["rtt"] = None
+    if rtt_tracker:
+        estimator = rtt_tracker.get(target.ip_address)
+        result["rtt"] = {
+            "srtt_ms": round(estimator.srtt * 1000, 2) if estimator.srtt is not None else None,
+            "rttvar_ms": round(estimator.rttvar * 1000, 2) if estimator.rttvar is not None else None,
+            "timeout_ms": round(estimator.timeout() * 1000)
+        }
+    return result
+
+
+async def poll_targets(
+    targets: List[PollTarget], semaphore: Optional[asyncio.Semaphore] = None
+) -> AsyncIterator[Dict]:
+    """Poll devices concurrently in this process, yielding results as they finish"""
+    semaphore = semaphore or asyncio.Semaphore(settings.collector_concurrent)
+    
+    async def poll_with_semaphore(target):
+        async with semaphore:
+            return await poll_target(target)
+    
+    for finished in asyncio.as_completed([poll_with_semaphore(t) for t in targets]):
+        yield await finished
+
+
+def _worker_main(shard: int, requests, results):
+    """Worker process: poll every batch of targets it is sent and stream back results"""
+    async def forward(targets, semaphore):
+        async for result in poll_targets(targets, semaphore):
+            results.put((shard, result))
+    
+    async def run():
+        loop = asyncio.get_running_loop()
+        # Shared by all batches so concurrency stays at collector_concurrent per process
+        semaphore = asyncio.Semaphore(settings.collector_concurrent)
+        batches = set()
+        while True:
+            targets = await loop.run_in_executor(None, requests.get)
+            if targets is None:
+                return
+            task = asyncio.create_task(forward(targets, semaphore))
+            batches.add(task)
+            task.add_done_callback(batches.discard)
+    
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+class PollWorkerPool:
+    """
+    Worker processes, each with its own event loop and SNMP engine
+    Devices are sharded by a stable hash of their id, so per-device state
+    (RTT estimates, table cache) stays in one worker across cycles
+    """
+    
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._context = multiprocessing.get_context("spawn")
+        self._results = self._context.Queue()
+        self._requests = []
+        self._processes = []
+        self._outstanding: List[set] = []
+    
+    def start(self):
+        for shard in range(self.workers):
+            self._requests.append(self._context.Queue())
+            self._processes.append(None)
+            self._outstanding.append(set())
+            self._spawn(shard)
+        logger.info(f"Started {self.workers} poll worker processes")
+    
+    def _spawn(self, shard: int):
+        process = self._context.Process(
+            target=_worker_main,
+            args=(shard, self._requests[shard], self._results),
+            name=f"poll-worker-{shard}",
+            daemon=True
         )
-        if existing_ip.scalar_one_or_none():
-            return  # Already exists
+        process.start()
+        self._processes[shard] = process
+    
+    def submit(self, targets: List[PollTarget]):
+        """Hand targets to their workers, results come out of results()"""
+        shards: List[List[PollTarget]] = [[] for _ in range(self.workers)]
+        for target in targets:
+            shards[shard_of(target.device_id, self.workers)].append(target)
         
-        # Try SNMP to validate device
-        try:
-            error_indication, error_status, error_index, var_binds = await getCmd(
-                SnmpEngine(),
-                CommunityData(community),
-                UdpTransportTarget((neighbor_ip, 161), timeout=2.0, retries=0),
-                ContextData(),
-                ObjectType(ObjectIdentity(SYS_NAME)),
-                ObjectType(ObjectIdentity(SYS_DESCR))
-            )
-            
-            if error_indication or error_status or not var_binds:
-                logger.debug(f"SNMP failed for neighbor {neighbor_ip}")
-                return
-            
-            hostname = var_binds[0][1].prettyPrint()
-            sys_descr = var_binds[1][1].prettyPrint() if len(var_binds) > 1 else ""
-            vendor = detect_vendor(sys_descr)
-            
-            # Add new device
-            new_device = Device(
-                hostname=hostname,
-                ip_address=neighbor_ip,
-                snmp_community=community,
-                device_type="access",
-                vendor=vendor,
-                status="managed",
-                auto_discover=True,
-                parent_device_id=parent_device.id,
-                last_seen=datetime.utcnow()
-            )
-            db.add(new_device)
-            
-            logger.info(f"Auto-discovered neighbor: {hostname} ({neighbor_ip}) via {parent_device.hostname}")
+        for shard, shard_targets in enumerate(shards):
+            if not shard_targets:
+                continue
+            if not self._processes[shard].is_alive():
+                logger.error(f"Poll worker {shard} died, restarting it")
+                self._requests[shard] = self._context.Queue()
+                self._spawn(shard)
+            self._outstanding[shard].update((t.device_id, t.tier) for t in shard_targets)
+            self._requests[shard].put(shard_targets)
+    
+    async def results(self) -> AsyncIterator[Dict]:
+        """Yield results of submitted targets as the workers finish them"""
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                shard, result = await loop.run_in_executor(None, self._results.get, True, 1.0)
+            except queue.Empty:
+                for shard, process in enumerate(self._processes):
+                    if self._outstanding[shard] and not process.is_alive():
+                        lost, self._outstanding[shard] = self._outstanding[shard], set()
+                        logger.error(f"Poll worker {shard} exited with {len(lost)} polls outstanding")
+                        for device_id, tier in lost:
+                            yield {"device_id": device_id, "tier": tier, "success": False, "skipped": True}
+                continue
             
-            await log_exporter.log_discovery(
-                event_type="new_device",
-                device_hostname=hostname,
-                device_ip=neighbor_ip,
-                extra={"discovered_via": parent_device.hostname}
-            )
+            self._outstanding[shard].discard((result["device_id"], result["tier"]))
+            yield result
+    
+    async def poll(self, targets: List[PollTarget]) -> AsyncIterator[Dict]:
+        """Poll targets and yield their results, for one consumer at a time"""
+        remaining = {(target.device_id, target.tier) for target in targets}
+        if not remaining:
+            return
+        self.submit(targets)
+        async for result in self.results():
+            remaining.discard((result["device_id"], result["tier"]))
+            yield result
+            if not remaining:
+                break
+    
+    def stop(self):
+        for shard, process in enumerate(self._processes):
+            if process.is_alive():
+                self._requests[shard].put(None)
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+
+
+# Queued to the writer to rebuild merged links and run alert checks
+_UPDATE_TOPOLOGY = object()
+
+
+@dataclass
+class _MarkStale:
+    """Queued to the writer to flag devices whose counters were not refreshed in time"""
+    device_ids: List[int]
+
+
+class ResultWriter:
+    """
+    The collector's only database writer
+    Pollers put results on a bounded queue and wait while it is full; the writer
+    commits them in batches of up to collector_write_batch_size results, or
+    whatever arrived within collector_write_interval, one transaction per batch
+    
+    A batch costs a fixed handful of statements however many devices it holds:
+    one SELECT of the devices, one bulk UPDATE per distinct set of changed
+    device columns and at most four raw_links statements (see
+    apply_inventory_results); executemany counts as one statement
+    """
+    
+    def __init__(self, on_written: Optional[Callable[[List[Dict], Dict[int, Device]], None]] = None):
+        self.batch_size = max(1, settings.collector_write_batch_size)
+        self.flush_interval = settings.collector_write_interval
+        self.on_written = on_written
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, settings.collector_write_queue_size))
+    
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+    
+    async def put(self, poll_result: Dict):
+        """Queue a poll result, waits while the queue is full"""
+        await self._queue.put(poll_result)
+    
+    async def update_topology(self):
+        """Rebuild merged links and run alert checks once the results queued so far are written"""
+        await self._queue.put(_UPDATE_TOPOLOGY)
+    
+    async def mark_stale(self, device_ids: List[int]):
+        """Flag devices as stale, a later on-time counters poll clears the flag"""
+        await self._queue.put(_MarkStale(list(device_ids)))
+    
+    async def join(self):
+        """Wait until everything queued so far is written"""
+        await self._queue.join()
+    
+    async def _next_batch(self) -> List:
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        # A topology update closes the batch so it sees the results before it
+        while len(batch) < self.batch_size and batch[-1] is not _UPDATE_TOPOLOGY:
+            if self._queue.empty():
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            else:
+                batch.append(self._queue.get_nowait())
+        return batch
+    
+    async def run(self):
+        metrics = get_collector_metrics()
+        while True:
+            batch = await self._next_batch()
+            metrics.write_queue_depth.set(self.pending)
+            poll_results = [item for item in batch if isinstance(item, dict)]
+            stale_ids = {d for item in batch if isinstance(item, _MarkStale) for d in item.device_ids}
+            devices: Dict[int, Device] = {}
+            history = []
+            for poll_result in poll_results:
+                metrics.observe_poll(poll_result)
             
-        except Exception as e:
-            logger.debug(f"SNMP probe failed for {neighbor_ip}: {e}")
+            try:
+                async with async_session_maker() as db:
+                    if stale_ids:
+                        await db.execute(
+                            update(Device).where(Device.id.in_(stale_ids)).values(data_stale=True)
+                            .execution_options(synchronize_session=False)
+                        )
+                        if not poll_results:
+                            await db.commit()
+                    
+                    if poll_results:
+                        started = time.monotonic()
+                        found = await db.execute(
+                            select(Device).where(Device.id.in_({r["device_id"] for r in poll_results}))
+                        )
+                        devices = {device.id: device for device in found.scalars().all()}
+                        # Detached, so changes are written in bulk below instead of an UPDATE per device
+                        db.expunge_all()
+                        for poll_result in poll_results:
+                            device = devices.get(poll_result["device_id"])
+                            if device is not None:
+                                await apply_poll_result(device, poll_result)
+                        await apply_inventory_results(devices, poll_results, db)
+                        history = record_interface_rates(devices, poll_results)
+                        device_rows = changed_device_rows(devices.values())
+                        if device_rows:
+                            await db.execute(update(Device), device_rows)
+                        await db.commit()
+                        queue_neighbor_discovery(devices, poll_results)
+                        metrics.db_write_seconds.observe(time.monotonic() - started)
+                        metrics.db_write_batch.observe(len(poll_results))
+                        await write_history(history)
+                    
+                    if any(item is _UPDATE_TOPOLOGY for item in batch):
+                        await update_topology_and_alerts(db)
+            except Exception as e:
+                logger.error(f"Failed to write {len(poll_results)} poll results: {e}")
             
+            try:
+                if self.on_written and poll_results:
+                    self.on_written(poll_results, devices)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+
+async def poll_and_apply(
+    devices: List[Device],
+    worker_pool: Optional[PollWorkerPool] = None,
+    deadlines: Optional[Dict[int, float]] = None
+):
+    """Poll devices (in this process or the worker pool) and write their results"""
+    deadlines = deadlines or {}
+    targets = [replace(make_poll_target(device), deadline=deadlines.get(device.id)) for device in devices]
+    if worker_pool is not None:
+        results = worker_pool.poll(targets)
+    else:
+        results = poll_targets(targets)
+    
+    # Polls run concurrently, results are written in batches by the writer task
+    writer = ResultWriter()
+    writer_task = asyncio.create_task(writer.run())
+    try:
+        async for poll_result in results:
+            await writer.put(poll_result)
+        await writer.join()
+    finally:
+        writer_task.cancel()
+
+
+def queue_neighbor_discovery(devices: Dict[int, Device], poll_results: List[Dict]):
+    """Hand the neighbors of auto-discovering devices to the background prober once their links are committed"""
+    discovery = get_neighbor_discovery()
+    for result in poll_results:
+        device = devices.get(result["device_id"])
+        if device is None or not device.auto_discover or not result.get("success"):
+            continue
+        if result.get("tier", TIER_FULL) == TIER_COUNTERS:
+            continue
+        discovery.submit(
+            device,
+            result.get("lldp_neighbors", []) + result.get("cdp_neighbors", []),
+            device.snmp_community or settings.snmp_default_community
+        )
+
+
+def record_interface_rates(
+    devices: Dict[int, Device],
+    poll_results: List[Dict]
+) -> List[Tuple[Dict[str, float], Optional[float]]]:
+    """Turn the interface counters of a batch of polls into per-interface bit rates, returns their history samples"""
+    samples = []
+    for result in poll_results:
+        if not result.get("success") or not result.get("interface_stats"):
+            continue
+        capabilities = result.get("capabilities")
+        samples.append(make_counter_sample(
+            result["device_id"],
+            result["interface_stats"],
+            result.get("sys_uptime"),
+            hc_counters=capabilities is None or capabilities.hc_counters is not False,
+            sampled_at=result.get("sampled_at")
+        ))
+    
+    all_rates = get_rate_engine().update(samples)
+    
+    for device_id, rates in all_rates.items():
+        device = devices.get(device_id)
+        if device is None:
+            continue
+        device.interface_rates = {
+            str(if_index): {
+                "name": rate.port_name,
+                "speed_mbps": rate.speed_mbps,
+                "in_bps": rate.in_bps,
+                "out_bps": rate.out_bps
+            }
+            for if_index, rate in rates.items()
+        }
+    
+    return history_samples(poll_results, all_rates) if settings.timeseries_enabled else []
+
+
+def history_samples(poll_results: List[Dict], rates: Dict[int, Dict]) -> List[Tuple[Dict[str, float], Optional[float]]]:
+    """Interface rates and CPU/memory of a batch of polls as (samples, timestamp) pairs for the time series store"""
+    history = []
+    for result in poll_results:
+        if not result.get("success"):
+            continue
+        device_id = result["device_id"]
+        samples = {}
+        for if_index, rate in rates.get(device_id, {}).items():
+            samples[interface_series(device_id, if_index, "in_bps")] = rate.in_bps
+            samples[interface_series(device_id, if_index, "out_bps")] = rate.out_bps
+        if result.get("metrics"):
+            samples[device_series(device_id, "cpu")] = result["metrics"].cpu_percent
+            samples[device_series(device_id, "memory")] = result["metrics"].memory_percent
+        if samples:
+            history.append((samples, result.get("sampled_at")))
+    return history
+
+
+def _write_history(history: List[Tuple[Dict[str, float], Optional[float]]]):
+    get_timeseries_store(writable=True).write_many(history)
+
+
+async def write_history(history: List[Tuple[Dict[str, float], Optional[float]]]):
+    """Append a batch of samples to the time series store in one write, in the history thread"""
+    if not history:
+        return
+    try:
+        await asyncio.get_running_loop().run_in_executor(_history_executor, _write_history, history)
     except Exception as e:
-        logger.error(f"Error in auto_discover_neighbor: {e}")
+        logger.error(f"Failed to record metric history for {len(history)} polls: {e}")
+
+
+async def update_topology_and_alerts(db):
+    """Rebuild merged links and run alert checks after polling"""
+    started = time.monotonic()
+    # Update merged links
+    logger.info("Updating merged links...")
+    topology_engine = TopologyEngine(db, await refresh_identity_index(db))
+    merged = await topology_engine.update_merged_links_in_db()
+    
+    if settings.timeseries_enabled:
+        samples = {}
+        for link in merged:
+            samples[link_series(link.device_a_id, link.device_b_id, "util_in")] = link.utilization_in_percent
+            samples[link_series(link.device_a_id, link.device_b_id, "util_out")] = link.utilization_out_percent
+        await write_history([(samples, time.time())])
+    
+    # Run alert checks
+    logger.info("Running alert checks...")
+    alert_engine = AlertEngine(db)
+    await alert_engine.run_check_cycle()
+    get_collector_metrics().topology_seconds.observe(time.monotonic() - started)
 
 
-async def poll_all_devices():
+async def poll_all_devices(worker_pool: Optional[PollWorkerPool] = None):
     """Poll all managed devices"""
     async with async_session_maker() as db:
         # Get all managed devices
@@ -127,53 +543,543 @@ async def poll_all_devices():
             select(Device).where(Device.status != DeviceStatus.EXCLUDED)
         )
         devices = result.scalars().all()
+    
+    logger.info(f"Starting poll cycle for {len(devices)} devices")
+    started = time.monotonic()
+    
+    # The cycle should be done before the next one is due
+    deadline = time.time() + settings.collector_interval
+    await poll_and_apply(devices, worker_pool, {device.id: deadline for device in devices})
+    
+    async with async_session_maker() as db:
+        await update_topology_and_alerts(db)
+    
+    get_collector_metrics().cycle_seconds.observe(time.monotonic() - started)
+    logger.info("Poll cycle completed")
+
+
+# Dispatch order when capacity is short, counters are the time-sensitive tier
+_TIER_PRIORITY = (TIER_COUNTERS, TIER_FULL, TIER_INVENTORY)
+
+
+def tier_intervals(interval: int, inventory_interval: int) -> Dict[str, int]:
+    """
+    Split a device's poll interval into tiers
+    Counters follow the device's interval and inventory/neighbors the slower
+    inventory interval; a device polled less often than that gets one full poll
+    """
+    if inventory_interval > interval:
+        return {TIER_COUNTERS: interval, TIER_INVENTORY: inventory_interval}
+    return {TIER_FULL: interval}
+
+
+async def run_scheduled_collector(worker_pool: Optional[PollWorkerPool] = None):
+    """
+    Poll each device on its own schedule, one schedule per poll tier
+    Polls are dispatched as devices come due, results go through one ResultWriter
+    """
+    type_intervals = parse_type_intervals(settings.collector_type_intervals)
+    schedulers = {
+        tier: PollScheduler(settings.collector_interval, type_intervals)
+        for tier in _TIER_PRIORITY
+    }
+    capacity = settings.collector_concurrent * (worker_pool.workers if worker_pool else 1)
+    targets: Dict[int, PollTarget] = {}
+    started: Dict[tuple, float] = {}  # (tier, device_id) -> poll start time
+    wakeup = asyncio.Event()
+    tasks = set()
+    metrics = get_collector_metrics()
+    priority_types = [t.strip() for t in settings.collector_priority_types.split(",") if t.strip()]
+    defer_types = {t.strip() for t in settings.collector_defer_types.split(",") if t.strip()}
+    shedding = False
+    shed_devices = set()  # Counters polls skipped since the last report, flagged stale
+    
+    def running() -> int:
+        return sum(scheduler.running for scheduler in schedulers.values())
+    
+    async def sync_devices():
+        async with async_session_maker() as db:
+            result = await db.execute(
+                select(Device).where(Device.status != DeviceStatus.EXCLUDED)
+            )
+            devices = result.scalars().all()
+        in_flight = {device_id for _, device_id in started}
+        for device in devices:
+            if device.id not in in_flight:
+                targets[device.id] = make_poll_target(device)
         
-        logger.info(f"Starting poll cycle for {len(devices)} devices")
+        wanted: Dict[str, Dict[int, int]] = {tier: {} for tier in schedulers}
+        for device in devices:
+            interval = schedulers[TIER_FULL].interval_for(device.device_type, device.poll_interval)
+            for tier, tier_interval in tier_intervals(interval, settings.collector_inventory_interval).items():
+                wanted[tier][device.id] = tier_interval
         
-        # Poll devices concurrently with limit
-        semaphore = asyncio.Semaphore(settings.collector_concurrent)
+        previous = {tier: len(scheduler) for tier, scheduler in schedulers.items()}
+        for tier, scheduler in schedulers.items():
+            scheduler.sync(wanted[tier])
+        if any(len(scheduler) != previous[tier] for tier, scheduler in schedulers.items()):
+            logger.info("Scheduling " + ", ".join(
+                f"{len(scheduler)} {tier}" for tier, scheduler in schedulers.items() if len(scheduler)
+            ) + " polls")
+        for device_id in [d for d in targets if not any(d in s for s in schedulers.values())]:
+            del targets[device_id]
+    
+    def type_rank(device_id: int) -> int:
+        target = targets.get(device_id)
+        device_type = target.device_type if target else None
+        if device_type in priority_types:
+            return priority_types.index(device_type)
+        return len(priority_types) + (device_type in defer_types)
+    
+    def take_due(tier: str) -> List[PollTarget]:
+        """Targets of a tier to dispatch now, shedding load while saturated"""
+        scheduler = schedulers[tier]
+        free = max(0, capacity - running())
+        if not shedding:
+            due = scheduler.pop_due(free)
+        elif tier == TIER_INVENTORY:
+            # Skip the slow tier entirely until the backlog clears
+            for device_id, _ in scheduler.pop_due(len(scheduler)):
+                scheduler.shed(device_id)
+                metrics.polls_shed.inc(tier=tier)
+            return []
+        else:
+            # Everything due, core/distribution first
+            due = sorted(scheduler.pop_due(len(scheduler)), key=lambda item: (type_rank(item[0]), item[1]))
         
-        async def poll_with_semaphore(device):
-            async with semaphore:
-                # Use device-specific community, fallback to default
-                community = device.snmp_community or settings.snmp_default_community
-                collector = SNMPCollector(
-                    community=community,
-                    timeout=settings.snmp_timeout,
-                    retries=settings.snmp_retries,
-                    snmp_version=device.snmp_version or "v2c",
-                    v3_username=device.snmpv3_username,
-                    v3_auth_protocol=device.snmpv3_auth_protocol,
-                    v3_auth_password=device.snmpv3_auth_password,
-                    v3_priv_protocol=device.snmpv3_priv_protocol,
-                    v3_priv_password=device.snmpv3_priv_password
-                )
-                return await poll_single_device(collector, device, db)
+        taken = []
+        for device_id, due_at in due:
+            target = targets.get(device_id)
+            if target is None:
+                scheduler.complete(device_id)
+            elif len(taken) < free:
+                started[(tier, device_id)] = time.time()
+                taken.append(replace(target, tier=tier, deadline=scheduler.deadline_of(device_id, due_at)))
+            elif target.device_type in defer_types:
+                # Access switches give up this slot rather than delay everything behind them
+                scheduler.shed(device_id)
+                shed_devices.add(device_id)
+                metrics.polls_shed.inc(tier=tier)
+            else:
+                scheduler.requeue(device_id, due_at)
+        return taken
+    
+    async def update_shedding():
+        nonlocal shedding
+        if not settings.collector_load_shedding or not settings.collector_shed_lag:
+            return
+        lag = max(schedulers[tier].oldest_lag() for tier in (TIER_COUNTERS, TIER_FULL))
+        # Engage past collector_shed_lag, release once the backlog is under half of it
+        if not shedding and lag > settings.collector_shed_lag:
+            shedding = True
+        elif shedding and lag < settings.collector_shed_lag / 2:
+            shedding = False
+        else:
+            return
+        
+        metrics.load_shedding.set(int(shedding))
+        if shedding:
+            message = (
+                f"Collector saturated (polls {lag:.0f}s behind schedule): shedding load, "
+                f"inventory polls paused, {', '.join(sorted(defer_types)) or 'no'} device polls deferred"
+            )
+        else:
+            message = "Collector caught up with its schedule, load shedding stopped"
+        logger.warning(message)
+        await get_log_exporter().log(
+            level=LogLevel.WARNING if shedding else LogLevel.INFO,
+            source="collector",
+            message=message
+        )
+    
+    def written(poll_results: List[Dict], devices: Dict[int, Device]):
+        # Next poll starts from the capabilities/RTT state just saved
+        for device in devices.values():
+            if device.id in targets:
+                targets[device.id] = make_poll_target(device)
+        for poll_result in poll_results:
+            tier, device_id = poll_result["tier"], poll_result["device_id"]
+            schedulers[tier].complete(device_id, started.pop((tier, device_id), None))
+        wakeup.set()
+    
+    writer = ResultWriter(on_written=written)
+    
+    async def poll_locally(target: PollTarget):
+        await writer.put(await poll_target(target))
+    
+    async def forward_worker_results():
+        async for poll_result in worker_pool.results():
+            await writer.put(poll_result)
+    
+    def spawn(coroutine):
+        task = asyncio.create_task(coroutine)
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    
+    spawn(writer.run())
+    if worker_pool:
+        spawn(forward_worker_results())
+    
+    last_sync = float("-inf")
+    last_topology = last_report = time.monotonic()
+    
+    while True:
+        now = time.monotonic()
+        try:
+            if now - last_sync >= min(60, settings.collector_interval):
+                await sync_devices()
+                last_sync = now
+            
+            if now - last_topology >= settings.collector_interval:
+                await writer.update_topology()
+                last_topology = now
+            
+            if now - last_report >= settings.collector_interval:
+                # Devices past their deadline without a poll have stale counters
+                stale = shed_devices.union(*(schedulers[t].overdue() for t in (TIER_COUNTERS, TIER_FULL)))
+                shed_devices.clear()
+                if stale:
+                    await writer.mark_stale(sorted(stale))
+                metrics.stale_devices.set(len(stale))
+                for tier, scheduler in schedulers.items():
+                    stats = scheduler.stats
+                    metrics.scheduled_devices.set(len(scheduler), tier=tier)
+                    metrics.schedule_overruns.set(stats.overruns, tier=tier)
+                    metrics.schedule_lag.set(stats.max_lag, tier=tier)
+                    metrics.schedule_shed.set(stats.shed, tier=tier)
+                    if not len(scheduler):
+                        continue
+                    logger.info(
+                        f"Scheduler ({tier}): {len(scheduler)} devices, {stats.completed} polls, "
+                        f"{stats.overruns} overruns, {stats.shed} shed, max start lag {stats.max_lag:.1f}s"
+                    )
+                last_report = now
+        except Exception as e:
+            logger.error(f"Scheduler maintenance error: {e}")
+        
+        try:
+            await update_shedding()
+        except Exception as e:
+            logger.error(f"Load shedding check failed: {e}")
         
-        tasks = [poll_with_semaphore(d) for d in devices]
-        await asyncio.gather(*tasks)
+        dispatch = []
+        for tier in _TIER_PRIORITY:
+            dispatch += take_due(tier)
+        
+        if worker_pool:
+            if dispatch:
+                worker_pool.submit(dispatch)
+        else:
+            for target in dispatch:
+                spawn(poll_locally(target))
+        
+        for tier, scheduler in schedulers.items():
+            metrics.polls_running.set(scheduler.running, tier=tier)
+        
+        delays = [d for d in (s.next_due_in() for s in schedulers.values()) if d is not None]
+        delay = min(delays) if delays else None
+        wakeup.clear()
+        try:
+            await asyncio.wait_for(wakeup.wait(), timeout=min(1.0, delay) if delay is not None else 1.0)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def _maintain_work_queue(work_queue: RedisWorkQueue):
+    """Heartbeat, reap expired leases, sync the device list and lead topology updates"""
+    last_sync = 0.0
+    while True:
+        try:
+            await work_queue.heartbeat()
+            await work_queue.reap()
+            
+            if time.monotonic() - last_sync >= min(60, settings.collector_interval):
+                async with async_session_maker() as db:
+                    result = await db.execute(
+                        select(Device.id).where(Device.status != DeviceStatus.EXCLUDED)
+                    )
+                    added, removed = await work_queue.sync_devices(
+                        result.scalars().all(), settings.collector_interval
+                    )
+                if added or removed:
+                    logger.info(f"Work queue: {added} devices added, {removed} removed")
+                last_sync = time.monotonic()
+            
+            # One collector per interval rebuilds merged links and runs alert checks
+            if await work_queue.try_lead("topology", settings.collector_interval):
+                async with async_session_maker() as db:
+                    await update_topology_and_alerts(db)
+        except Exception as e:
+            logger.error(f"Work queue maintenance error: {e}")
         
-        await db.commit()
+        await asyncio.sleep(max(1, settings.collector_lease_ttl // 3))
+
+
+async def run_queue_collector(worker_pool: Optional[PollWorkerPool] = None):
+    """
+    Poll devices claimed from the shared Redis work queue, alongside other collectors
+    Devices are claimed as poll slots free up and their leases are released,
+    in one call per written batch, as soon as the ResultWriter has stored them
+    """
+    work_queue = RedisWorkQueue(settings.redis_url, lease_ttl=settings.collector_lease_ttl)
+    capacity = settings.collector_concurrent * (worker_pool.workers if worker_pool else 1)
+    schedule = PollScheduler(
+        settings.collector_interval, parse_type_intervals(settings.collector_type_intervals)
+    )
+    polling: Dict[int, int] = {}  # Claimed device -> its poll interval, until its result is written
+    written_jobs: List[Tuple[int, int]] = []  # (device_id, interval) whose lease is still to be released
+    wakeup = asyncio.Event()
+    tasks = set()
+    metrics = get_collector_metrics()
+    logger.info(f"Collector {work_queue.collector_id} joined the work queue at {settings.redis_url}")
+    
+    def written(poll_results: List[Dict], devices: Dict[int, Device]):
+        for poll_result in poll_results:
+            interval = polling.pop(poll_result["device_id"], None)
+            if interval is not None:
+                written_jobs.append((poll_result["device_id"], interval))
+        wakeup.set()
+    
+    writer = ResultWriter(on_written=written)
+    
+    async def poll_locally(target: PollTarget):
+        await writer.put(await poll_target(target))
+    
+    async def forward_worker_results():
+        async for poll_result in worker_pool.results():
+            await writer.put(poll_result)
+    
+    def spawn(coroutine):
+        task = asyncio.create_task(coroutine)
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    
+    async def dispatch(jobs: List[Tuple[int, float]]):
+        device_ids = [device_id for device_id, _ in jobs]
+        try:
+            async with async_session_maker() as db:
+                result = await db.execute(
+                    select(Device).where(
+                        Device.id.in_(device_ids),
+                        Device.status != DeviceStatus.EXCLUDED
+                    )
+                )
+                devices = {device.id: device for device in result.scalars().all()}
+        except Exception:
+            # Hand the leases back instead of renewing them forever
+            await work_queue.release(device_ids, delay=5)
+            raise
         
-        # Update merged links
-        logger.info("Updating merged links...")
-        topology_engine = TopologyEngine(db)
-        await topology_engine.update_merged_links_in_db()
+        now = time.time()
+        targets = []
+        for device_id in device_ids:
+            device = devices.get(device_id)
+            if device is None:
+                # Excluded or deleted since the last sync, nothing to poll
+                written_jobs.append((device_id, settings.collector_interval))
+                continue
+            interval = schedule.interval_for(device.device_type, device.poll_interval)
+            polling[device_id] = interval
+            targets.append(replace(make_poll_target(device), deadline=now + interval))
         
-        # Run alert checks
-        logger.info("Running alert checks...")
-        alert_engine = AlertEngine(db)
-        await alert_engine.run_check_cycle()
+        if worker_pool:
+            if targets:
+                worker_pool.submit(targets)
+        else:
+            for target in targets:
+                spawn(poll_locally(target))
+    
+    spawn(writer.run())
+    if worker_pool:
+        spawn(forward_worker_results())
+    maintenance = asyncio.create_task(_maintain_work_queue(work_queue))
+    try:
+        while True:
+            # Cleared before the awaits below so a result written meanwhile still wakes us
+            wakeup.clear()
+            wait = 5.0
+            try:
+                if written_jobs:
+                    jobs = list(written_jobs)
+                    await work_queue.complete_many(jobs)
+                    del written_jobs[:len(jobs)]
+                
+                free = capacity - len(polling)
+                if free > 0:
+                    jobs = await work_queue.claim(free)
+                    if jobs:
+                        await dispatch(jobs)
+                    if len(jobs) < free:
+                        due_in = await work_queue.next_due_in()
+                        if due_in is not None:
+                            wait = min(wait, due_in)
+                metrics.polls_running.set(len(polling), tier=TIER_FULL)
+            except Exception as e:
+                logger.error(f"Work queue poll error: {e}")
+                await asyncio.sleep(5)
+                continue
+            
+            try:
+                await asyncio.wait_for(wakeup.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        maintenance.cancel()
+        for task in list(tasks):
+            task.cancel()
+        try:
+            # Written polls are done, the rest are handed back to the other collectors
+            if written_jobs:
+                await work_queue.complete_many(written_jobs)
+            if polling:
+                await work_queue.release(polling, delay=5)
+        finally:
+            await work_queue.close()
+
+
+def apply_counter_result(device: Device, result: Dict):
+    """Write the counters tier of a successful poll: CPU/memory, uptime and staleness"""
+    # Counters that arrive after the device's next poll was due are already stale
+    device.data_stale = bool(result.get("deadline_missed"))
+    if result.get("deadline_missed"):
+        device.deadline_misses = (device.deadline_misses or 0) + 1
+    
+    if result["metrics"]:
+        device.cpu_percent = result["metrics"].cpu_percent
+        device.memory_percent = result["metrics"].memory_percent
+    
+    if result.get("sys_uptime") is not None:
+        device.uptime_seconds = result["sys_uptime"] // 100
+
+
+async def apply_inventory_results(devices: Dict[int, Device], poll_results: List[Dict], db):
+    """
+    Write the inventory tier of a batch of polls: LLDP/CDP neighbors as raw links
+    
+    The existing links of every device in the batch are loaded with one SELECT
+    and diffed in memory, then written with one UPDATE of last_seen, one bulk
+    UPDATE of changed addresses and one executemany INSERT for the whole batch
+    """
+    inventory = {}
+    for result in poll_results:
+        device = devices.get(result["device_id"])
+        if device is None or result.get("skipped") or not result.get("success"):
+            continue
+        if result.get("tier", TIER_FULL) == TIER_COUNTERS:
+            continue
+        neighbors = result["lldp_neighbors"] + result["cdp_neighbors"]
+        if neighbors:
+            inventory[device.id] = (device, neighbors)
+    if not inventory:
+        return
+    
+    # Load the batch's links once and diff in memory instead of a SELECT per neighbor
+    existing = await db.execute(
+        select(
+            RawLink.id, RawLink.local_device_id, RawLink.local_port,
+            RawLink.remote_hostname, RawLink.remote_address
+        ).where(RawLink.local_device_id.in_(list(inventory)))
+    )
+    known = {(row.local_device_id, row.local_port, row.remote_hostname): row for row in existing}
+    
+    seen_ids = set()
+    readdressed = []
+    new_links = {}
+    for device_id, (device, neighbors) in inventory.items():
+        for neighbor in neighbors:
+            key = (device_id, neighbor.local_port, neighbor.remote_hostname)
+            if key in known:
+                row = known[key]
+                if row.id not in seen_ids and neighbor.remote_address and neighbor.remote_address != row.remote_address:
+                    readdressed.append({"id": row.id, "remote_address": neighbor.remote_address})
+                seen_ids.add(row.id)
+            elif key not in new_links:
+                new_links[key] = neighbor
+    
+    if seen_ids:
+        await db.execute(
+            update(RawLink)
+            .where(RawLink.id.in_(seen_ids))
+            .values(last_seen=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+    
+    if readdressed:
+        # Bulk UPDATE by primary key, only for links whose neighbor changed address
+        await db.execute(update(RawLink), readdressed)
+    
+    if new_links:
+        # One executemany INSERT, works the same on SQLite and PostgreSQL
+        await db.execute(insert(RawLink), [
+            {
+                "local_device_id": device_id,
+                "local_port": neighbor.local_port,
+                "local_port_index": neighbor.local_port_index,
+                "remote_hostname": neighbor.remote_hostname,
+                "remote_port": neighbor.remote_port,
+                "remote_chassis_id": neighbor.remote_chassis_id,
+                "remote_address": neighbor.remote_address,
+                "protocol": neighbor.protocol
+            }
+            for (device_id, _, _), neighbor in new_links.items()
+        ])
         
-        logger.info("Poll cycle completed")
+        log_exporter = get_log_exporter()
+        for (device_id, _, _), neighbor in new_links.items():
+            device = inventory[device_id][0]
+            # Log new link discovery
+            await log_exporter.log_discovery(
+                event_type="new_link",
+                device_hostname=device.hostname,
+                device_ip=device.ip_address,
+                extra={
+                    "local_port": neighbor.local_port,
+                    "remote_hostname": neighbor.remote_hostname,
+                    "remote_port": neighbor.remote_port
+                }
+            )
 
 
-async def poll_single_device(collector: SNMPCollector, device: Device, db):
-    """Poll a single device and update database"""
+def changed_device_rows(devices) -> List[Dict]:
+    """
+    Parameter sets for a bulk UPDATE by primary key of changed (detached) devices
+    
+    Every row carries every column changed on any device, current values
+    included, so the batch is one executemany instead of one per column set
+    """
+    changed = []
+    columns = set()
+    for device in devices:
+        state = inspect(device)
+        keys = {
+            attr.key for attr in state.attrs
+            if attr.key in state.mapper.column_attrs and attr.history.added
+        }
+        if keys:
+            changed.append(device)
+            columns |= keys
+    return [
+        dict({key: getattr(device, key) for key in columns}, id=device.id)
+        for device in changed
+    ]
+
+
+async def apply_poll_result(device: Device, result: Dict):
+    """Apply the result of polling a device to its row, raw links are written by apply_inventory_results"""
     log_exporter = get_log_exporter()
     
+    if result.get("skipped"):
+        # Worker died before polling the device, it is simply polled again next time
+        return
+    
+    tier = result.get("tier", TIER_FULL)
     try:
-        result = await collector.poll_device(device.ip_address)
+        if result.get("rtt"):
+            rtt = result["rtt"]
+            if rtt["srtt_ms"] is not None:
+                device.snmp_srtt_ms = rtt["srtt_ms"]
+                device.snmp_rttvar_ms = rtt["rttvar_ms"]
+            device.snmp_timeout_ms = rtt["timeout_ms"]
         
         if result["success"]:
             # Update device info
@@ -181,14 +1087,18 @@ async def poll_single_device(collector: SNMPCollector, device: Device, db):
             device.status = DeviceStatus.MANAGED
             device.last_seen = datetime.utcnow()
             
-            if result["metrics"]:
-                device.cpu_percent = result["metrics"].cpu_percent
-                device.memory_percent = result["metrics"].memory_percent
-            
             if result["device_info"]:
                 device.vendor = result["device_info"].vendor
                 device.uptime_seconds = result["device_info"].uptime_seconds
             
+            if result["capabilities"]:
+                learned = result["capabilities"].to_dict()
+                if tier == TIER_COUNTERS and device.snmp_capabilities:
+                    # Counters polls don't probe neighbor support, keep what inventory polls learned
+                    for key in ("lldp", "cdp", "probed_at"):
+                        learned[key] = device.snmp_capabilities.get(key)
+                device.snmp_capabilities = learned
+            
             # Log recovery if device was offline
             if previous_status == DeviceStatus.OFFLINE:
                 await log_exporter.log(
@@ -199,51 +1109,10 @@ async def poll_single_device(collector: SNMPCollector, device: Device, db):
                     device_ip=device.ip_address
                 )
             
-            # Update raw links
-            for neighbor in result["lldp_neighbors"] + result["cdp_neighbors"]:
-                # Check if link already exists
-                existing = await db.execute(
-                    select(RawLink).where(
-                        RawLink.local_device_id == device.id,
-                        RawLink.local_port == neighbor.local_port,
-                        RawLink.remote_hostname == neighbor.remote_hostname
-                    )
-                )
-                raw_link = existing.scalar_one_or_none()
-                
-                if raw_link:
-                    raw_link.last_seen = datetime.utcnow()
-                else:
-                    raw_link = RawLink(
-                        local_device_id=device.id,
-                        local_port=neighbor.local_port,
-                        local_port_index=neighbor.local_port_index,
-                        remote_hostname=neighbor.remote_hostname,
-                        remote_port=neighbor.remote_port,
-                        remote_chassis_id=neighbor.remote_chassis_id,
-                        protocol=neighbor.protocol
-                    )
-                    db.add(raw_link)
-                    
-                    # Log new link discovery
-                    await log_exporter.log_discovery(
-                        event_type="new_link",
-                        device_hostname=device.hostname,
-                        device_ip=device.ip_address,
-                        extra={
-                            "local_port": neighbor.local_port,
-                            "remote_hostname": neighbor.remote_hostname,
-                            "remote_port": neighbor.remote_port
-                        }
-                    )
-                
-                # Auto-discover neighbor devices if enabled
-                if device.auto_discover:
-                    await auto_discover_neighbor(
-                        db, device, neighbor, collector.community, log_exporter
-                    )
+            if tier in (TIER_COUNTERS, TIER_FULL):
+                apply_counter_result(device, result)
             
-            logger.debug(f"Polled {device.hostname}: OK")
+            logger.debug(f"Polled {device.hostname} ({tier}): OK")
         else:
             # Mark device as potentially offline
             if device.status != DeviceStatus.OFFLINE:
@@ -255,29 +1124,96 @@ async def poll_single_device(collector: SNMPCollector, device: Device, db):
                     device_ip=device.ip_address
                 )
             device.status = DeviceStatus.OFFLINE
-            logger.warning(f"Polled {device.hostname}: FAILED")
+            # Rates resume from the first sample after the device comes back
+            device.interface_rates = None
+            get_rate_engine().forget(device.id)
+            logger.warning(f"Polled {device.hostname} ({tier}): FAILED")
             
     except Exception as e:
-        logger.error(f"Error polling {device.hostname}: {e}")
-        device.status = DeviceStatus.OFFLINE
+        logger.error(f"Error saving poll result for {device.hostname}: {e}")
+
+
+async def _serve_metrics(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    """Answer GET /metrics (Prometheus text format) and /metrics.json (summary for the API's /health)"""
+    try:
+        request_line = await asyncio.wait_for(reader.readline(), 5)
+        while (await asyncio.wait_for(reader.readline(), 5)) not in (b"\r\n", b"\n", b""):
+            pass
+        parts = request_line.decode("latin-1").split()
+        path = parts[1].split("?", 1)[0] if len(parts) > 1 else ""
+        
+        metrics = get_collector_metrics()
+        if path == "/metrics":
+            status, content_type, body = "200 OK", "text/plain; version=0.0.4", metrics.render()
+        elif path == "/metrics.json":
+            status, content_type, body = "200 OK", "application/json", json.dumps(metrics.summary())
+        else:
+            status, content_type, body = "404 Not Found", "text/plain", "not found\n"
+        payload = body.encode()
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Length: {len(payload)}\r\nConnection: close\r\n\r\n".encode() + payload
+        )
+        await writer.drain()
+    except Exception as e:
+        logger.debug(f"Metrics request failed: {e}")
+    finally:
+        writer.close()
 
 
-async def main():
+async def start_metrics_server() -> Optional[asyncio.AbstractServer]:
+    """Serve the collector's metrics over HTTP, disabled when collector_metrics_port is 0"""
+    if not settings.collector_metrics_port:
+        return None
+    try:
+        server = await asyncio.start_server(
+            _serve_metrics, settings.collector_metrics_host, settings.collector_metrics_port
+        )
+    except OSError as e:
+        logger.error(f"Could not start metrics server on port {settings.collector_metrics_port}: {e}")
+        return None
+    logger.info(f"Serving collector metrics on {settings.collector_metrics_host}:{settings.collector_metrics_port}/metrics")
+    return server
+
+
+async def main(workers: int = 1, queue_mode: str = "local"):
     """Main collector loop"""
-    logger.info(f"SNMP Collector starting (interval: {settings.collector_interval}s)")
+    logger.info(
+        f"SNMP Collector starting (interval: {settings.collector_interval}s, "
+        f"workers: {workers}, queue: {queue_mode})"
+    )
+    
+    worker_pool = PollWorkerPool(workers) if workers > 1 else None
+    if worker_pool:
+        worker_pool.start()
+    
+    metrics_server = await start_metrics_server()
     
     # Initial wait for database to be ready
     await asyncio.sleep(5)
     
-    while True:
-        try:
-            await poll_all_devices()
-        except Exception as e:
-            logger.error(f"Poll cycle error: {e}")
+    try:
+        if queue_mode == "redis":
+            await run_queue_collector(worker_pool)
+            return
         
-        await asyncio.sleep(settings.collector_interval)
+        await run_scheduled_collector(worker_pool)
+    finally:
+        if worker_pool:
+            worker_pool.stop()
+        if metrics_server:
+            metrics_server.close()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
-
+    parser = argparse.ArgumentParser(description="SNMP collector service")
+    parser.add_argument(
+        "--workers", type=int, default=settings.collector_workers,
+        help="Number of poll worker processes (1 = poll in this process)"
+    )
+    parser.add_argument(
+        "--queue", choices=["local", "redis"], default=settings.collector_queue,
+        help="local: schedule devices in this collector; redis: share devices with other collectors"
+    )
+    args = parser.parse_args()
+    asyncio.run(main(max(1, args.workers), args.queue))
@@ -25,10 +25,52 @@ class Settings(BaseSettings):
     snmp_default_community: str = "public"
     snmp_timeout: int = 5
     snmp_retries: int = 2
+    snmp_port: int = 161  # UDP port of the device agents (the simulator listens on 1161)
+    snmp_pool_idle_timeout: int = 900  # Evict cached SNMP targets idle this long
+    snmp_max_repetitions: int = 25  # GETBULK max-repetitions, 0 = always use getNext
+    snmp_walk_max_rows: int = 10000  # Safety cap on rows returned by a single walk
+    snmp_device_max_inflight: int = 2  # Outstanding requests allowed per device
+    snmp_backend: str = "pysnmp"  # "pysnmp" or "native" (asyncio v1/v2c engine)
+    snmp_adaptive_timeout: bool = True  # Derive per-device timeouts from measured RTT
+    snmp_timeout_min: float = 1.0  # Lower bound for adaptive timeouts (snmp_timeout is the upper), RFC 6298 minimum RTO
+    snmp_capability_reprobe_interval: int = 86400  # Re-learn each device's SNMP capabilities this often
+    snmp_change_detection: bool = True  # Re-walk neighbor/ifDescr tables only when their LastChange moves
+    snmp_table_cache_max_age: int = 3600  # Re-walk cached tables at least this often
+    
+    # DNS Settings (neighbor auto-discovery)
+    dns_cache_ttl: int = 300  # Seconds a resolved name is reused
+    dns_negative_ttl: int = 600  # Seconds before a name that failed to resolve is tried again
+    dns_max_concurrent: int = 8  # Lookups in flight at once, each in its own resolver thread
+    dns_timeout: float = 2.0
+    neighbor_probe_timeout: float = 2.0  # SNMP probe of an unknown neighbor, sent once
+    neighbor_probe_failure_ttl: int = 3600  # Seconds before a neighbor that did not answer is probed again
+    neighbor_probe_concurrent: int = 4  # Probes in flight at once, outside the collector's writer
+    neighbor_probe_queue_size: int = 1000  # Neighbors waiting for a probe, the rest wait for the next poll
     
     # Collector Settings
     collector_interval: int = 300  # 5 minutes
-    collector_concurrent: int = 20
+    collector_type_intervals: str = ""  # Per device type overrides, e.g. "core=60,access=600"
+    collector_inventory_interval: int = 900  # Device info/neighbor tier, counters follow the poll interval
+    collector_concurrent: int = 20  # Concurrent device polls per process
+    collector_workers: int = 1  # Poll worker processes, devices are sharded across them
+    collector_queue: str = "local"  # "local" or "redis" (share devices between collector hosts)
+    collector_lease_ttl: int = 60  # Redis queue: seconds before a silent collector's devices move
+    collector_write_batch_size: int = 200  # Poll results committed per database transaction
+    collector_write_interval: float = 1.0  # Seconds to wait for a batch to fill before committing
+    collector_write_queue_size: int = 1000  # Results waiting for the writer before pollers block
+    collector_load_shedding: bool = True  # Pause inventory polls and defer low-priority devices when saturated
+    collector_shed_lag: int = 60  # Seconds polls may fall behind schedule before shedding starts, 0 = never
+    collector_priority_types: str = "core,distribution"  # Device types polled first while shedding
+    collector_defer_types: str = "access"  # Device types that skip a slot while shedding
+    collector_metrics_host: str = "0.0.0.0"
+    collector_metrics_port: int = 9105  # Collector /metrics endpoint, 0 = disabled
+    collector_metrics_url: Optional[str] = None  # API: collector metrics base URL mirrored into /health
+    
+    # Time Series Settings
+    timeseries_enabled: bool = True  # Record interface/link/device metric history
+    timeseries_path: str = "./data/timeseries"
+    timeseries_step: int = 30  # Raw sample grid in seconds, must divide 60
+    timeseries_retention: str = "raw=2,1m=14,5m=90,1h=730"  # Days kept per resolution
     
     # Discovery Settings
     discovery_enabled: bool = True
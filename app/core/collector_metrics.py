@@ -0,0 +1,251 @@
+"""
+Collector Metrics - Counters, gauges and histograms of the collector's own work
+Rendered in the Prometheus text exposition format and as a JSON summary;
+worker processes report per-poll stats in their results, so everything is
+recorded in the main collector process
+"""
+import bisect
+import math
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Bucket upper bounds
+RTT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+CYCLE_BUCKETS = (1.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1200.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 5000, 10000)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+    
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(labels)
+    
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+    
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Monotonic count"""
+    kind = "counter"
+    
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        super().__init__(name, help_text, labels)
+        self.values: Dict[LabelValues, float] = {}
+    
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+    
+    def render(self) -> List[str]:
+        return self.header() + [
+            f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+            for key, value in sorted(self.values.items())
+        ]
+    
+    def summary(self):
+        if not self.label_names:
+            return self.values.get((), 0)
+        return {",".join(key): value for key, value in sorted(self.values.items())}
+
+
+class Gauge(Counter):
+    """Value that goes up and down"""
+    kind = "gauge"
+    
+    def set(self, value: float, **labels):
+        self.values[self._key(labels)] = value
+
+
+class _HistogramSeries:
+    __slots__ = ("counts", "total", "count")
+    
+    def __init__(self, buckets: int):
+        self.counts = [0] * (buckets + 1)
+        self.total = 0.0
+        self.count = 0
+
+
+class Histogram(_Metric):
+    """Distribution over fixed buckets"""
+    kind = "histogram"
+    
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float], labels: Sequence[str] = ()):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+        self.series: Dict[LabelValues, _HistogramSeries] = {}
+    
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = _HistogramSeries(len(self.buckets))
+        series.counts[bisect.bisect_left(self.buckets, value)] += 1
+        series.total += value
+        series.count += 1
+    
+    def quantile(self, q: float, **labels) -> Optional[float]:
+        """Estimate from the buckets like Prometheus' histogram_quantile"""
+        series = self.series.get(self._key(labels))
+        if series is None or not series.count:
+            return None
+        rank = q * series.count
+        seen = 0
+        for i, count in enumerate(series.counts):
+            if seen + count >= rank and count:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+    
+    def render(self) -> List[str]:
+        lines = self.header()
+        for key, series in sorted(self.series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), series.counts):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series.total)}")
+            lines.append(f"{self.name}_count{labels} {series.count}")
+        return lines
+    
+    def summary(self) -> Dict:
+        result = {}
+        for key, series in sorted(self.series.items()):
+            labels = dict(zip(self.label_names, key))
+            result[",".join(key) or "all"] = {
+                "count": series.count,
+                "mean": round(series.total / series.count, 4) if series.count else None,
+                **{
+                    name: round(value, 6) if value is not None else None
+                    for name, value in (
+                        ("p50", self.quantile(0.5, **labels)),
+                        ("p95", self.quantile(0.95, **labels)),
+                        ("p99", self.quantile(0.99, **labels))
+                    )
+                }
+            }
+        return result
+
+
+class CollectorMetrics:
+    """The collector's metrics, one instance per collector process"""
+    
+    def __init__(self):
+        self.snmp_rtt = Histogram(
+            "topomon_snmp_rtt_seconds", "Round-trip time of answered SNMP requests", RTT_BUCKETS
+        )
+        self.snmp_requests = Counter("topomon_snmp_requests_total", "SNMP request PDUs sent, retransmits included")
+        self.snmp_timeouts = Counter("topomon_snmp_timeouts_total", "SNMP requests that timed out")
+        self.pdus_per_poll = Histogram(
+            "topomon_poll_pdus", "SNMP request PDUs per device poll", COUNT_BUCKETS, ["tier"]
+        )
+        self.walk_rows = Histogram(
+            "topomon_poll_walk_rows", "Table rows walked per device poll", COUNT_BUCKETS, ["tier"]
+        )
+        self.phase_seconds = Histogram(
+            "topomon_poll_phase_seconds", "Time spent in each phase of a device poll", DURATION_BUCKETS, ["phase"]
+        )
+        self.poll_seconds = Histogram(
+            "topomon_poll_seconds", "Duration of a device poll", DURATION_BUCKETS, ["tier"]
+        )
+        self.polls = Counter("topomon_polls_total", "Device polls by tier and outcome", ["tier", "result"])
+        self.db_write_seconds = Histogram(
+            "topomon_db_write_seconds", "Duration of one batched result write transaction", DURATION_BUCKETS
+        )
+        self.db_write_batch = Histogram(
+            "topomon_db_write_batch_size", "Poll results written per transaction", COUNT_BUCKETS
+        )
+        self.write_queue_depth = Gauge("topomon_write_queue_depth", "Poll results waiting for the writer")
+        self.topology_seconds = Histogram(
+            "topomon_topology_update_seconds", "Merged link rebuild and alert check duration", CYCLE_BUCKETS
+        )
+        self.cycle_seconds = Histogram(
+            "topomon_poll_cycle_seconds", "Duration of a full one-shot poll cycle", CYCLE_BUCKETS
+        )
+        self.polls_running = Gauge("topomon_polls_running", "Device polls in flight", ["tier"])
+        self.scheduled_devices = Gauge("topomon_scheduled_devices", "Devices on each tier's schedule", ["tier"])
+        self.schedule_overruns = Gauge(
+            "topomon_schedule_overruns", "Polls that came due while the previous one was still running", ["tier"]
+        )
+        self.schedule_lag = Gauge("topomon_schedule_max_lag_seconds", "Largest poll start delay", ["tier"])
+        self.schedule_shed = Gauge("topomon_schedule_shed", "Due polls skipped by load shedding", ["tier"])
+        self.polls_shed = Counter("topomon_polls_shed_total", "Due polls skipped by load shedding", ["tier"])
+        self.load_shedding = Gauge("topomon_load_shedding", "1 while the collector is shedding load")
+        self.deadline_misses = Counter(
+            "topomon_deadline_misses_total", "Polls that finished after the device's next poll was due", ["tier"]
+        )
+        self.stale_devices = Gauge("topomon_stale_devices", "Devices flagged stale at the last check")
+    
+    @property
+    def all(self) -> List[_Metric]:
+        return [value for value in vars(self).values() if isinstance(value, _Metric)]
+    
+    def observe_poll(self, result: Dict):
+        """Record the stats a finished poll carries (from this process or a worker)"""
+        tier = result.get("tier", "")
+        self.polls.inc(tier=tier, result="skipped" if result.get("skipped") else
+                       "ok" if result.get("success") else "failed")
+        if result.get("duration") is not None:
+            self.poll_seconds.observe(result["duration"], tier=tier)
+        if result.get("deadline_missed"):
+            self.deadline_misses.inc(tier=tier)
+        
+        stats = result.get("stats")
+        if not stats:
+            return
+        self.snmp_requests.inc(stats["pdus"])
+        self.snmp_timeouts.inc(stats["timeouts"])
+        self.pdus_per_poll.observe(stats["pdus"], tier=tier)
+        self.walk_rows.observe(stats["walk_rows"], tier=tier)
+        for rtt in stats["rtt"]:
+            self.snmp_rtt.observe(rtt)
+        for phase, seconds in stats["phases"].items():
+            self.phase_seconds.observe(seconds, phase=phase)
+    
+    def render(self) -> str:
+        """Prometheus text exposition format"""
+        lines = []
+        for metric in self.all:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+    
+    def summary(self) -> Dict:
+        """Compact JSON view for /health"""
+        return {metric.name: metric.summary() for metric in self.all}
+
+
+# Global metrics instance
+_metrics: Optional[CollectorMetrics] = None
+
+
+def get_collector_metrics() -> CollectorMetrics:
+    """Get or create the global collector metrics"""
+    global _metrics
+    if _metrics is None:
+        _metrics = CollectorMetrics()
+    return _metrics
@@ -99,18 +99,20 @@ class DiscoveryScheduler:
     async def probe_device(self, ip: str) -> dict:
         """Probe a single IP for SNMP response"""
         try:
-            from pysnmp.hlapi.asyncio import (
-                getCmd, SnmpEngine, CommunityData,
-                UdpTransportTarget, ContextData, ObjectType, ObjectIdentity
-            )
+            from pysnmp.hlapi.asyncio import getCmd, ObjectType, ObjectIdentity
             from app.core.snmp_oids import detect_vendor, SYS_NAME, SYS_DESCR
+            from app.core.snmp_engine_pool import SnmpCredentials, get_engine_pool
+            
+            engine, auth_data, target, context = get_engine_pool().acquire(
+                ip, SnmpCredentials(community=self.community), timeout=2.0, retries=0
+            )
             
             # Try SNMP GET sysName and sysDescr
             error_indication, error_status, error_index, var_binds = await getCmd(
-                SnmpEngine(),
-                CommunityData(self.community),
-                UdpTransportTarget((ip, 161), timeout=2.0, retries=0),
-                ContextData(),
+                engine,
+                auth_data,
+                target,
+                context,
                 ObjectType(ObjectIdentity(SYS_NAME)),
                 ObjectType(ObjectIdentity(SYS_DESCR))
             )
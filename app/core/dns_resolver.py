@@ -0,0 +1,129 @@
+"""
+DNS Resolver - Non-blocking hostname lookups with a TTL cache
+Lookups run getaddrinfo in the resolver's own threads, so a slow DNS server
+never stalls SNMP polls or takes threads from the default executor; answers
+and failures are both cached
+"""
+import asyncio
+import ipaddress
+import logging
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Oldest entries are dropped past this many cached names
+_MAX_ENTRIES = 10000
+
+
+class DnsResolver:
+    """Resolve hostnames to IPv4 addresses, caching hits for ttl and misses for negative_ttl seconds"""
+    
+    def __init__(self, ttl: int = 300, negative_ttl: int = 600, max_concurrent: int = 8, timeout: float = 2.0):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_concurrent = max(1, max_concurrent)
+        self.timeout = timeout
+        self._cache: Dict[str, Tuple[Optional[str], float]] = {}  # name -> (ip or None, expires)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # A timed out lookup keeps its thread until getaddrinfo returns, so one thread per slot
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrent, thread_name_prefix="dns")
+        self.stats = {"hits": 0, "negative_hits": 0, "lookups": 0, "failures": 0}
+    
+    def _bind(self):
+        # Semaphore and shared lookups belong to one event loop
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+            self._inflight = {}
+    
+    def cached(self, name: str) -> Tuple[bool, Optional[str]]:
+        """(found, ip) from the cache without querying, ip is None for a cached failure"""
+        entry = self._cache.get(name)
+        if entry is None or entry[1] <= time.monotonic():
+            return False, None
+        return True, entry[0]
+    
+    async def resolve(self, name: str) -> Optional[str]:
+        """IPv4 address of name, None if it does not resolve"""
+        name = name.strip().rstrip(".").lower()
+        if not name:
+            return None
+        try:
+            return str(ipaddress.IPv4Address(name))
+        except ValueError:
+            pass
+        
+        found, ip = self.cached(name)
+        if found:
+            self.stats["hits" if ip else "negative_hits"] += 1
+            return ip
+        
+        self._bind()
+        # Concurrent callers for the same name share one lookup
+        lookup = self._inflight.get(name)
+        if lookup is None:
+            lookup = asyncio.ensure_future(self._lookup(name))
+            self._inflight[name] = lookup
+            lookup.add_done_callback(lambda _: self._inflight.pop(name, None))
+        return await asyncio.shield(lookup)
+    
+    async def _lookup(self, name: str) -> Optional[str]:
+        semaphore = self._semaphore
+        await semaphore.acquire()
+        self.stats["lookups"] += 1
+        lookup = self._loop.run_in_executor(
+            self._executor, socket.getaddrinfo, name, None, socket.AF_INET, socket.SOCK_DGRAM
+        )
+        
+        def done(future: asyncio.Future):
+            # The slot is free once the thread returns, not when the caller stops waiting
+            semaphore.release()
+            if not future.cancelled():
+                future.exception()
+        
+        lookup.add_done_callback(done)
+        ip = None
+        try:
+            infos = await asyncio.wait_for(asyncio.shield(lookup), self.timeout)
+            if infos:
+                ip = infos[0][4][0]
+        except (socket.gaierror, asyncio.TimeoutError, OSError) as e:
+            self.stats["failures"] += 1
+            logger.debug(f"DNS lookup failed for {name}: {e!r}")
+        
+        if len(self._cache) >= _MAX_ENTRIES:
+            now = time.monotonic()
+            self._cache = {k: v for k, v in self._cache.items() if v[1] > now}
+            while len(self._cache) >= _MAX_ENTRIES:
+                del self._cache[next(iter(self._cache))]
+        self._cache[name] = (ip, time.monotonic() + (self.ttl if ip else self.negative_ttl))
+        return ip
+    
+    def clear(self):
+        self._cache.clear()
+
+
+# Global resolver instance
+_resolver: Optional[DnsResolver] = None
+
+
+def get_dns_resolver() -> DnsResolver:
+    """Get or create the global DNS resolver"""
+    global _resolver
+    if _resolver is None:
+        settings = get_settings()
+        _resolver = DnsResolver(
+            ttl=settings.dns_cache_ttl,
+            negative_ttl=settings.dns_negative_ttl,
+            max_concurrent=settings.dns_max_concurrent,
+            timeout=settings.dns_timeout
+        )
+    return _resolver
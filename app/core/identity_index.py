@@ -0,0 +1,183 @@
+"""
+Device Identity Index - Maps the names a neighbor is known by to device ids
+LLDP/CDP report neighbors by sysName (short or FQDN), management address and
+chassis id; the index answers "which device is that" without a query
+"""
+import ipaddress
+import logging
+import re
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+
+from app.models.device import Device
+
+logger = logging.getLogger(__name__)
+
+_MAC_SEPARATORS = re.compile(r"[\s:.\-]")
+_HEX = re.compile(r"^[0-9a-f]{12}$")
+
+
+def normalize_hostname(name: Optional[str]) -> Optional[str]:
+    """Lower-case hostname without surrounding whitespace or the trailing root dot"""
+    if not name:
+        return None
+    name = name.strip().rstrip(".").lower()
+    return name or None
+
+
+def _short_name(name: str) -> Optional[str]:
+    """First label of an FQDN, None for single-label names and IP addresses"""
+    if "." not in name or normalize_address(name):
+        return None
+    return name.split(".", 1)[0]
+
+
+def normalize_address(value: Optional[str]) -> Optional[str]:
+    """Canonical IP address string, None if value is not one"""
+    if not value:
+        return None
+    try:
+        return str(ipaddress.ip_address(value.strip()))
+    except ValueError:
+        return None
+
+
+def normalize_chassis_id(value: Optional[str]) -> Optional[str]:
+    """
+    Comparable LLDP chassis id
+    MAC addresses (raw 6 octets, 0x-hex or any separator style) become 12 hex
+    digits; other chassis id subtypes are compared as lower-case text
+    """
+    if not value:
+        return None
+    if len(value) == 6 and not value.isprintable():
+        return value.encode("iso-8859-1").hex()
+    text = value.strip().lower()
+    if text.startswith("0x"):
+        text = text[2:]
+    compact = _MAC_SEPARATORS.sub("", text)
+    if _HEX.match(compact):
+        return compact
+    return text or None
+
+
+class DeviceIdentityIndex:
+    """
+    In-memory hostname/FQDN, address and chassis id lookup of device ids
+    Built from the device table once per cycle and updated as devices are added
+    """
+    
+    def __init__(self):
+        self._hostnames: Dict[str, int] = {}
+        self._short_names: Dict[str, Set[int]] = {}
+        self._addresses: Dict[str, int] = {}
+        self._chassis_ids: Dict[str, int] = {}
+        self._keys: Dict[int, List[Tuple[dict, str]]] = {}
+        self.built = False
+    
+    def __len__(self) -> int:
+        return len(self._keys)
+    
+    @classmethod
+    def from_devices(cls, devices: Iterable[Device]) -> "DeviceIdentityIndex":
+        index = cls()
+        index.rebuild((device.id, device.hostname, device.ip_address) for device in devices)
+        return index
+    
+    def rebuild(self, rows: Iterable[Tuple[int, str, Optional[str]]]):
+        """Replace the index with (device_id, hostname, ip_address) rows, learned chassis ids are kept"""
+        chassis_ids = self._chassis_ids
+        self.__init__()
+        for device_id, hostname, ip_address in rows:
+            self.add(device_id, hostname, ip_address)
+        self._chassis_ids = {k: v for k, v in chassis_ids.items() if v in self._keys}
+        for chassis_id, device_id in self._chassis_ids.items():
+            self._keys[device_id].append((self._chassis_ids, chassis_id))
+        self.built = True
+    
+    def add(self, device_id: int, hostname: Optional[str] = None, address: Optional[str] = None):
+        """Register a device under its hostname (and short name of an FQDN) and address"""
+        keys = self._keys.setdefault(device_id, [])
+        name = normalize_hostname(hostname)
+        if name:
+            self._hostnames[name] = device_id
+            keys.append((self._hostnames, name))
+            short = _short_name(name)
+            if short:
+                self._short_names.setdefault(short, set()).add(device_id)
+        address = normalize_address(address)
+        if address:
+            self._addresses[address] = device_id
+            keys.append((self._addresses, address))
+    
+    def learn(self, device_id: int, chassis_id: Optional[str] = None, address: Optional[str] = None):
+        """Remember another chassis id or management address a known device was reported with"""
+        if device_id not in self._keys:
+            return
+        for table, key in ((self._chassis_ids, normalize_chassis_id(chassis_id)),
+                           (self._addresses, normalize_address(address))):
+            if key and key not in table:
+                table[key] = device_id
+                self._keys[device_id].append((table, key))
+    
+    def remove(self, device_id: int):
+        for table, key in self._keys.pop(device_id, []):
+            if table.get(key) == device_id:
+                del table[key]
+        for ids in self._short_names.values():
+            ids.discard(device_id)
+    
+    def lookup(
+        self,
+        hostname: Optional[str] = None,
+        address: Optional[str] = None,
+        chassis_id: Optional[str] = None
+    ) -> Optional[int]:
+        """Device id for any of the identities, most specific first"""
+        key = normalize_chassis_id(chassis_id)
+        if key and key in self._chassis_ids:
+            return self._chassis_ids[key]
+        
+        key = normalize_address(address)
+        if key and key in self._addresses:
+            return self._addresses[key]
+        
+        name = normalize_hostname(hostname)
+        if not name:
+            return None
+        if name in self._hostnames:
+            return self._hostnames[name]
+        # "sw01.corp.local" reported for a device named "sw01", or the other way round
+        short = _short_name(name)
+        if short and short in self._hostnames:
+            return self._hostnames[short]
+        candidates = self._short_names.get(short or name)
+        if candidates and len(candidates) == 1:
+            return next(iter(candidates))
+        # A hostname that is an IP address (e.g. a CDP device id)
+        key = normalize_address(name)
+        return self._addresses.get(key) if key else None
+
+
+# Global index instance
+_index: Optional[DeviceIdentityIndex] = None
+
+
+def get_identity_index() -> DeviceIdentityIndex:
+    """Get or create the global identity index"""
+    global _index
+    if _index is None:
+        _index = DeviceIdentityIndex()
+    return _index
+
+
+async def refresh_identity_index(db) -> DeviceIdentityIndex:
+    """Rebuild the global index from the device table in one query"""
+    result = await db.execute(
+        select(Device.id, Device.hostname, Device.ip_address)
+    )
+    index = get_identity_index()
+    index.rebuild(result.all())
+    logger.debug(f"Identity index rebuilt with {len(index)} devices")
+    return index
@@ -0,0 +1,255 @@
+"""
+Neighbor Discovery - Adds unknown LLDP/CDP neighbors that answer SNMP
+The collector's writer only queues the neighbors of a committed batch; DNS
+lookups and SNMP probes run here in background tasks and every new device
+is inserted in its own short transaction. Neighbors that could not be
+resolved or did not answer are left alone for failure_ttl seconds
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.config import get_settings
+from app.db.database import async_session_maker
+from app.core.dns_resolver import get_dns_resolver
+from app.core.identity_index import get_identity_index, refresh_identity_index
+from app.core.log_exporter import get_log_exporter
+from app.models.device import Device
+
+logger = logging.getLogger(__name__)
+
+# Oldest failures are dropped past this many cached neighbors
+_MAX_FAILURES = 10000
+
+
+@dataclass(frozen=True)
+class NeighborCandidate:
+    """A neighbor reported by a device with auto-discovery enabled"""
+    parent_id: int
+    parent_hostname: str
+    community: str
+    remote_hostname: Optional[str]
+    remote_address: Optional[str]
+    remote_chassis_id: Optional[str]
+    
+    @property
+    def key(self) -> str:
+        return (self.remote_address or self.remote_hostname or self.remote_chassis_id or "").lower()
+
+
+class NeighborDiscovery:
+    """Probe unknown neighbors in the background, remembering failures for failure_ttl seconds"""
+    
+    def __init__(
+        self,
+        port: int = 161,
+        timeout: float = 2.0,
+        failure_ttl: int = 3600,
+        max_concurrent: int = 4,
+        queue_size: int = 1000
+    ):
+        self.port = port
+        self.timeout = timeout
+        self.failure_ttl = failure_ttl
+        self.max_concurrent = max(1, max_concurrent)
+        self.queue_size = max(1, queue_size)
+        self._failed: Dict[str, float] = {}  # candidate key -> retry after (monotonic)
+        self._queued: Set[str] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._add_lock: Optional[asyncio.Lock] = None
+        self._workers: List[asyncio.Task] = []
+        self.stats = {"queued": 0, "dropped": 0, "probed": 0, "failed": 0, "added": 0}
+    
+    def _bind(self):
+        # Queue, lock and workers belong to one event loop
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+            self._add_lock = asyncio.Lock()
+            self._queued = set()
+            self._workers = [loop.create_task(self._work()) for _ in range(self.max_concurrent)]
+    
+    def submit(self, parent: Device, neighbors: List, community: str) -> int:
+        """Queue the unknown neighbors of parent without waiting, returns how many were queued"""
+        if not neighbors:
+            return 0
+        self._bind()
+        index = get_identity_index()
+        now = time.monotonic()
+        queued = 0
+        for neighbor in neighbors:
+            candidate = NeighborCandidate(
+                parent_id=parent.id,
+                parent_hostname=parent.hostname,
+                community=community,
+                remote_hostname=neighbor.remote_hostname,
+                remote_address=neighbor.remote_address,
+                remote_chassis_id=neighbor.remote_chassis_id
+            )
+            key = candidate.key
+            if not key or key in self._queued or self._failed.get(key, 0) > now:
+                continue
+            if index.built and index.lookup(
+                neighbor.remote_hostname, neighbor.remote_address, neighbor.remote_chassis_id
+            ) is not None:
+                continue
+            try:
+                self._queue.put_nowait(candidate)
+            except asyncio.QueueFull:
+                # The parent reports it again on its next inventory poll
+                self.stats["dropped"] += 1
+                break
+            self._queued.add(key)
+            self.stats["queued"] += 1
+            queued += 1
+        return queued
+    
+    async def join(self):
+        """Wait until every queued neighbor has been handled"""
+        if self._queue is not None:
+            await self._queue.join()
+    
+    async def _work(self):
+        while True:
+            candidate = await self._queue.get()
+            try:
+                await self._discover(candidate)
+            except Exception as e:
+                logger.error(f"Error discovering neighbor {candidate.remote_hostname}: {e}")
+            finally:
+                self._queued.discard(candidate.key)
+                self._queue.task_done()
+    
+    def _remember_failure(self, candidate: NeighborCandidate):
+        if len(self._failed) >= _MAX_FAILURES:
+            now = time.monotonic()
+            self._failed = {k: v for k, v in self._failed.items() if v > now}
+            while len(self._failed) >= _MAX_FAILURES:
+                del self._failed[next(iter(self._failed))]
+        self._failed[candidate.key] = time.monotonic() + self.failure_ttl
+        self.stats["failed"] += 1
+    
+    async def _discover(self, candidate: NeighborCandidate):
+        """Resolve, probe and add one neighbor"""
+        index = get_identity_index()
+        if not index.built:
+            async with async_session_maker() as db:
+                await refresh_identity_index(db)
+        if index.lookup(candidate.remote_hostname, candidate.remote_address, candidate.remote_chassis_id) is not None:
+            return  # Already exists
+        
+        # Method 1: Management address advertised in lldpRemManAddrTable/cdpCacheAddress
+        neighbor_ip = candidate.remote_address
+        
+        # Method 2: Check if remote_chassis_id looks like an IP
+        if not neighbor_ip and candidate.remote_chassis_id:
+            parts = candidate.remote_chassis_id.split('.')
+            if len(parts) == 4 and all(p.isdigit() and int(p) <= 255 for p in parts):
+                neighbor_ip = candidate.remote_chassis_id
+        
+        # Method 3: Try DNS resolution (cached, failures included, off the event loop)
+        if not neighbor_ip and candidate.remote_hostname:
+            neighbor_ip = await get_dns_resolver().resolve(candidate.remote_hostname)
+        
+        if not neighbor_ip:
+            logger.debug(f"Could not resolve IP for neighbor {candidate.remote_hostname}")
+            self._remember_failure(candidate)
+            return
+        
+        if index.lookup(address=neighbor_ip) is not None:
+            return  # Already exists
+        
+        self.stats["probed"] += 1
+        answer = await self._probe(neighbor_ip, candidate.community)
+        if answer is None:
+            self._remember_failure(candidate)
+            return
+        hostname, vendor = answer
+        
+        # Workers probe concurrently, only one at a time checks and inserts
+        async with self._add_lock:
+            if index.lookup(hostname) is not None or index.lookup(address=neighbor_ip) is not None:
+                # Reached under a name and address we did not know, but already managed
+                return
+            
+            async with async_session_maker() as db:
+                new_device = Device(
+                    hostname=hostname,
+                    ip_address=neighbor_ip,
+                    snmp_community=candidate.community,
+                    device_type="access",
+                    vendor=vendor,
+                    status="managed",
+                    auto_discover=True,
+                    parent_device_id=candidate.parent_id,
+                    last_seen=datetime.utcnow()
+                )
+                db.add(new_device)
+                await db.commit()
+            
+            # Known from now on, also under the name its neighbor reported
+            index.add(new_device.id, hostname, neighbor_ip)
+            index.add(new_device.id, candidate.remote_hostname)
+            index.learn(new_device.id, chassis_id=candidate.remote_chassis_id)
+        
+        self.stats["added"] += 1
+        logger.info(f"Auto-discovered neighbor: {hostname} ({neighbor_ip}) via {candidate.parent_hostname}")
+        await get_log_exporter().log_discovery(
+            event_type="new_device",
+            device_hostname=hostname,
+            device_ip=neighbor_ip,
+            extra={"discovered_via": candidate.parent_hostname}
+        )
+    
+    async def _probe(self, ip: str, community: str) -> Optional[Tuple[str, str]]:
+        """(sysName, vendor) of the agent at ip, None if it does not answer"""
+        from pysnmp.hlapi.asyncio import getCmd, ObjectType, ObjectIdentity
+        from app.core.snmp_oids import detect_vendor, SYS_NAME, SYS_DESCR
+        from app.core.snmp_engine_pool import SnmpCredentials, get_engine_pool
+        
+        try:
+            engine, auth_data, target, context = get_engine_pool().acquire(
+                ip, SnmpCredentials(community=community), timeout=self.timeout, retries=0, port=self.port
+            )
+            error_indication, error_status, error_index, var_binds = await getCmd(
+                engine,
+                auth_data,
+                target,
+                context,
+                ObjectType(ObjectIdentity(SYS_NAME)),
+                ObjectType(ObjectIdentity(SYS_DESCR))
+            )
+        except Exception as e:
+            logger.debug(f"SNMP probe failed for {ip}: {e}")
+            return None
+        
+        if error_indication or error_status or not var_binds:
+            logger.debug(f"SNMP failed for neighbor {ip}")
+            return None
+        
+        sys_descr = var_binds[1][1].prettyPrint() if len(var_binds) > 1 else ""
+        return var_binds[0][1].prettyPrint(), detect_vendor(sys_descr)
+
+
+# Global neighbor discovery instance
+_discovery: Optional[NeighborDiscovery] = None
+
+
+def get_neighbor_discovery() -> NeighborDiscovery:
+    """Get or create the global neighbor discovery"""
+    global _discovery
+    if _discovery is None:
+        settings = get_settings()
+        _discovery = NeighborDiscovery(
+            port=settings.snmp_port,
+            timeout=settings.neighbor_probe_timeout,
+            failure_ttl=settings.neighbor_probe_failure_ttl,
+            max_concurrent=settings.neighbor_probe_concurrent,
+            queue_size=settings.neighbor_probe_queue_size
+        )
+    return _discovery
@@ -0,0 +1,192 @@
+"""
+Poll Scheduler - Per-device next-due times in a heap
+Each device is polled on its own interval grid, spread across the interval,
+instead of all devices at once behind a global cycle barrier
+"""
+import heapq
+import itertools
+import logging
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def parse_type_intervals(value: str) -> Dict[str, int]:
+    """Parse "core=60,access=300" into {device_type: seconds}"""
+    intervals = {}
+    for item in value.split(","):
+        if "=" not in item:
+            continue
+        device_type, seconds = item.split("=", 1)
+        try:
+            intervals[device_type.strip()] = int(seconds)
+        except ValueError:
+            logger.warning(f"Ignoring invalid poll interval '{item.strip()}'")
+    return intervals
+
+
+@dataclass
+class SchedulerStats:
+    """Counters since the scheduler started"""
+    completed: int = 0
+    overruns: int = 0
+    shed: int = 0  # Due polls skipped to the next slot under load shedding
+    max_lag: float = 0.0  # Longest time a device waited past its due time
+
+
+class PollScheduler:
+    """Min-heap of (due_time, device_id) with lazy removal"""
+    
+    def __init__(self, default_interval: int, type_intervals: Optional[Dict[str, int]] = None):
+        self.default_interval = default_interval
+        self.type_intervals = type_intervals or {}
+        self.stats = SchedulerStats()
+        self._heap: List[Tuple[float, int, int]] = []
+        self._generation: Dict[int, int] = {}  # device_id -> generation of its live heap entry
+        self._generations = itertools.count(1)
+        self._intervals: Dict[int, int] = {}
+        self._running: Dict[int, float] = {}  # device_id -> due time it was started for
+    
+    def interval_for(self, device_type: Optional[str], poll_interval: Optional[int] = None) -> int:
+        """Per-device interval, else per-type interval, else the default"""
+        if poll_interval:
+            return poll_interval
+        return self.type_intervals.get(device_type or "", self.default_interval)
+    
+    def __len__(self) -> int:
+        return len(self._intervals)
+    
+    def __contains__(self, device_id: int) -> bool:
+        return device_id in self._intervals
+    
+    def _push(self, device_id: int, due: float):
+        generation = next(self._generations)
+        self._generation[device_id] = generation
+        heapq.heappush(self._heap, (due, device_id, generation))
+    
+    def sync(self, intervals: Dict[int, int], now: Optional[float] = None):
+        """
+        Make the schedule hold exactly these devices ({device_id: interval})
+        
+        The first sync spreads devices evenly over their interval; devices added
+        later start at a stable hash-derived offset into their interval
+        """
+        now = now if now is not None else time.time()
+        initial = not self._intervals
+        
+        for device_id in [d for d in self._intervals if d not in intervals]:
+            del self._intervals[device_id]
+            self._generation.pop(device_id, None)
+        
+        new_devices = sorted(d for d in intervals if d not in self._intervals)
+        for position, device_id in enumerate(new_devices):
+            interval = intervals[device_id]
+            if initial:
+                fraction = position / len(new_devices)
+            else:
+                fraction = (zlib.crc32(str(device_id).encode()) % 1000) / 1000
+            self._intervals[device_id] = interval
+            if device_id not in self._running:
+                self._push(device_id, now + fraction * interval)
+        
+        # Interval changes take effect from the next completion
+        self._intervals.update(intervals)
+    
+    def pop_due(self, limit: int, now: Optional[float] = None) -> List[Tuple[int, float]]:
+        """Take up to limit devices that are due, returns [(device_id, due_time)]"""
+        now = now if now is not None else time.time()
+        due = []
+        while self._heap and len(due) < limit and self._heap[0][0] <= now:
+            due_at, device_id, generation = heapq.heappop(self._heap)
+            if self._generation.get(device_id) != generation:
+                continue
+            del self._generation[device_id]
+            self._running[device_id] = due_at
+            due.append((device_id, due_at))
+        return due
+    
+    def requeue(self, device_id: int, due: float):
+        """Put a device taken by pop_due back, still due at the same time"""
+        if self._running.pop(device_id, None) is not None and device_id in self._intervals:
+            self._push(device_id, due)
+    
+    def shed(self, device_id: int, now: Optional[float] = None):
+        """Skip a device taken by pop_due without polling it, to its next slot on the grid"""
+        now = now if now is not None else time.time()
+        due = self._running.pop(device_id, None)
+        interval = self._intervals.get(device_id)
+        if due is None or interval is None:
+            return
+        self.stats.shed += 1
+        self._push(device_id, due + (int((now - due) // interval) + 1) * interval)
+    
+    def oldest_lag(self, now: Optional[float] = None) -> float:
+        """Seconds the longest-waiting due device is past its due time"""
+        now = now if now is not None else time.time()
+        self.next_due_in(now)
+        return max(0.0, now - self._heap[0][0]) if self._heap else 0.0
+    
+    def overdue(self, now: Optional[float] = None) -> List[int]:
+        """Devices still waiting one full interval past their due time (their data is stale)"""
+        now = now if now is not None else time.time()
+        return [
+            device_id for due, device_id, generation in self._heap
+            if self._generation.get(device_id) == generation
+            and due + self._intervals.get(device_id, 0) <= now
+        ]
+    
+    def deadline_of(self, device_id: int, due: float) -> float:
+        """A poll due at due should finish before the device's next slot"""
+        return due + self._intervals.get(device_id, self.default_interval)
+    
+    def next_due_in(self, now: Optional[float] = None) -> Optional[float]:
+        """Seconds until the next device is due, None if nothing is scheduled"""
+        now = now if now is not None else time.time()
+        while self._heap and self._generation.get(self._heap[0][1]) != self._heap[0][2]:
+            heapq.heappop(self._heap)
+        if not self._heap:
+            return None
+        return max(0.0, self._heap[0][0] - now)
+    
+    def complete(self, device_id: int, started_at: Optional[float] = None, now: Optional[float] = None) -> bool:
+        """
+        Reschedule a device after its poll finished
+        
+        Args:
+            started_at: when the poll actually started, for lag accounting
+        
+        Returns:
+            True if the poll overran, i.e. finished after its next due time
+        """
+        now = now if now is not None else time.time()
+        due = self._running.pop(device_id, None)
+        interval = self._intervals.get(device_id)
+        if due is None or interval is None:
+            # Device was removed while it was being polled
+            return False
+        
+        self.stats.completed += 1
+        if started_at is not None:
+            self.stats.max_lag = max(self.stats.max_lag, started_at - due)
+        
+        next_due = due + interval
+        overran = next_due <= now
+        if overran:
+            # Skip the missed slots but stay on the device's grid
+            missed = int((now - due) // interval)
+            next_due = due + (missed + 1) * interval
+            self.stats.overruns += 1
+            logger.warning(
+                f"Poll of device {device_id} overran its {interval}s interval "
+                f"by {now - due - interval:.1f}s"
+            )
+        
+        self._push(device_id, next_due)
+        return overran
+    
+    @property
+    def running(self) -> int:
+        return len(self._running)
@@ -0,0 +1,178 @@
+"""
+Rate Engine - Interface bit rates from successive octet counter samples
+Keeps the previous counter sample per (device, ifIndex) and turns each batch
+of polls into bps with vectorized NumPy arithmetic, handling counter wraps,
+sysUpTime resets and other counter discontinuities
+"""
+import logging
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_MASK_32 = np.uint64(0xFFFFFFFF)
+_MASK_64 = np.uint64(0xFFFFFFFFFFFFFFFF)
+
+# A rate above the interface speed by more than this factor is a discontinuity, not traffic
+_SPEED_TOLERANCE = 1.1
+
+
+@dataclass
+class CounterSample:
+    """Octet counters of one device read in one poll"""
+    device_id: int
+    sampled_at: float  # Wall clock time the poll read the counters
+    sys_uptime: Optional[int]  # TimeTicks read in the same poll
+    hc_counters: bool  # 64-bit ifHC* counters, else 32-bit ifTable counters
+    if_index: np.ndarray
+    in_octets: np.ndarray
+    out_octets: np.ndarray
+    speed_mbps: np.ndarray
+    port_names: List[str]
+
+
+@dataclass
+class InterfaceRate:
+    """Bit rates of one interface over the last sample interval"""
+    port_name: str
+    speed_mbps: int
+    in_bps: int
+    out_bps: int
+
+
+def make_counter_sample(
+    device_id: int,
+    interface_stats: List,
+    sys_uptime: Optional[int],
+    hc_counters: bool,
+    sampled_at: Optional[float] = None
+) -> CounterSample:
+    """Build a sample from a poll's InterfaceStats, sorted by ifIndex"""
+    stats = sorted(interface_stats, key=lambda s: s.port_index)
+    return CounterSample(
+        device_id=device_id,
+        sampled_at=sampled_at if sampled_at is not None else time.time(),
+        sys_uptime=sys_uptime,
+        hc_counters=hc_counters,
+        if_index=np.array([s.port_index for s in stats], dtype=np.int64),
+        in_octets=np.array([s.in_octets for s in stats], dtype=np.uint64),
+        out_octets=np.array([s.out_octets for s in stats], dtype=np.uint64),
+        speed_mbps=np.array([s.speed_mbps for s in stats], dtype=np.float64),
+        port_names=[str(s.port_name) for s in stats]
+    )
+
+
+class RateEngine:
+    """Previous counter sample per device, rates computed a batch of devices at a time"""
+    
+    def __init__(self):
+        self._previous: Dict[int, CounterSample] = {}
+    
+    def _interval(self, previous: CounterSample, sample: CounterSample) -> Optional[float]:
+        """Seconds between two samples, None if the counters can't be compared"""
+        if previous.hc_counters != sample.hc_counters:
+            return None
+        if previous.sys_uptime is not None and sample.sys_uptime is not None:
+            if sample.sys_uptime < previous.sys_uptime:
+                # Agent restarted, every counter started again from zero
+                return None
+            # The agent's own clock, free of poll latency jitter
+            elapsed = (sample.sys_uptime - previous.sys_uptime) / 100
+            if elapsed > 0:
+                return elapsed
+        elapsed = sample.sampled_at - previous.sampled_at
+        return elapsed if elapsed > 0 else None
+    
+    def update(self, samples: List[CounterSample]) -> Dict[int, Dict[int, InterfaceRate]]:
+        """
+        Add a batch of samples and compute rates against each device's previous sample
+        
+        Returns:
+            {device_id: {ifIndex: InterfaceRate}} for interfaces with a valid rate;
+            the first sample of a device, or one after a discontinuity, gives none
+        """
+        # Line up current and previous counters of every device in flat arrays
+        device_ids, if_index, speed_mbps, port_names = [], [], [], []
+        intervals, masks = [], []
+        prev_in, prev_out, cur_in, cur_out = [], [], [], []
+        for sample in samples:
+            previous = self._previous.get(sample.device_id)
+            self._previous[sample.device_id] = sample
+            if previous is None:
+                continue
+            elapsed = self._interval(previous, sample)
+            if elapsed is None:
+                continue
+            
+            _, cur_pos, prev_pos = np.intersect1d(
+                sample.if_index, previous.if_index, assume_unique=True, return_indices=True
+            )
+            device_ids.append(np.full(len(cur_pos), sample.device_id))
+            if_index.append(sample.if_index[cur_pos])
+            speed_mbps.append(sample.speed_mbps[cur_pos])
+            port_names.extend(sample.port_names[i] for i in cur_pos)
+            intervals.append(np.full(len(cur_pos), elapsed))
+            masks.append(np.full(len(cur_pos), _MASK_64 if sample.hc_counters else _MASK_32))
+            cur_in.append(sample.in_octets[cur_pos])
+            cur_out.append(sample.out_octets[cur_pos])
+            prev_in.append(previous.in_octets[prev_pos])
+            prev_out.append(previous.out_octets[prev_pos])
+        
+        rates: Dict[int, Dict[int, InterfaceRate]] = {}
+        if not port_names:
+            return rates
+        
+        device_ids, if_index = np.concatenate(device_ids), np.concatenate(if_index)
+        speed_mbps = np.concatenate(speed_mbps)
+        elapsed = np.concatenate(intervals)
+        mask = np.concatenate(masks)
+        cur_in, cur_out = np.concatenate(cur_in), np.concatenate(cur_out)
+        prev_in, prev_out = np.concatenate(prev_in), np.concatenate(prev_out)
+        speed_bps = speed_mbps * 1_000_000
+        
+        # Unsigned subtraction wraps modulo 2^64, the mask folds it to the counter width
+        with np.errstate(over="ignore"):
+            delta_in = (cur_in - prev_in) & mask
+            delta_out = (cur_out - prev_out) & mask
+        in_bps = delta_in.astype(np.float64) * 8 / elapsed
+        out_bps = delta_out.astype(np.float64) * 8 / elapsed
+        
+        # A counter that went backwards wrapped, or was reset (interface re-init, counter
+        # clear); a reset shows up as a rate the interface can't carry. Without a known
+        # speed a 32-bit counter is assumed to have wrapped, a 64-bit one to have reset
+        backwards = (cur_in < prev_in) | (cur_out < prev_out)
+        limit = np.where(speed_bps > 0, speed_bps * _SPEED_TOLERANCE, np.inf)
+        unknown_reset = backwards & (mask == _MASK_64) & (speed_bps <= 0)
+        valid = ~unknown_reset & (in_bps <= limit) & (out_bps <= limit)
+        
+        discarded = int(np.count_nonzero(~valid))
+        if discarded:
+            logger.debug(f"Discarded {discarded} interface rates at counter discontinuities")
+        
+        for i in np.flatnonzero(valid):
+            rates.setdefault(int(device_ids[i]), {})[int(if_index[i])] = InterfaceRate(
+                port_name=port_names[i],
+                speed_mbps=int(speed_mbps[i]),
+                in_bps=int(in_bps[i]),
+                out_bps=int(out_bps[i])
+            )
+        return rates
+    
+    def forget(self, device_id: int):
+        """Drop the previous sample of a device"""
+        self._previous.pop(device_id, None)
+
+
+# Global engine instance
+_engine: Optional[RateEngine] = None
+
+
+def get_rate_engine() -> RateEngine:
+    """Get or create the global rate engine"""
+    global _engine
+    if _engine is None:
+        _engine = RateEngine()
+    return _engine
@@ -0,0 +1,127 @@
+"""
+RTT Estimator - Per-device SNMP round-trip time tracking
+Smoothed RTT and variance (TCP SRTT/RTTVAR, RFC 6298) drive per-request timeouts
+"""
+import math
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from app.config import get_settings
+
+# RFC 6298 smoothing gains
+_ALPHA = 0.125
+_BETA = 0.25
+_K = 4
+
+# Timeout before the first sample (RFC 6298 initial RTO)
+_INITIAL_RTO = 1.0
+
+# Cap on exponential backoff doublings
+_MAX_BACKOFF = 6
+
+# Timeouts are rounded up to this step so transport caches see few distinct values
+_TIMEOUT_STEP = 0.1
+
+
+@dataclass
+class RttEstimator:
+    """Smoothed round-trip time state for one device (seconds)"""
+    min_timeout: float = 1.0
+    max_timeout: float = 5.0
+    srtt: Optional[float] = None
+    rttvar: Optional[float] = None
+    backoff: int = 0
+    consecutive_failures: int = 0
+    samples: int = 0
+    
+    @property
+    def rto(self) -> float:
+        """Base retransmission timeout, without backoff"""
+        if self.srtt is None:
+            return min(self.max_timeout, _INITIAL_RTO)
+        return min(self.max_timeout, max(self.min_timeout, self.srtt + _K * self.rttvar))
+    
+    @property
+    def is_unresponsive(self) -> bool:
+        """True once a request exhausted its retries without any response"""
+        return self.consecutive_failures > 0
+    
+    def timeout(self) -> float:
+        """Timeout for the next attempt, including backoff"""
+        # An unresponsive device gets a single probe instead of a full backoff series
+        backoff = 1 if self.is_unresponsive else self.backoff
+        value = min(self.max_timeout, self.rto * (2 ** backoff))
+        return round(math.ceil(value / _TIMEOUT_STEP) * _TIMEOUT_STEP, 3)
+    
+    def retries(self, default: int) -> int:
+        """Retries for the next request, none while the device is unresponsive"""
+        return 0 if self.is_unresponsive else default
+    
+    def observe(self, rtt: float):
+        """Add an RTT sample from a request that was not retransmitted (Karn)"""
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = (1 - _BETA) * self.rttvar + _BETA * abs(self.srtt - rtt)
+            self.srtt = (1 - _ALPHA) * self.srtt + _ALPHA * rtt
+        self.samples += 1
+        self.backoff = 0
+        self.consecutive_failures = 0
+    
+    def on_response(self):
+        """A response arrived after a retransmit, no RTT sample but device is alive"""
+        self.consecutive_failures = 0
+    
+    def on_timeout(self):
+        """An attempt timed out, back off the next timeout"""
+        self.backoff = min(_MAX_BACKOFF, self.backoff + 1)
+    
+    def on_failure(self):
+        """A request timed out on every attempt"""
+        self.consecutive_failures += 1
+
+
+class RttTracker:
+    """Per-device RTT estimators shared by all collectors in the process"""
+    
+    def __init__(self, min_timeout: float = 1.0, max_timeout: float = 5.0):
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self._estimators: Dict[str, RttEstimator] = {}
+    
+    def get(self, ip: str) -> RttEstimator:
+        """Get or create the estimator for a device"""
+        estimator = self._estimators.get(ip)
+        if estimator is None:
+            estimator = RttEstimator(min_timeout=self.min_timeout, max_timeout=self.max_timeout)
+            self._estimators[ip] = estimator
+        return estimator
+    
+    def seed(self, ip: str, srtt_ms: Optional[float], rttvar_ms: Optional[float]):
+        """Restore persisted estimates for a device not seen by this process yet"""
+        if ip in self._estimators or srtt_ms is None:
+            return
+        estimator = self.get(ip)
+        estimator.srtt = srtt_ms / 1000
+        estimator.rttvar = (rttvar_ms if rttvar_ms is not None else srtt_ms / 2) / 1000
+    
+    def forget(self, ip: str):
+        """Drop the estimator for a device"""
+        self._estimators.pop(ip, None)
+
+
+# Global tracker instance
+_tracker: Optional[RttTracker] = None
+
+
+def get_rtt_tracker() -> RttTracker:
+    """Get or create the global RTT tracker"""
+    global _tracker
+    if _tracker is None:
+        settings = get_settings()
+        _tracker = RttTracker(
+            min_timeout=settings.snmp_timeout_min,
+            max_timeout=settings.snmp_timeout
+        )
+    return _tracker
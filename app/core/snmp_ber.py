@@ -0,0 +1,412 @@
+"""
+SNMP BER codec - Minimal encoder/decoder for SNMPv1/v2c messages
+Supports GET, GETNEXT and GETBULK requests and decodes Response PDUs;
+the agent side (decode requests, encode responses) serves the simulator
+"""
+from typing import List, Tuple, Any, Optional
+
+# ASN.1 / SNMP tags
+TAG_INTEGER = 0x02
+TAG_OCTET_STRING = 0x04
+TAG_NULL = 0x05
+TAG_OID = 0x06
+TAG_SEQUENCE = 0x30
+TAG_IP_ADDRESS = 0x40
+TAG_COUNTER32 = 0x41
+TAG_GAUGE32 = 0x42
+TAG_TIMETICKS = 0x43
+TAG_OPAQUE = 0x44
+TAG_COUNTER64 = 0x46
+TAG_NO_SUCH_OBJECT = 0x80
+TAG_NO_SUCH_INSTANCE = 0x81
+TAG_END_OF_MIB_VIEW = 0x82
+
+# PDU types
+PDU_GET = 0xA0
+PDU_GET_NEXT = 0xA1
+PDU_RESPONSE = 0xA2
+PDU_SET = 0xA3
+PDU_GET_BULK = 0xA5
+
+# Message versions
+VERSION_V1 = 0
+VERSION_V2C = 1
+
+ERROR_STATUS_NAMES = {
+    0: "noError", 1: "tooBig", 2: "noSuchName", 3: "badValue", 4: "readOnly",
+    5: "genErr", 6: "noAccess", 7: "wrongType", 8: "wrongLength",
+    9: "wrongEncoding", 10: "wrongValue", 11: "noCreation",
+    12: "inconsistentValue", 13: "resourceUnavailable", 14: "commitFailed",
+    15: "undoFailed", 16: "authorizationError", 17: "notWritable",
+    18: "inconsistentName"
+}
+
+
+class BerError(ValueError):
+    """Raised when a message cannot be decoded"""
+    pass
+
+
+class OctetString(bytes):
+    """OCTET STRING value, str() decodes like pysnmp's OctetString"""
+    
+    def __str__(self) -> str:
+        return self.decode("iso-8859-1")
+    
+    def asOctets(self) -> bytes:
+        return bytes(self)
+    
+    def prettyPrint(self) -> str:
+        text = self.decode("iso-8859-1")
+        if all(32 <= b < 127 or b in (9, 10, 13) for b in self):
+            return text
+        return "0x" + self.hex()
+
+
+class IpAddress(OctetString):
+    """IpAddress value (4 octets), str() gives dotted-quad"""
+    
+    def __str__(self) -> str:
+        return ".".join(str(b) for b in self)
+    
+    def prettyPrint(self) -> str:
+        return str(self)
+
+
+class ObjectIdentifier(tuple):
+    """OBJECT IDENTIFIER value, str() gives the dotted form"""
+    
+    def __str__(self) -> str:
+        return ".".join(str(x) for x in self)
+    
+    def prettyPrint(self) -> str:
+        return str(self)
+
+
+class ErrorStatus(int):
+    """PDU error-status with pysnmp-style prettyPrint()"""
+    
+    def prettyPrint(self) -> str:
+        return ERROR_STATUS_NAMES.get(int(self), str(int(self)))
+
+
+class _ExceptionValue:
+    """SNMPv2 exception value (noSuchObject, noSuchInstance, endOfMibView)"""
+    
+    def __init__(self, name: str):
+        self.name = name
+    
+    def __bool__(self) -> bool:
+        return False
+    
+    def __str__(self) -> str:
+        return ""
+    
+    def __repr__(self) -> str:
+        return self.name
+    
+    def prettyPrint(self) -> str:
+        return self.name
+
+
+NO_SUCH_OBJECT = _ExceptionValue("noSuchObject")
+NO_SUCH_INSTANCE = _ExceptionValue("noSuchInstance")
+END_OF_MIB_VIEW = _ExceptionValue("endOfMibView")
+
+
+def is_exception_value(value) -> bool:
+    """Check for noSuchObject/noSuchInstance/endOfMibView"""
+    return isinstance(value, _ExceptionValue)
+
+
+# =============================================================================
+# Encoding
+# =============================================================================
+
+def _encode_length(length: int) -> bytes:
+    if length < 0x80:
+        return bytes([length])
+    body = length.to_bytes((length.bit_length() + 7) // 8, "big")
+    return bytes([0x80 | len(body)]) + body
+
+
+def _tlv(tag: int, value: bytes) -> bytes:
+    return bytes([tag]) + _encode_length(len(value)) + value
+
+
+def encode_integer(value: int) -> bytes:
+    """Encode a signed INTEGER"""
+    length = max(1, (value + (value < 0)).bit_length() // 8 + 1)
+    return _tlv(TAG_INTEGER, value.to_bytes(length, "big", signed=True))
+
+
+def encode_oid(oid: Tuple[int, ...]) -> bytes:
+    """Encode an OBJECT IDENTIFIER from a tuple of arcs"""
+    if len(oid) < 2:
+        raise BerError(f"OID too short: {oid}")
+    
+    body = bytearray([oid[0] * 40 + oid[1]])
+    for arc in oid[2:]:
+        if arc < 0x80:
+            body.append(arc)
+            continue
+        chunk = []
+        while arc:
+            chunk.append(arc & 0x7F)
+            arc >>= 7
+        chunk.reverse()
+        body.extend([b | 0x80 for b in chunk[:-1]] + [chunk[-1]])
+    return _tlv(TAG_OID, bytes(body))
+
+
+def _encode_unsigned(tag: int, value: int) -> bytes:
+    # Leading zero octet keeps values with the high bit set positive
+    return _tlv(tag, value.to_bytes(value.bit_length() // 8 + 1, "big"))
+
+
+def encode_value(tag: int, value: Any) -> bytes:
+    """Encode a var-bind value of the given tag"""
+    if tag == TAG_INTEGER:
+        return encode_integer(value)
+    if tag in (TAG_COUNTER32, TAG_GAUGE32, TAG_TIMETICKS, TAG_COUNTER64):
+        return _encode_unsigned(tag, value)
+    if tag in (TAG_OCTET_STRING, TAG_OPAQUE, TAG_IP_ADDRESS):
+        return _tlv(tag, value.encode() if isinstance(value, str) else bytes(value))
+    if tag == TAG_OID:
+        return encode_oid(tuple(value))
+    if tag in (TAG_NULL, TAG_NO_SUCH_OBJECT, TAG_NO_SUCH_INSTANCE, TAG_END_OF_MIB_VIEW):
+        return bytes([tag, 0])
+    raise BerError(f"Unsupported value tag 0x{tag:02x}")
+
+
+def encode_var_bind(oid: Tuple[int, ...], tag: int, value: Any = None) -> bytes:
+    """Encode one (oid, value) var-bind SEQUENCE"""
+    return _tlv(TAG_SEQUENCE, encode_oid(oid) + encode_value(tag, value))
+
+
+def encode_response(
+    version: int,
+    community: str,
+    request_id: int,
+    var_binds: List[bytes],
+    error_status: int = 0,
+    error_index: int = 0
+) -> bytes:
+    """Encode a Response message from var-binds built by encode_var_bind()"""
+    pdu = _tlv(
+        PDU_RESPONSE,
+        encode_integer(request_id) + encode_integer(error_status) + encode_integer(error_index)
+        + _tlv(TAG_SEQUENCE, b"".join(var_binds))
+    )
+    return _tlv(
+        TAG_SEQUENCE,
+        encode_integer(version) + _tlv(TAG_OCTET_STRING, community.encode()) + pdu
+    )
+
+
+def encode_request(
+    version: int,
+    community: str,
+    pdu_type: int,
+    request_id: int,
+    oids: List[Tuple[int, ...]],
+    non_repeaters: int = 0,
+    max_repetitions: int = 0
+) -> bytes:
+    """Encode a GET/GETNEXT/GETBULK request message"""
+    null = bytes([TAG_NULL, 0])
+    var_binds = b"".join(_tlv(TAG_SEQUENCE, encode_oid(oid) + null) for oid in oids)
+    
+    # For GETBULK, error-status/error-index carry non-repeaters/max-repetitions
+    if pdu_type == PDU_GET_BULK:
+        field_a, field_b = non_repeaters, max_repetitions
+    else:
+        field_a, field_b = 0, 0
+    
+    pdu = _tlv(
+        pdu_type,
+        encode_integer(request_id) + encode_integer(field_a) + encode_integer(field_b)
+        + _tlv(TAG_SEQUENCE, var_binds)
+    )
+    return _tlv(
+        TAG_SEQUENCE,
+        encode_integer(version) + _tlv(TAG_OCTET_STRING, community.encode()) + pdu
+    )
+
+
+# =============================================================================
+# Decoding
+# =============================================================================
+
+def _read_tlv(data: bytes, pos: int) -> Tuple[int, int, int]:
+    """Read a TLV header, returns (tag, value_start, value_end)"""
+    try:
+        tag = data[pos]
+        length = data[pos + 1]
+        pos += 2
+        if length & 0x80:
+            n = length & 0x7F
+            if n == 0 or n > 4:
+                raise BerError("Unsupported length encoding")
+            length = int.from_bytes(data[pos:pos + n], "big")
+            pos += n
+    except IndexError:
+        raise BerError("Truncated message")
+    
+    end = pos + length
+    if end > len(data):
+        raise BerError("Truncated message")
+    return tag, pos, end
+
+
+def _decode_unsigned(data: bytes) -> int:
+    return int.from_bytes(data, "big", signed=False)
+
+
+def decode_oid(data: bytes) -> ObjectIdentifier:
+    """Decode OBJECT IDENTIFIER content octets"""
+    if not data:
+        raise BerError("Empty OID")
+    
+    first = data[0]
+    arcs = [first // 40, first % 40] if first < 80 else [2, first - 80]
+    value = 0
+    for b in data[1:]:
+        value = (value << 7) | (b & 0x7F)
+        if not b & 0x80:
+            arcs.append(value)
+            value = 0
+    return ObjectIdentifier(arcs)
+
+
+def _decode_value(tag: int, data: bytes) -> Any:
+    if tag == TAG_INTEGER:
+        return int.from_bytes(data, "big", signed=True)
+    if tag in (TAG_COUNTER32, TAG_GAUGE32, TAG_TIMETICKS, TAG_COUNTER64):
+        return _decode_unsigned(data)
+    if tag == TAG_OCTET_STRING or tag == TAG_OPAQUE:
+        return OctetString(data)
+    if tag == TAG_IP_ADDRESS:
+        return IpAddress(data)
+    if tag == TAG_OID:
+        return decode_oid(data)
+    if tag == TAG_NO_SUCH_OBJECT:
+        return NO_SUCH_OBJECT
+    if tag == TAG_NO_SUCH_INSTANCE:
+        return NO_SUCH_INSTANCE
+    if tag == TAG_END_OF_MIB_VIEW:
+        return END_OF_MIB_VIEW
+    if tag == TAG_NULL:
+        return None
+    raise BerError(f"Unsupported value tag 0x{tag:02x}")
+
+
+def decode_response(data: bytes) -> Tuple[int, int, int, List[Tuple[ObjectIdentifier, Any]]]:
+    """
+    Decode a Response message
+    
+    Returns:
+        (request_id, error_status, error_index, [(oid, value), ...])
+    """
+    tag, pos, end = _read_tlv(data, 0)
+    if tag != TAG_SEQUENCE:
+        raise BerError("Message is not a SEQUENCE")
+    
+    # version, community
+    tag, start, pos = _read_tlv(data, pos)
+    if tag != TAG_INTEGER:
+        raise BerError("Missing version")
+    tag, start, pos = _read_tlv(data, pos)
+    if tag != TAG_OCTET_STRING:
+        raise BerError("Missing community")
+    
+    pdu_tag, pos, pdu_end = _read_tlv(data, pos)
+    if pdu_tag != PDU_RESPONSE:
+        raise BerError(f"Unexpected PDU type 0x{pdu_tag:02x}")
+    
+    header = []
+    for _ in range(3):
+        tag, start, pos = _read_tlv(data, pos)
+        if tag != TAG_INTEGER:
+            raise BerError("Malformed PDU header")
+        header.append(int.from_bytes(data[start:pos], "big", signed=True))
+    
+    tag, pos, vbl_end = _read_tlv(data, pos)
+    if tag != TAG_SEQUENCE:
+        raise BerError("Malformed var-bind list")
+    
+    var_binds = []
+    while pos < vbl_end:
+        tag, pos, vb_end = _read_tlv(data, pos)
+        tag, start, pos = _read_tlv(data, pos)
+        if tag != TAG_OID:
+            raise BerError("Var-bind without OID")
+        oid = decode_oid(data[start:pos])
+        tag, start, pos = _read_tlv(data, pos)
+        var_binds.append((oid, _decode_value(tag, data[start:pos])))
+        pos = vb_end
+    
+    return header[0], header[1], header[2], var_binds
+
+
+def decode_request(data: bytes) -> Tuple[int, str, int, int, int, int, List[ObjectIdentifier]]:
+    """
+    Decode a GET/GETNEXT/GETBULK request message
+    
+    Returns:
+        (version, community, pdu_type, request_id, non_repeaters, max_repetitions, [oid, ...]),
+        the last two are 0 for anything but GETBULK
+    """
+    tag, pos, end = _read_tlv(data, 0)
+    if tag != TAG_SEQUENCE:
+        raise BerError("Message is not a SEQUENCE")
+    
+    tag, start, pos = _read_tlv(data, pos)
+    if tag != TAG_INTEGER:
+        raise BerError("Missing version")
+    version = int.from_bytes(data[start:pos], "big", signed=True)
+    tag, start, pos = _read_tlv(data, pos)
+    if tag != TAG_OCTET_STRING:
+        raise BerError("Missing community")
+    community = data[start:pos].decode("iso-8859-1")
+    
+    pdu_tag, pos, pdu_end = _read_tlv(data, pos)
+    if pdu_tag not in (PDU_GET, PDU_GET_NEXT, PDU_GET_BULK):
+        raise BerError(f"Unsupported PDU type 0x{pdu_tag:02x}")
+    
+    header = []
+    for _ in range(3):
+        tag, start, pos = _read_tlv(data, pos)
+        if tag != TAG_INTEGER:
+            raise BerError("Malformed PDU header")
+        header.append(int.from_bytes(data[start:pos], "big", signed=True))
+    if pdu_tag != PDU_GET_BULK:
+        header[1] = header[2] = 0
+    
+    tag, pos, vbl_end = _read_tlv(data, pos)
+    if tag != TAG_SEQUENCE:
+        raise BerError("Malformed var-bind list")
+    
+    oids = []
+    while pos < vbl_end:
+        tag, pos, vb_end = _read_tlv(data, pos)
+        tag, start, pos = _read_tlv(data, pos)
+        if tag != TAG_OID:
+            raise BerError("Var-bind without OID")
+        oids.append(decode_oid(data[start:pos]))
+        pos = vb_end
+    
+    return version, community, pdu_tag, header[0], header[1], header[2], oids
+
+
+def peek_request_id(data: bytes) -> Optional[int]:
+    """Extract the request-id without decoding var-binds, None if malformed"""
+    try:
+        tag, pos, end = _read_tlv(data, 0)
+        _, _, pos = _read_tlv(data, pos)
+        _, _, pos = _read_tlv(data, pos)
+        _, pos, _ = _read_tlv(data, pos)
+        tag, start, pos = _read_tlv(data, pos)
+        return int.from_bytes(data[start:pos], "big", signed=True)
+    except BerError:
+        return None
@@ -3,20 +3,116 @@ SNMP Collector - Collects LLDP/CDP and interface data from network devices
 """
 import asyncio
 import logging
-from typing import List, Dict, Optional, Any
-from dataclasses import dataclass
-from pysnmp.hlapi.asyncio import *
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Dict, Optional, Any, Tuple
+from dataclasses import dataclass, asdict, fields
+from pysnmp.proto.rfc1905 import EndOfMibView, NoSuchObject, NoSuchInstance
+from pysnmp.proto.errind import RequestTimedOut
 
 from app.core.snmp_oids import (
-    LLDP_REM_SYS_NAME, LLDP_REM_PORT_ID, LLDP_REM_CHASSIS_ID,
-    CDP_CACHE_DEVICE_ID, CDP_CACHE_DEVICE_PORT,
-    IF_DESCR, IF_HIGH_SPEED, IF_HC_IN_OCTETS, IF_HC_OUT_OCTETS,
+    LLDP_REM_SYS_NAME, LLDP_REM_PORT_ID, LLDP_REM_CHASSIS_ID, LLDP_REM_MAN_ADDR_IF_SUBTYPE,
+    LLDP_STATS_REM_LAST_CHANGE, CDP_CACHE_DEVICE_ID, CDP_CACHE_DEVICE_PORT, CDP_CACHE_ADDRESS,
+    CDP_GLOBAL_RUN,
+    IF_DESCR, IF_SPEED, IF_IN_OCTETS, IF_OUT_OCTETS,
+    IF_HIGH_SPEED, IF_HC_IN_OCTETS, IF_HC_OUT_OCTETS, IF_TABLE_LAST_CHANGE,
     SYS_NAME, SYS_DESCR, SYS_UPTIME,
     VENDOR_OIDS, detect_vendor
 )
+from app.config import get_settings
+from app.core.snmp_engine_pool import SnmpCredentials, PysnmpBackend, get_engine_pool
+from app.core.snmp_ber import is_exception_value
+from app.core.snmp_transport import REQUEST_TIMED_OUT
+from app.core.table_cache import ChangeMarkers, ReusableTables
 
 logger = logging.getLogger(__name__)
 
+# Poll tiers: fast-changing counters, slow-changing inventory and neighbors, or both
+TIER_COUNTERS = "counters"
+TIER_INVENTORY = "inventory"
+TIER_FULL = "full"
+
+# SNMP error-status value returned when a response exceeds the agent's PDU size
+_ERROR_TOO_BIG = 1
+
+# RTT samples kept per poll for the collector's latency histogram
+_MAX_RTT_SAMPLES = 64
+
+# Per-poll memo of in-flight/finished requests keyed by (kind, ip, oid)
+_poll_memo_var: ContextVar[Optional[Dict[tuple, asyncio.Future]]] = ContextVar(
+    "snmp_poll_cache", default=None
+)
+
+
+def _oid_tuple(oid: str) -> tuple:
+    """Convert a dotted OID string to a tuple of ints"""
+    return tuple(int(x) for x in oid.strip(".").split("."))
+
+
+def _oid_index(name: tuple, root_len: int) -> str:
+    """Get the table index part of an OID as a dotted string"""
+    return ".".join(str(x) for x in name[root_len:])
+
+
+def _is_end_of_walk(value) -> bool:
+    """Check for SNMPv2 exception values that terminate a walk"""
+    return isinstance(value, (EndOfMibView, NoSuchObject, NoSuchInstance)) or is_exception_value(value)
+
+
+def _as_int(value) -> Optional[int]:
+    """Convert an SNMP value to int, keeping None"""
+    return int(value) if value is not None else None
+
+
+def _ipv4_from_octets(value) -> Optional[str]:
+    """Dotted IPv4 address from a 4-octet SNMP string (cdpCacheAddress), None otherwise"""
+    if value is None:
+        return None
+    octets = value.asOctets() if hasattr(value, "asOctets") else bytes(value)
+    return ".".join(str(b) for b in octets) if len(octets) == 4 else None
+
+
+def _lldp_management_addresses(rows: Dict[str, Any]) -> Dict[str, str]:
+    """
+    First IPv4 management address of each LLDP neighbor, keyed like lldpRemTable
+    lldpRemManAddrTable has no address column, the address is in the row index:
+    time_mark.local_port_num.remote_index.addr_subtype.addr_len.addr
+    """
+    addresses: Dict[str, str] = {}
+    for index in rows:
+        parts = index.split(".")
+        # Address family 1 is IPv4, sent length-prefixed (or implied by some agents)
+        if len(parts) >= 9 and parts[3] == "1" and parts[4] == "4":
+            address = parts[5:9]
+        elif len(parts) == 8 and parts[3] == "1":
+            address = parts[4:8]
+        else:
+            continue
+        if all(p.isdigit() and int(p) <= 255 for p in address):
+            addresses.setdefault(".".join(parts[:3]), ".".join(address))
+    return addresses
+
+
+def _new_poll_stats() -> Dict[str, Any]:
+    return {"pdus": 0, "timeouts": 0, "walk_rows": 0, "rtt": [], "phases": {}}
+
+
+def _is_timeout(error_indication) -> bool:
+    """Check whether an error indication means the request timed out"""
+    return isinstance(error_indication, RequestTimedOut) or error_indication == REQUEST_TIMED_OUT
+
+
+async def get_snmp_backend(credentials: SnmpCredentials):
+    """
+    Pick the request backend for a device
+    The native transport only speaks v1/v2c, SNMPv3 always goes through pysnmp
+    """
+    if get_settings().snmp_backend == "native" and credentials.snmp_version in ("v1", "v2c"):
+        from app.core.snmp_transport import get_native_backend
+        return await get_native_backend()
+    return PysnmpBackend(get_engine_pool())
+
 
 @dataclass
 class DeviceInfo:
@@ -36,6 +132,7 @@ class LLDPNeighbor:
     remote_port: str
     remote_chassis_id: str
     protocol: str = "lldp"
+    remote_address: Optional[str] = None  # Management IPv4 address advertised by the neighbor
 
 
 @dataclass
@@ -55,8 +152,35 @@ class DeviceMetrics:
     memory_percent: float
 
 
+@dataclass
+class DeviceCapabilities:
+    """SNMP features learned for a device, None means not probed yet"""
+    bulk: Optional[bool] = None
+    max_repetitions: Optional[int] = None
+    lldp: Optional[bool] = None
+    cdp: Optional[bool] = None
+    hc_counters: Optional[bool] = None
+    metric_oids: Optional[Dict[str, str]] = None  # vendor OID -> "get" or "walk"
+    probed_at: Optional[float] = None
+    
+    def needs_probe(self, interval: int) -> bool:
+        """Whether the profile is missing or due for its periodic re-probe"""
+        return self.probed_at is None or time.time() - self.probed_at >= interval
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+    
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "DeviceCapabilities":
+        """Load a persisted profile, ignoring unknown keys"""
+        if not data:
+            return cls()
+        known = {f.name for f in fields(cls)}
+        return cls(**{key: value for key, value in data.items() if key in known})
+
+
 class SNMPCollector:
-    """SNMP data collector for network devices - supports v2c and v3"""
+    """SNMP data collector for network devices - supports v1, v2c and v3"""
     
     def __init__(
         self,
@@ -64,6 +188,14 @@ class SNMPCollector:
         timeout: int = 5,
         retries: int = 2,
         snmp_version: str = "v2c",
+        max_repetitions: int = 25,
+        max_walk_rows: int = 10000,
+        max_inflight: int = 2,
+        port: int = 161,
+        backend=None,
+        rtt_tracker=None,
+        capability_reprobe_interval: int = 86400,
+        table_cache=None,
         v3_username: str = None,
         v3_auth_protocol: str = None,  # MD5, SHA, SHA256
         v3_auth_password: str = None,
@@ -74,104 +206,349 @@ class SNMPCollector:
         self.timeout = timeout
         self.retries = retries
         self.snmp_version = snmp_version
+        self.max_repetitions = max_repetitions
+        self.max_walk_rows = max_walk_rows
+        self.max_inflight = max(1, max_inflight)
+        self._inflight: Dict[str, asyncio.Semaphore] = {}
+        # SNMPv1 has no GETBULK
+        self.bulk_supported = snmp_version != "v1" and max_repetitions > 0
         self.v3_username = v3_username
         self.v3_auth_protocol = v3_auth_protocol
         self.v3_auth_password = v3_auth_password
         self.v3_priv_protocol = v3_priv_protocol
         self.v3_priv_password = v3_priv_password
+        self.credentials = SnmpCredentials(
+            snmp_version=snmp_version,
+            community=community,
+            v3_username=v3_username,
+            v3_auth_protocol=v3_auth_protocol,
+            v3_auth_password=v3_auth_password,
+            v3_priv_protocol=v3_priv_protocol,
+            v3_priv_password=v3_priv_password
+        )
+        self.port = port
+        # PysnmpBackend or NativeSnmpBackend, resolved lazily by _get_backend()
+        self.backend = backend
+        # RttTracker for adaptive per-device timeouts, None uses timeout/retries as-is
+        self.rtt_tracker = rtt_tracker
+        self.capability_reprobe_interval = capability_reprobe_interval
+        # TableCache for change-detection polling, None re-walks every table each poll
+        self.table_cache = table_cache
+        # Request/phase counts of this collector's polls, returned in result["stats"]
+        self.stats = _new_poll_stats()
     
-    def _get_auth_data(self):
-        """Get authentication data based on SNMP version"""
-        if self.snmp_version == "v3" and self.v3_username:
-            from pysnmp.hlapi.asyncio import UsmUserData, usmHMACMD5AuthProtocol, usmHMACSHAAuthProtocol
-            from pysnmp.hlapi.asyncio import usmDESPrivProtocol, usmAesCfb128Protocol
-            
-            # Select auth protocol
-            auth_protocol = None
-            if self.v3_auth_protocol == "MD5":
-                auth_protocol = usmHMACMD5AuthProtocol
-            elif self.v3_auth_protocol in ("SHA", "SHA256"):
-                auth_protocol = usmHMACSHAAuthProtocol
-            
-            # Select privacy protocol
-            priv_protocol = None
-            if self.v3_priv_protocol == "DES":
-                priv_protocol = usmDESPrivProtocol
-            elif self.v3_priv_protocol in ("AES", "AES128", "AES256"):
-                priv_protocol = usmAesCfb128Protocol
-            
-            return UsmUserData(
-                self.v3_username,
-                authKey=self.v3_auth_password,
-                privKey=self.v3_priv_password,
-                authProtocol=auth_protocol,
-                privProtocol=priv_protocol
-            )
-        else:
-            return CommunityData(self.community)
+    @property
+    def _poll_cache(self) -> Optional[Dict[tuple, asyncio.Future]]:
+        """Memo of the current poll scope, None outside of one"""
+        return _poll_memo_var.get()
+    
+    @contextmanager
+    def _poll_scope(self):
+        """Memoize GET/walk results for the duration of one device poll"""
+        if _poll_memo_var.get() is not None:
+            # Nested scope shares the outer cache
+            yield
+            return
+        
+        # Context-local, so concurrent polls on one collector don't share a memo
+        token = _poll_memo_var.set({})
+        try:
+            yield
+        finally:
+            _poll_memo_var.reset(token)
+    
+    async def _get_backend(self):
+        """Resolve the request backend on first use"""
+        if self.backend is None:
+            self.backend = await get_snmp_backend(self.credentials)
+        return self.backend
+    
+    def _device_slot(self, ip: str) -> asyncio.Semaphore:
+        """Semaphore bounding outstanding requests to one device"""
+        semaphore = self._inflight.get(ip)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_inflight)
+            self._inflight[ip] = semaphore
+        return semaphore
+    
+    async def _send(self, ip: str, request):
+        """
+        Send one request, deriving timeouts from the device's measured RTT
+        
+        Args:
+            request: callable(timeout, retries) returning the backend coroutine
+        """
+        loop = asyncio.get_running_loop()
+        if self.rtt_tracker is None:
+            async with self._device_slot(ip):
+                started = loop.time()
+                response = await request(self.timeout, self.retries)
+                self._count_request(response, loop.time() - started)
+                return response
+        
+        # Retransmit here rather than in the backend so RTT samples are unambiguous
+        estimator = self.rtt_tracker.get(ip)
+        async with self._device_slot(ip):
+            for attempt in range(estimator.retries(self.retries) + 1):
+                started = loop.time()
+                response = await request(estimator.timeout(), 0)
+                self._count_request(response, loop.time() - started if attempt == 0 else None)
+                if not _is_timeout(response[0]):
+                    if attempt == 0:
+                        estimator.observe(loop.time() - started)
+                    else:
+                        # Karn's algorithm: no sample from a retransmitted request
+                        estimator.on_response()
+                    return response
+                estimator.on_timeout()
+        
+        estimator.on_failure()
+        return response
+    
+    def _count_request(self, response, rtt: Optional[float]):
+        self.stats["pdus"] += 1
+        if _is_timeout(response[0]):
+            self.stats["timeouts"] += 1
+        elif rtt is not None and len(self.stats["rtt"]) < _MAX_RTT_SAMPLES:
+            self.stats["rtt"].append(round(rtt, 6))
+    
+    async def _timed(self, phase: str, coroutine):
+        """Await a poll phase, recording its wall time"""
+        started = time.monotonic()
+        try:
+            return await coroutine
+        finally:
+            self.stats["phases"][phase] = round(time.monotonic() - started, 6)
     
     async def _snmp_get(self, ip: str, oid: str) -> Optional[Any]:
         """Perform SNMP GET operation"""
-        try:
-            iterator = getCmd(
-                SnmpEngine(),
-                self._get_auth_data(),
-                UdpTransportTarget((ip, 161), timeout=self.timeout, retries=self.retries),
-                ContextData(),
-                ObjectType(ObjectIdentity(oid))
-            )
-            
-            error_indication, error_status, error_index, var_binds = await iterator
+        values = await self._snmp_get_many(ip, [oid])
+        return values[oid]
+    
+    async def _snmp_get_many(self, ip: str, oids: List[str]) -> Dict[str, Optional[Any]]:
+        """
+        GET several scalars in one multi-varbind PDU
+        Inside a poll scope each OID is fetched at most once per device
+        """
+        oids = list(dict.fromkeys(oids))
+        if self._poll_cache is None:
+            return await self._fetch_get(ip, oids)
+        
+        pending = {}
+        missing = []
+        for oid in oids:
+            future = self._poll_cache.get(("get", ip, oid))
+            if future is None:
+                missing.append(oid)
+            else:
+                pending[oid] = future
+        
+        results: Dict[str, Optional[Any]] = {}
+        if missing:
+            loop = asyncio.get_running_loop()
+            futures = {oid: loop.create_future() for oid in missing}
+            for oid, future in futures.items():
+                self._poll_cache[("get", ip, oid)] = future
             
-            if error_indication or error_status:
-                logger.warning(f"SNMP error for {ip}: {error_indication or error_status}")
-                return None
+            try:
+                fetched = await self._fetch_get(ip, missing)
+            except BaseException:
+                for oid, future in futures.items():
+                    self._poll_cache.pop(("get", ip, oid), None)
+                    future.cancel()
+                raise
             
-            if var_binds:
-                return var_binds[0][1]
-            return None
+            for oid, future in futures.items():
+                future.set_result(fetched[oid])
+                results[oid] = fetched[oid]
+        
+        for oid, future in pending.items():
+            results[oid] = await future
+        
+        return results
+    
+    async def _fetch_get(self, ip: str, oids: List[str]) -> Dict[str, Optional[Any]]:
+        """Send one SNMP GET for all oids, missing objects map to None"""
+        results: Dict[str, Optional[Any]] = {oid: None for oid in oids}
+        remaining = list(oids)
+        
+        try:
+            while remaining:
+                backend = await self._get_backend()
+                error_indication, error_status, error_index, var_binds = await self._send(
+                    ip, lambda timeout, retries: backend.get(
+                        ip, self.credentials, remaining, timeout, retries, self.port
+                    )
+                )
+                
+                if error_indication:
+                    logger.warning(f"SNMP error for {ip}: {error_indication}")
+                    break
+                
+                if error_status:
+                    # SNMPv1 fails the whole PDU on one missing object, drop it and retry
+                    if len(remaining) > 1 and 0 < int(error_index) <= len(remaining):
+                        remaining.pop(int(error_index) - 1)
+                        continue
+                    logger.warning(f"SNMP error for {ip}: {error_status.prettyPrint()}")
+                    break
+                
+                for oid, var_bind in zip(remaining, var_binds):
+                    if not _is_end_of_walk(var_bind[1]):
+                        results[oid] = var_bind[1]
+                break
             
         except Exception as e:
             logger.error(f"SNMP GET failed for {ip}: {e}")
-            return None
+        
+        return results
     
     async def _snmp_walk(self, ip: str, oid: str) -> Dict[str, Any]:
-        """Perform SNMP WALK operation using nextCmd for pysnmp 4.x compatibility"""
-        results = {}
+        """Perform SNMP WALK of a single subtree"""
+        columns = await self._snmp_walk_columns(ip, [oid])
+        return columns[oid]
+    
+    async def _snmp_table(self, ip: str, columns: Dict[str, str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Fetch several columns of one table in a single pass
         
-        try:
-            # Use getNext in a loop for pysnmp 4.x compatibility
-            current_oid = oid
-            max_iterations = 1000  # Prevent infinite loops
+        Args:
+            columns: {name: column OID}, all sharing the same row index
+        
+        Returns:
+            {index: {name: value}} - rows joined on the table index
+        """
+        walked = await self._snmp_walk_columns(ip, list(columns.values()))
+        
+        rows: Dict[str, Dict[str, Any]] = {}
+        for name, oid in columns.items():
+            for index, value in walked[oid].items():
+                rows.setdefault(index, {})[name] = value
+        return rows
+    
+    async def _snmp_walk_columns(self, ip: str, oids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Walk several subtrees in lockstep, one PDU carrying every unfinished column
+        Inside a poll scope each subtree is fetched at most once per device
+        """
+        oids = list(dict.fromkeys(oids))
+        if self._poll_cache is None:
+            return await self._fetch_columns(ip, oids)
+        
+        pending = {}
+        missing = []
+        for oid in oids:
+            future = self._poll_cache.get(("walk", ip, oid))
+            if future is None:
+                missing.append(oid)
+            else:
+                pending[oid] = future
+        
+        results: Dict[str, Dict[str, Any]] = {}
+        if missing:
+            # Register futures first so concurrent callers wait instead of refetching
+            loop = asyncio.get_running_loop()
+            futures = {oid: loop.create_future() for oid in missing}
+            for oid, future in futures.items():
+                self._poll_cache[("walk", ip, oid)] = future
             
-            for _ in range(max_iterations):
-                iterator = nextCmd(
-                    SnmpEngine(),
-                    self._get_auth_data(),
-                    UdpTransportTarget((ip, 161), timeout=self.timeout, retries=self.retries),
-                    ContextData(),
-                    ObjectType(ObjectIdentity(current_oid)),
-                    lexicographicMode=False
-                )
+            try:
+                fetched = await self._fetch_columns(ip, missing)
+            except BaseException:
+                for oid, future in futures.items():
+                    self._poll_cache.pop(("walk", ip, oid), None)
+                    future.cancel()
+                raise
+            
+            for oid, future in futures.items():
+                future.set_result(fetched[oid])
+                results[oid] = fetched[oid]
+        
+        for oid, future in pending.items():
+            results[oid] = await future
+        
+        return results
+    
+    async def _fetch_columns(self, ip: str, oids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Walk columns using GETBULK when the agent supports it, otherwise getNext"""
+        if self.bulk_supported:
+            results = await self._walk_columns(ip, oids, bulk=True)
+            if results is not None:
+                return results
+            # Agent rejected GETBULK, use getNext for the rest of this collector's life
+            logger.info(f"GETBULK not supported by {ip}, falling back to getNext")
+            self.bulk_supported = False
+        
+        return await self._walk_columns(ip, oids, bulk=False)
+    
+    async def _walk_columns(
+        self, ip: str, oids: List[str], bulk: bool
+    ) -> Optional[Dict[str, Dict[str, Any]]]:
+        """Walk columns with GETBULK or getNext, returns None if GETBULK is rejected"""
+        results: Dict[str, Dict[str, Any]] = {oid: {} for oid in oids}
+        roots = {oid: _oid_tuple(oid) for oid in oids}
+        last_names = dict(roots)
+        active = list(dict.fromkeys(oids))
+        max_repetitions = self.max_repetitions
+        total_rows = 0
+        
+        try:
+            while active and total_rows < self.max_walk_rows:
+                backend = await self._get_backend()
+                start_oids = [".".join(str(x) for x in last_names[oid]) for oid in active]
                 
-                error_indication, error_status, error_index, var_binds = await iterator
+                if bulk:
+                    request = lambda timeout, retries: backend.get_bulk(
+                        ip, self.credentials, start_oids, max_repetitions, timeout, retries, self.port
+                    )
+                else:
+                    request = lambda timeout, retries: backend.get_next(
+                        ip, self.credentials, start_oids, timeout, retries, self.port
+                    )
+                error_indication, error_status, error_index, var_bind_table = await self._send(ip, request)
                 
-                if error_indication or error_status:
+                if error_indication:
+                    logger.warning(f"SNMP WALK error for {ip}: {error_indication}")
                     break
                 
-                if not var_binds:
+                if error_status:
+                    if bulk and int(error_status) == _ERROR_TOO_BIG and max_repetitions > 1:
+                        # Response did not fit, ask for fewer rows per PDU from now on
+                        max_repetitions = max(1, max_repetitions // 2)
+                        self.max_repetitions = min(self.max_repetitions, max_repetitions)
+                        continue
+                    if bulk and total_rows == 0:
+                        return None
+                    if not bulk and 0 < int(error_index) <= len(active):
+                        # SNMPv1 reports end of MIB as noSuchName on the offending column
+                        active.pop(int(error_index) - 1)
+                        continue
                     break
                 
-                for var_bind in var_binds:
-                    oid_str = str(var_bind[0])
-                    if oid_str.startswith(oid):
-                        # Extract index from OID
-                        index = oid_str[len(oid)+1:] if len(oid_str) > len(oid) else ""
-                        results[index] = var_bind[1]
-                        current_oid = oid_str  # Move to next OID
-                    else:
-                        # Walked past our OID tree
-                        return results
+                if not var_bind_table:
+                    break
+                
+                finished = set()
+                for row in var_bind_table:
+                    for oid, (name, value) in zip(active, row):
+                        if oid in finished:
+                            continue
+                        
+                        name_tuple = tuple(name)
+                        root = roots[oid]
+                        
+                        # Stop at end of subtree, end of MIB or a non-increasing OID
+                        if (name_tuple[:len(root)] != root or _is_end_of_walk(value)
+                                or name_tuple <= last_names[oid]):
+                            finished.add(oid)
+                            continue
+                        
+                        results[oid][_oid_index(name_tuple, len(root))] = value
+                        last_names[oid] = name_tuple
+                        total_rows += 1
+                        self.stats["walk_rows"] += 1
+                
+                active = [oid for oid in active if oid not in finished]
             
         except Exception as e:
             logger.error(f"SNMP WALK failed for {ip}: {e}")
@@ -180,9 +557,10 @@ class SNMPCollector:
     
     async def get_device_info(self, ip: str) -> Optional[DeviceInfo]:
         """Get basic device information"""
-        sys_name = await self._snmp_get(ip, SYS_NAME)
-        sys_descr = await self._snmp_get(ip, SYS_DESCR)
-        sys_uptime = await self._snmp_get(ip, SYS_UPTIME)
+        values = await self._snmp_get_many(ip, [SYS_NAME, SYS_DESCR, SYS_UPTIME])
+        sys_name = values[SYS_NAME]
+        sys_descr = values[SYS_DESCR]
+        sys_uptime = values[SYS_UPTIME]
         
         if not sys_name:
             return None
@@ -197,17 +575,20 @@ class SNMPCollector:
             vendor=vendor
         )
     
-    async def get_lldp_neighbors(self, ip: str) -> List[LLDPNeighbor]:
-        """Get LLDP neighbor information"""
+    async def get_lldp_neighbors(
+        self, ip: str, if_descr: Optional[Dict[str, Any]] = None
+    ) -> List[LLDPNeighbor]:
+        """Get LLDP neighbor information, if_descr skips walking ifDescr"""
         neighbors = []
         
-        # Walk LLDP remote system names
-        sys_names = await self._snmp_walk(ip, LLDP_REM_SYS_NAME)
-        port_ids = await self._snmp_walk(ip, LLDP_REM_PORT_ID)
-        chassis_ids = await self._snmp_walk(ip, LLDP_REM_CHASSIS_ID)
-        
-        # Get local interface descriptions for mapping
-        if_descrs = await self._snmp_walk(ip, IF_DESCR)
+        # Walk the LLDP remote and management address tables and local interface descriptions in one pass
+        oids = [LLDP_REM_SYS_NAME, LLDP_REM_PORT_ID, LLDP_REM_CHASSIS_ID, LLDP_REM_MAN_ADDR_IF_SUBTYPE]
+        columns = await self._snmp_walk_columns(ip, oids + ([IF_DESCR] if if_descr is None else []))
+        sys_names = columns[LLDP_REM_SYS_NAME]
+        port_ids = columns[LLDP_REM_PORT_ID]
+        chassis_ids = columns[LLDP_REM_CHASSIS_ID]
+        addresses = _lldp_management_addresses(columns[LLDP_REM_MAN_ADDR_IF_SUBTYPE])
+        if_descrs = columns[IF_DESCR] if if_descr is None else if_descr
         
         for index, remote_name in sys_names.items():
             # Index format: time_mark.local_port_num.remote_index
@@ -228,19 +609,24 @@ class SNMPCollector:
                 remote_hostname=str(remote_name),
                 remote_port=remote_port,
                 remote_chassis_id=chassis_id,
-                protocol="lldp"
+                protocol="lldp",
+                remote_address=addresses.get(index)
             ))
         
         return neighbors
     
-    async def get_cdp_neighbors(self, ip: str) -> List[LLDPNeighbor]:
-        """Get CDP neighbor information (Cisco devices)"""
+    async def get_cdp_neighbors(
+        self, ip: str, if_descr: Optional[Dict[str, Any]] = None
+    ) -> List[LLDPNeighbor]:
+        """Get CDP neighbor information (Cisco devices), if_descr skips walking ifDescr"""
         neighbors = []
         
-        device_ids = await self._snmp_walk(ip, CDP_CACHE_DEVICE_ID)
-        device_ports = await self._snmp_walk(ip, CDP_CACHE_DEVICE_PORT)
-        
-        if_descrs = await self._snmp_walk(ip, IF_DESCR)
+        oids = [CDP_CACHE_DEVICE_ID, CDP_CACHE_DEVICE_PORT, CDP_CACHE_ADDRESS]
+        columns = await self._snmp_walk_columns(ip, oids + ([IF_DESCR] if if_descr is None else []))
+        device_ids = columns[CDP_CACHE_DEVICE_ID]
+        device_ports = columns[CDP_CACHE_DEVICE_PORT]
+        addresses = columns[CDP_CACHE_ADDRESS]
+        if_descrs = columns[IF_DESCR] if if_descr is None else if_descr
         
         for index, device_id in device_ids.items():
             # Index format: ifIndex.cdpCacheDeviceIndex
@@ -256,31 +642,73 @@ class SNMPCollector:
                 remote_hostname=str(device_id),
                 remote_port=remote_port,
                 remote_chassis_id="",
-                protocol="cdp"
+                protocol="cdp",
+                remote_address=_ipv4_from_octets(addresses.get(index))
             ))
         
         return neighbors
     
-    async def get_interface_stats(self, ip: str) -> List[InterfaceStats]:
-        """Get interface traffic statistics"""
+    async def get_interface_stats(
+        self,
+        ip: str,
+        capabilities: Optional[DeviceCapabilities] = None,
+        if_descr: Optional[Dict[str, Any]] = None
+    ) -> List[InterfaceStats]:
+        """
+        Get interface traffic statistics, 64-bit counters when the device has them
+        
+        Args:
+            if_descr: known port names by ifIndex, skips walking ifDescr
+        """
         stats = []
+        hc_counters = capabilities.hc_counters if capabilities else None
+        descr_column = {"descr": IF_DESCR} if if_descr is None else {}
+        
+        # ifDescr (ifTable) and ifXTable columns share the ifIndex row index,
+        # fetching them together also gives a consistent in/out counter snapshot
+        if hc_counters is not False:
+            rows = await self._snmp_table(ip, {
+                **descr_column,
+                "speed": IF_HIGH_SPEED,
+                "in_octets": IF_HC_IN_OCTETS,
+                "out_octets": IF_HC_OUT_OCTETS
+            })
+            if hc_counters is None and (rows or if_descr):
+                hc_counters = any("in_octets" in row for row in rows.values())
+        
+        if hc_counters is False:
+            # No ifXTable, use the 32-bit ifTable counters
+            rows = await self._snmp_table(ip, {
+                **descr_column,
+                "speed_bps": IF_SPEED,
+                "in_octets": IF_IN_OCTETS,
+                "out_octets": IF_OUT_OCTETS
+            })
         
-        if_descrs = await self._snmp_walk(ip, IF_DESCR)
-        if_speeds = await self._snmp_walk(ip, IF_HIGH_SPEED)
-        in_octets = await self._snmp_walk(ip, IF_HC_IN_OCTETS)
-        out_octets = await self._snmp_walk(ip, IF_HC_OUT_OCTETS)
+        if capabilities is not None:
+            capabilities.hc_counters = hc_counters
         
-        for index, descr in if_descrs.items():
+        if if_descr is not None:
+            for index, row in rows.items():
+                if index in if_descr:
+                    row["descr"] = if_descr[index]
+        
+        for index, row in rows.items():
+            if "descr" not in row:
+                continue
             try:
                 port_index = int(index)
-                speed = int(if_speeds.get(index, 0))
-                in_oct = int(in_octets.get(index, 0))
-                out_oct = int(out_octets.get(index, 0))
+                if "speed_bps" in row:
+                    speed = int(row["speed_bps"]) // 1000000
+                else:
+                    speed = int(row.get("speed", 0))
+                in_oct = int(row.get("in_octets", 0))
+                out_oct = int(row.get("out_octets", 0))
                 
                 # Skip interfaces with no speed (usually management/loopback)
                 if speed > 0:
                     stats.append(InterfaceStats(
-                        port_name=str(descr),
+                        port_name=str(row["descr"]),
                         port_index=port_index,
                         speed_mbps=speed,
                         in_octets=in_oct,
@@ -291,7 +719,40 @@ class SNMPCollector:
         
         return stats
     
-    async def get_device_metrics(self, ip: str, vendor: str) -> Optional[DeviceMetrics]:
+    async def _get_metric_values(
+        self, ip: str, oids: List[str], modes: Optional[Dict[str, str]] = None
+    ) -> Tuple[Dict[str, Any], Dict[str, str]]:
+        """
+        Read vendor metric OIDs as scalars, or as the first row of a table column
+        
+        Args:
+            modes: {oid: "get" | "walk"} learned earlier, unknown OIDs try both
+        
+        Returns:
+            ({oid: value}, {oid: mode} for the OIDs that answered)
+        """
+        modes = modes or {}
+        get_oids = [oid for oid in oids if modes.get(oid, "get") == "get"]
+        values = await self._snmp_get_many(ip, get_oids) if get_oids else {}
+        found = {oid: "get" for oid, value in values.items() if value is not None}
+        
+        # Some vendor OIDs are table columns (e.g. cpmCPUTotal5minRev), not scalars
+        walk_oids = [
+            oid for oid in oids
+            if modes.get(oid) == "walk" or (oid not in modes and values.get(oid) is None)
+        ]
+        if walk_oids:
+            columns = await self._snmp_walk_columns(ip, walk_oids)
+            for oid in walk_oids:
+                if columns[oid]:
+                    values[oid] = next(iter(columns[oid].values()))
+                    found[oid] = "walk"
+        
+        return values, found
+    
+    async def get_device_metrics(
+        self, ip: str, vendor: str, capabilities: Optional[DeviceCapabilities] = None
+    ) -> Optional[DeviceMetrics]:
         """Get device CPU and memory metrics"""
         if vendor not in VENDOR_OIDS:
             return None
@@ -300,23 +761,38 @@ class SNMPCollector:
         cpu_percent = 0.0
         memory_percent = 0.0
         
+        # Pick the OIDs this vendor supports and fetch them in one GET
+        cpu_oid = oids.get("cpu") or oids.get("cpu_5min")
+        mem_oid = oids.get("memory")
+        used_oid = free_oid = None
+        if not mem_oid and "memory_used" in oids and "memory_free" in oids:
+            used_oid, free_oid = oids["memory_used"], oids["memory_free"]
+        
+        wanted = [oid for oid in (cpu_oid, mem_oid, used_oid, free_oid) if oid]
+        known = capabilities.metric_oids if capabilities else None
+        if known is not None:
+            # Only ask for the OIDs that answered when the device was probed
+            wanted = [oid for oid in wanted if oid in known]
+            if not wanted:
+                return None
+        
         try:
-            if "cpu" in oids:
-                cpu_val = await self._snmp_get(ip, oids["cpu"])
-                if cpu_val:
-                    cpu_percent = float(cpu_val)
-            elif "cpu_5min" in oids:
-                cpu_val = await self._snmp_get(ip, oids["cpu_5min"])
+            values, found = await self._get_metric_values(ip, wanted, known)
+            if capabilities is not None and known is None:
+                capabilities.metric_oids = found
+            
+            if cpu_oid:
+                cpu_val = values.get(cpu_oid)
                 if cpu_val:
                     cpu_percent = float(cpu_val)
             
-            if "memory" in oids:
-                mem_val = await self._snmp_get(ip, oids["memory"])
+            if mem_oid:
+                mem_val = values.get(mem_oid)
                 if mem_val:
                     memory_percent = float(mem_val)
-            elif "memory_used" in oids and "memory_free" in oids:
-                used = await self._snmp_get(ip, oids["memory_used"])
-                free = await self._snmp_get(ip, oids["memory_free"])
+            elif used_oid:
+                used = values.get(used_oid)
+                free = values.get(free_oid)
                 if used and free:
                     total = int(used) + int(free)
                     if total > 0:
@@ -331,41 +807,146 @@ class SNMPCollector:
             logger.error(f"Failed to get metrics for {ip}: {e}")
             return None
     
-    async def poll_device(self, ip: str) -> Dict:
-        """Poll a single device for all data"""
+    async def poll_device(
+        self,
+        ip: str,
+        capabilities: Optional[DeviceCapabilities] = None,
+        tier: str = TIER_FULL,
+        vendor: Optional[str] = None
+    ) -> Dict:
+        """
+        Poll a single device
+        
+        Args:
+            capabilities: learned profile used to skip unsupported branches, the
+                updated (or re-probed) profile is returned in result["capabilities"]
+            tier: TIER_COUNTERS (interface counters, CPU/memory), TIER_INVENTORY
+                (device info, LLDP/CDP neighbors) or TIER_FULL (everything)
+            vendor: known vendor for counters polls, read from sysDescr when None
+        """
         result = {
             "ip": ip,
+            "tier": tier,
             "success": False,
+            "sys_uptime": None,
+            "sampled_at": None,
             "device_info": None,
             "lldp_neighbors": [],
             "cdp_neighbors": [],
             "interface_stats": [],
-            "metrics": None
+            "metrics": None,
+            "capabilities": None
         }
+        counters = tier in (TIER_COUNTERS, TIER_FULL)
+        inventory = tier in (TIER_INVENTORY, TIER_FULL)
+        self.stats = _new_poll_stats()
+        result["stats"] = self.stats
         
-        # Get device info
-        device_info = await self.get_device_info(ip)
-        if not device_info:
-            return result
+        if capabilities is None or (inventory and capabilities.needs_probe(self.capability_reprobe_interval)):
+            # Unknown or stale profile, try everything and learn it again
+            capabilities = DeviceCapabilities()
+        # Neighbor support is only probed by polls that walk the neighbor tables
+        probing = inventory and capabilities.probed_at is None
         
-        result["device_info"] = device_info
-        result["success"] = True
+        if capabilities.bulk is False:
+            self.bulk_supported = False
+        if capabilities.max_repetitions:
+            self.max_repetitions = min(self.max_repetitions, capabilities.max_repetitions)
         
-        # Get neighbors
-        lldp = await self.get_lldp_neighbors(ip)
-        result["lldp_neighbors"] = lldp
+        # Feature probes and change markers ride along in the same PDU as get_device_info's GET
+        scalars = [SYS_UPTIME]
+        if inventory or vendor is None:
+            scalars += [SYS_NAME, SYS_DESCR]
+        if probing:
+            scalars += [LLDP_STATS_REM_LAST_CHANGE, CDP_GLOBAL_RUN]
+        if self.table_cache is not None:
+            scalars.append(IF_TABLE_LAST_CHANGE)
+            if inventory and capabilities.lldp is not False:
+                scalars.append(LLDP_STATS_REM_LAST_CHANGE)
         
-        # Try CDP for Cisco devices
-        if "cisco" in device_info.vendor:
-            cdp = await self.get_cdp_neighbors(ip)
-            result["cdp_neighbors"] = cdp
+        # ifDescr and friends are needed by several phases, fetch them once
+        with self._poll_scope():
+            info_started = time.monotonic()
+            probes = await self._snmp_get_many(ip, scalars)
+            result["sys_uptime"] = _as_int(probes[SYS_UPTIME])
+            result["sampled_at"] = time.time()
+            
+            if inventory or vendor is None:
+                # Get device info
+                device_info = await self.get_device_info(ip)
+                if not device_info:
+                    return result
+                result["device_info"] = device_info
+                vendor = device_info.vendor
+            elif result["sys_uptime"] is None:
+                return result
+            self.stats["phases"]["info"] = round(time.monotonic() - info_started, 6)
+            
+            result["success"] = True
+            is_cisco = "cisco" in vendor
+            
+            # Reuse neighbor lists and port names the change markers say are unchanged
+            markers = None
+            reusable = ReusableTables()
+            if self.table_cache is not None and probes[SYS_UPTIME] is not None:
+                markers = ChangeMarkers(
+                    sys_uptime=int(probes[SYS_UPTIME]),
+                    lldp_last_change=_as_int(probes.get(LLDP_STATS_REM_LAST_CHANGE)),
+                    if_last_change=_as_int(probes.get(IF_TABLE_LAST_CHANGE))
+                )
+                reusable = self.table_cache.lookup(ip, markers)
+            
+            # The remaining phases are independent, run them concurrently;
+            # _device_slot() keeps the number of outstanding PDUs per device bounded
+            phases = {}
+            if counters:
+                phases["interface_stats"] = self.get_interface_stats(ip, capabilities, reusable.if_descr)
+                phases["metrics"] = self.get_device_metrics(ip, vendor, capabilities)
+            
+            # Skip neighbor tables the device is known not to have
+            if inventory and capabilities.lldp is not False:
+                if reusable.lldp_neighbors is not None:
+                    result["lldp_neighbors"] = reusable.lldp_neighbors
+                else:
+                    phases["lldp_neighbors"] = self.get_lldp_neighbors(ip, reusable.if_descr)
+            
+            # Try CDP for Cisco devices
+            if inventory and is_cisco and capabilities.cdp is not False:
+                if reusable.cdp_neighbors is not None:
+                    result["cdp_neighbors"] = reusable.cdp_neighbors
+                else:
+                    phases["cdp_neighbors"] = self.get_cdp_neighbors(ip, reusable.if_descr)
+            
+            values = await asyncio.gather(*(self._timed(name, phase) for name, phase in phases.items()))
+            result.update(zip(phases.keys(), values))
+            
+            if markers is not None and reusable.if_descr is None:
+                # ifDescr was walked by the phases above, so this is a memo hit
+                if_descr = await self._snmp_walk(ip, IF_DESCR)
+            else:
+                if_descr = reusable.if_descr
+            
+            if markers is not None and inventory:
+                self.table_cache.store(
+                    ip, markers, if_descr,
+                    result["lldp_neighbors"] if capabilities.lldp is not False else None,
+                    result["cdp_neighbors"] if is_cisco and capabilities.cdp is not False else None,
+                    refreshed=reusable.if_descr is None
+                )
+            elif markers is not None and reusable.if_descr is None:
+                # Counters polls keep the cached neighbor lists of the inventory tier
+                self.table_cache.store_if_descr(ip, markers, if_descr)
         
-        # Get interface stats
-        stats = await self.get_interface_stats(ip)
-        result["interface_stats"] = stats
+        if probing:
+            capabilities.lldp = (
+                probes.get(LLDP_STATS_REM_LAST_CHANGE) is not None or bool(result["lldp_neighbors"])
+            )
+            if is_cisco:
+                capabilities.cdp = probes.get(CDP_GLOBAL_RUN) is not None or bool(result["cdp_neighbors"])
+            capabilities.probed_at = time.time()
         
-        # Get metrics
-        metrics = await self.get_device_metrics(ip, device_info.vendor)
-        result["metrics"] = metrics
+        capabilities.bulk = self.bulk_supported
+        capabilities.max_repetitions = self.max_repetitions
+        result["capabilities"] = capabilities
         
         return result
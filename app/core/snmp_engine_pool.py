@@ -0,0 +1,236 @@
+"""
+SNMP Engine Pool - Shares one SnmpEngine and cached transport/auth objects per process
+Avoids rebuilding engines, transports and USM keys for every SNMP request
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple, Any
+
+from pysnmp.entity import config as snmp_config
+from pysnmp.hlapi.asyncio import (
+    SnmpEngine, CommunityData, UsmUserData, UdpTransportTarget, ContextData,
+    ObjectType, ObjectIdentity, getCmd, nextCmd, bulkCmd,
+    usmHMACMD5AuthProtocol, usmHMACSHAAuthProtocol,
+    usmDESPrivProtocol, usmAesCfb128Protocol
+)
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# LCD cache id used by pysnmp's CommandGeneratorLcdConfigurator
+_LCD_CACHE_ID = "CommandGeneratorLcdConfigurator"
+
+
+@dataclass(frozen=True)
+class SnmpCredentials:
+    """Hashable SNMP credentials, used as part of the pool key"""
+    snmp_version: str = "v2c"
+    community: str = "public"
+    v3_username: Optional[str] = None
+    v3_auth_protocol: Optional[str] = None  # MD5, SHA, SHA256
+    v3_auth_password: Optional[str] = None
+    v3_priv_protocol: Optional[str] = None  # DES, AES, AES256
+    v3_priv_password: Optional[str] = None
+    
+    def build_auth_data(self):
+        """Build pysnmp authentication data based on SNMP version"""
+        if self.snmp_version == "v3" and self.v3_username:
+            # Select auth protocol
+            auth_protocol = None
+            if self.v3_auth_protocol == "MD5":
+                auth_protocol = usmHMACMD5AuthProtocol
+            elif self.v3_auth_protocol in ("SHA", "SHA256"):
+                auth_protocol = usmHMACSHAAuthProtocol
+            
+            # Select privacy protocol
+            priv_protocol = None
+            if self.v3_priv_protocol == "DES":
+                priv_protocol = usmDESPrivProtocol
+            elif self.v3_priv_protocol in ("AES", "AES128", "AES256"):
+                priv_protocol = usmAesCfb128Protocol
+            
+            return UsmUserData(
+                self.v3_username,
+                authKey=self.v3_auth_password,
+                privKey=self.v3_priv_password,
+                authProtocol=auth_protocol,
+                privProtocol=priv_protocol
+            )
+        elif self.snmp_version == "v1":
+            return CommunityData(self.community, mpModel=0)
+        else:
+            return CommunityData(self.community)
+
+
+@dataclass
+class PoolEntry:
+    """Cached transport and auth objects for one (ip, credentials) target"""
+    auth_data: Any
+    target: UdpTransportTarget
+    last_used: float
+
+
+class SnmpEnginePool:
+    """
+    Long-lived SnmpEngine plus a cache of transport targets and auth objects
+    keyed by (ip, port, credentials, timeout, retries). Idle targets are evicted
+    from both the cache and the engine's local configuration datastore.
+    """
+    
+    def __init__(self, idle_timeout: int = 900, sweep_interval: int = 60):
+        self.idle_timeout = idle_timeout
+        self.sweep_interval = sweep_interval
+        self.context = ContextData()
+        self._engine: Optional[SnmpEngine] = None
+        self._engine_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._entries: Dict[Tuple, PoolEntry] = {}
+        self._auth_cache: Dict[SnmpCredentials, Any] = {}
+        self._last_sweep = time.monotonic()
+    
+    @property
+    def engine(self) -> SnmpEngine:
+        """Get the shared engine, recreating it if the event loop changed"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        
+        if self._engine is None or (loop is not None and loop is not self._engine_loop):
+            # Transports are bound to the loop they were opened on
+            self._engine = SnmpEngine()
+            self._engine_loop = loop
+            self._entries.clear()
+        return self._engine
+    
+    def get_auth_data(self, credentials: SnmpCredentials):
+        """Get cached auth data for credentials"""
+        auth_data = self._auth_cache.get(credentials)
+        if auth_data is None:
+            auth_data = credentials.build_auth_data()
+            self._auth_cache[credentials] = auth_data
+        return auth_data
+    
+    def acquire(
+        self,
+        ip: str,
+        credentials: SnmpCredentials,
+        timeout: float = 5,
+        retries: int = 2,
+        port: int = 161
+    ) -> Tuple[SnmpEngine, Any, UdpTransportTarget, ContextData]:
+        """Get (engine, auth_data, target, context) for a request to ip"""
+        engine = self.engine
+        now = time.monotonic()
+        
+        if now - self._last_sweep >= self.sweep_interval:
+            self.evict_idle(now)
+        
+        key = (ip, port, credentials, timeout, retries)
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = PoolEntry(
+                auth_data=self.get_auth_data(credentials),
+                target=UdpTransportTarget((ip, port), timeout=timeout, retries=retries),
+                last_used=now
+            )
+            self._entries[key] = entry
+        else:
+            entry.last_used = now
+        
+        return engine, entry.auth_data, entry.target, self.context
+    
+    def evict_idle(self, now: Optional[float] = None) -> int:
+        """Evict targets not used within idle_timeout, returns number evicted"""
+        now = now if now is not None else time.monotonic()
+        self._last_sweep = now
+        
+        expired = [
+            key for key, entry in self._entries.items()
+            if now - entry.last_used >= self.idle_timeout
+        ]
+        for key in expired:
+            entry = self._entries.pop(key)
+            self._unconfigure_target(entry.target)
+        
+        if expired:
+            logger.debug(f"Evicted {len(expired)} idle SNMP targets ({len(self._entries)} active)")
+        return len(expired)
+    
+    def _unconfigure_target(self, target: UdpTransportTarget):
+        """Remove a target address from the engine's LCD"""
+        if self._engine is None:
+            return
+        
+        cache = self._engine.getUserContext(_LCD_CACHE_ID)
+        if not cache:
+            return
+        
+        # transportKey = (paramsName, domain, addr, timeout, retries, tagList, iface)
+        for addr_key in [
+            k for k in cache["addr"]
+            if k[2] == target.transportAddr and k[3] == target.timeout and k[4] == target.retries
+        ]:
+            addr_name, _ = cache["addr"].pop(addr_key)
+            try:
+                snmp_config.delTargetAddr(self._engine, addr_name)
+            except Exception as e:
+                logger.debug(f"Failed to remove SNMP target {addr_name}: {e}")
+    
+    def stats(self) -> Dict[str, int]:
+        """Get pool statistics"""
+        return {
+            "targets": len(self._entries),
+            "credentials": len(self._auth_cache)
+        }
+
+
+class PysnmpBackend:
+    """SNMPCollector backend on top of pysnmp's hlapi and the shared engine pool"""
+    
+    def __init__(self, pool: SnmpEnginePool):
+        self.pool = pool
+    
+    async def get(self, ip, credentials, oids: List[str], timeout, retries, port=161):
+        """GET, returns (error_indication, error_status, error_index, var_binds)"""
+        engine, auth_data, target, context = self.pool.acquire(ip, credentials, timeout, retries, port)
+        return await getCmd(
+            engine, auth_data, target, context,
+            *[ObjectType(ObjectIdentity(oid)) for oid in oids],
+            lookupMib=False
+        )
+    
+    async def get_next(self, ip, credentials, oids: List[str], timeout, retries, port=161):
+        """GETNEXT, returns (error_indication, error_status, error_index, var_bind_table)"""
+        engine, auth_data, target, context = self.pool.acquire(ip, credentials, timeout, retries, port)
+        return await nextCmd(
+            engine, auth_data, target, context,
+            *[ObjectType(ObjectIdentity(oid)) for oid in oids],
+            lookupMib=False
+        )
+    
+    async def get_bulk(
+        self, ip, credentials, oids: List[str], max_repetitions, timeout, retries, port=161, non_repeaters=0
+    ):
+        """GETBULK, returns (error_indication, error_status, error_index, var_bind_table)"""
+        engine, auth_data, target, context = self.pool.acquire(ip, credentials, timeout, retries, port)
+        return await bulkCmd(
+            engine, auth_data, target, context,
+            non_repeaters, max_repetitions,
+            *[ObjectType(ObjectIdentity(oid)) for oid in oids],
+            lookupMib=False
+        )
+
+
+# Global pool instance
+_pool: Optional[SnmpEnginePool] = None
+
+
+def get_engine_pool() -> SnmpEnginePool:
+    """Get or create the global SNMP engine pool"""
+    global _pool
+    if _pool is None:
+        _pool = SnmpEnginePool(idle_timeout=get_settings().snmp_pool_idle_timeout)
+    return _pool
@@ -7,22 +7,28 @@ LLDP_REM_TABLE = "1.0.8802.1.1.2.1.4.1"
 LLDP_REM_CHASSIS_ID = "1.0.8802.1.1.2.1.4.1.1.5"
 LLDP_REM_PORT_ID = "1.0.8802.1.1.2.1.4.1.1.7"
 LLDP_REM_SYS_NAME = "1.0.8802.1.1.2.1.4.1.1.9"
+LLDP_REM_MAN_ADDR_IF_SUBTYPE = "1.0.8802.1.1.2.1.4.2.1.3"  # Index carries the management address
 LLDP_LOC_PORT_TABLE = "1.0.8802.1.1.2.1.3.7"
+LLDP_STATS_REM_LAST_CHANGE = "1.0.8802.1.1.2.1.2.1.0"  # lldpStatsRemTablesLastChangeTime
 
 # CDP OIDs (Cisco)
 CDP_CACHE_DEVICE_ID = "1.3.6.1.4.1.9.9.23.1.2.1.1.6"
 CDP_CACHE_DEVICE_PORT = "1.3.6.1.4.1.9.9.23.1.2.1.1.7"
 CDP_CACHE_PLATFORM = "1.3.6.1.4.1.9.9.23.1.2.1.1.8"
 CDP_CACHE_ADDRESS = "1.3.6.1.4.1.9.9.23.1.2.1.1.4"
+CDP_GLOBAL_RUN = "1.3.6.1.4.1.9.9.23.1.3.1.0"
 
 # Interface MIB OIDs
 IF_DESCR = "1.3.6.1.2.1.2.2.1.2"
 IF_SPEED = "1.3.6.1.2.1.2.2.1.5"
+IF_IN_OCTETS = "1.3.6.1.2.1.2.2.1.10"
+IF_OUT_OCTETS = "1.3.6.1.2.1.2.2.1.16"
 IF_HIGH_SPEED = "1.3.6.1.2.1.31.1.1.1.15"
 IF_HC_IN_OCTETS = "1.3.6.1.2.1.31.1.1.1.6"
 IF_HC_OUT_OCTETS = "1.3.6.1.2.1.31.1.1.1.10"
 IF_OPER_STATUS = "1.3.6.1.2.1.2.2.1.8"
 IF_ADMIN_STATUS = "1.3.6.1.2.1.2.2.1.7"
+IF_TABLE_LAST_CHANGE = "1.3.6.1.2.1.31.1.5.0"  # ifTableLastChange
 
 # System MIB OIDs
 SYS_NAME = "1.3.6.1.2.1.1.5.0"
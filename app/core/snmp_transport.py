@@ -0,0 +1,323 @@
+"""
+Native SNMP Transport - Lightweight asyncio SNMPv1/v2c engine
+One UDP socket, request-id multiplexing and timer-wheel driven retransmits,
+so tens of thousands of requests can be in flight without per-request setup
+"""
+import asyncio
+import itertools
+import logging
+import random
+import socket
+from typing import Callable, Dict, List, Optional, Tuple, Any
+
+from app.core.snmp_ber import (
+    encode_request, decode_response, BerError, ErrorStatus,
+    PDU_GET, PDU_GET_NEXT, PDU_GET_BULK, VERSION_V1, VERSION_V2C
+)
+
+logger = logging.getLogger(__name__)
+
+# Same wording as pysnmp's RequestTimedOut error indication
+REQUEST_TIMED_OUT = "No SNMP response received before timeout"
+
+_MAX_REQUEST_ID = 0x7FFFFFFF
+
+
+class TimerWheel:
+    """
+    Hashed timing wheel
+    Timers are bucketed into slots of `resolution` seconds; a single loop
+    callback advances the wheel, so scheduling/cancelling is O(1)
+    """
+    
+    def __init__(self, resolution: float = 0.05, slots: int = 1024):
+        self.resolution = resolution
+        self.slots: List[List[list]] = [[] for _ in range(slots)]
+        self._tick = 0
+        self._count = 0
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._started_at = 0.0
+    
+    def schedule(self, delay: float, callback: Callable[[], None]) -> list:
+        """Schedule callback after delay seconds, returns a handle for cancel()"""
+        loop = asyncio.get_running_loop()
+        if self._handle is None:
+            self._started_at = loop.time() - self._tick * self.resolution
+            self._handle = loop.call_later(self.resolution, self._advance)
+        
+        ticks = max(1, int(delay / self.resolution + 0.999))
+        slot = (self._tick + ticks) % len(self.slots)
+        # Entry: [remaining full rotations, callback]
+        entry = [(ticks - 1) // len(self.slots), callback]
+        self.slots[slot].append(entry)
+        self._count += 1
+        return entry
+    
+    def cancel(self, entry: list):
+        """Cancel a scheduled timer (lazily removed when its slot comes up)"""
+        if entry[1] is not None:
+            entry[1] = None
+            self._count -= 1
+    
+    def _advance(self):
+        loop = asyncio.get_running_loop()
+        # Catch up on every tick that has elapsed since the last callback
+        target_tick = int((loop.time() - self._started_at) / self.resolution)
+        
+        while self._tick < target_tick:
+            self._tick += 1
+            slot = self.slots[self._tick % len(self.slots)]
+            if not slot:
+                continue
+            
+            keep = []
+            for entry in slot:
+                if entry[1] is None:
+                    continue
+                if entry[0] > 0:
+                    entry[0] -= 1
+                    keep.append(entry)
+                    continue
+                callback, entry[1] = entry[1], None
+                self._count -= 1
+                try:
+                    callback()
+                except Exception as e:
+                    logger.error(f"Timer callback failed: {e}")
+            slot[:] = keep
+        
+        if self._count > 0:
+            next_at = self._started_at + (self._tick + 1) * self.resolution
+            self._handle = loop.call_at(next_at, self._advance)
+        else:
+            self._handle = None
+
+
+class _PendingRequest:
+    """Outstanding request waiting for its response"""
+    __slots__ = ("future", "addr", "packet", "timeout", "retries", "timer")
+    
+    def __init__(self, future, addr, packet, timeout, retries):
+        self.future = future
+        self.addr = addr
+        self.packet = packet
+        self.timeout = timeout
+        self.retries = retries
+        self.timer = None
+
+
+class SnmpTransport(asyncio.DatagramProtocol):
+    """Single-socket SNMP client multiplexing requests by request-id"""
+    
+    def __init__(self, recv_buffer: int = 4 * 1024 * 1024, timer_resolution: float = 0.05):
+        self.recv_buffer = recv_buffer
+        self.wheel = TimerWheel(resolution=timer_resolution)
+        self.transport: Optional[asyncio.DatagramTransport] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: Dict[int, _PendingRequest] = {}
+        self._request_ids = itertools.count(random.randint(1, _MAX_REQUEST_ID // 2))
+        self._resolved: Dict[str, str] = {}
+        self.stats = {"sent": 0, "received": 0, "retransmits": 0, "timeouts": 0, "dropped": 0}
+    
+    async def start(self):
+        """Open the UDP socket"""
+        self.loop = asyncio.get_running_loop()
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.recv_buffer)
+        except OSError:
+            pass
+        sock.bind(("0.0.0.0", 0))
+        await self.loop.create_datagram_endpoint(lambda: self, sock=sock)
+    
+    def connection_made(self, transport):
+        self.transport = transport
+    
+    def connection_lost(self, exc):
+        for pending in list(self._pending.values()):
+            if not pending.future.done():
+                pending.future.set_exception(ConnectionError("SNMP transport closed"))
+        self._pending.clear()
+        self.transport = None
+    
+    def datagram_received(self, data: bytes, addr):
+        try:
+            request_id, error_status, error_index, var_binds = decode_response(data)
+        except BerError as e:
+            self.stats["dropped"] += 1
+            logger.debug(f"Malformed SNMP response from {addr}: {e}")
+            return
+        
+        pending = self._pending.get(request_id)
+        if pending is None or pending.addr != addr[:2]:
+            # Late duplicate, or response spoofed from another address
+            self.stats["dropped"] += 1
+            return
+        
+        del self._pending[request_id]
+        self.wheel.cancel(pending.timer)
+        self.stats["received"] += 1
+        if not pending.future.done():
+            pending.future.set_result((error_status, error_index, var_binds))
+    
+    def error_received(self, exc):
+        logger.debug(f"SNMP transport error: {exc}")
+    
+    def close(self):
+        if self.transport is not None:
+            self.transport.close()
+    
+    @property
+    def in_flight(self) -> int:
+        return len(self._pending)
+    
+    def _next_request_id(self) -> int:
+        while True:
+            request_id = next(self._request_ids) % _MAX_REQUEST_ID + 1
+            if request_id not in self._pending:
+                return request_id
+    
+    async def _resolve(self, host: str) -> str:
+        """Resolve host to an IPv4 address (numeric hosts are returned as-is)"""
+        try:
+            socket.inet_aton(host)
+            return host
+        except OSError:
+            pass
+        
+        if host not in self._resolved:
+            infos = await self.loop.getaddrinfo(host, None, family=socket.AF_INET, type=socket.SOCK_DGRAM)
+            self._resolved[host] = infos[0][4][0]
+        return self._resolved[host]
+    
+    def _on_timeout(self, request_id: int):
+        pending = self._pending.get(request_id)
+        if pending is None:
+            return
+        
+        if pending.retries > 0 and self.transport is not None:
+            pending.retries -= 1
+            self.stats["retransmits"] += 1
+            self.transport.sendto(pending.packet, pending.addr)
+            pending.timer = self.wheel.schedule(pending.timeout, lambda: self._on_timeout(request_id))
+            return
+        
+        del self._pending[request_id]
+        self.stats["timeouts"] += 1
+        if not pending.future.done():
+            pending.future.set_exception(asyncio.TimeoutError())
+    
+    async def request(
+        self,
+        host: str,
+        port: int,
+        build_packet: Callable[[int], bytes],
+        timeout: float,
+        retries: int
+    ) -> Tuple[int, int, List[Tuple[Any, Any]]]:
+        """
+        Send a request and wait for the matching response
+        
+        Args:
+            build_packet: encodes the message for a given request-id
+        
+        Raises:
+            asyncio.TimeoutError if no response arrives after all retries
+        """
+        if self.transport is None:
+            raise ConnectionError("SNMP transport is not started")
+        
+        addr = (await self._resolve(host), port)
+        request_id = self._next_request_id()
+        packet = build_packet(request_id)
+        
+        pending = _PendingRequest(self.loop.create_future(), addr, packet, timeout, retries)
+        self._pending[request_id] = pending
+        pending.timer = self.wheel.schedule(timeout, lambda: self._on_timeout(request_id))
+        
+        self.stats["sent"] += 1
+        self.transport.sendto(packet, addr)
+        
+        try:
+            return await pending.future
+        finally:
+            if self._pending.get(request_id) is pending:
+                # Cancelled by the caller
+                del self._pending[request_id]
+                self.wheel.cancel(pending.timer)
+
+
+class NativeSnmpBackend:
+    """SNMPCollector backend on top of SnmpTransport (v1/v2c only)"""
+    
+    def __init__(self, transport: SnmpTransport):
+        self.transport = transport
+    
+    async def _command(
+        self, ip, credentials, pdu_type, oids, timeout, retries, port,
+        non_repeaters=0, max_repetitions=0
+    ):
+        version = VERSION_V1 if credentials.snmp_version == "v1" else VERSION_V2C
+        oid_tuples = [tuple(int(x) for x in oid.strip(".").split(".")) for oid in oids]
+        
+        def build_packet(request_id: int) -> bytes:
+            return encode_request(
+                version, credentials.community, pdu_type, request_id, oid_tuples,
+                non_repeaters, max_repetitions
+            )
+        
+        try:
+            error_status, error_index, var_binds = await self.transport.request(
+                ip, port, build_packet, timeout, retries
+            )
+        except asyncio.TimeoutError:
+            return REQUEST_TIMED_OUT, 0, 0, []
+        except (OSError, ConnectionError) as e:
+            return str(e), 0, 0, []
+        
+        return None, ErrorStatus(error_status), error_index, var_binds
+    
+    async def get(self, ip, credentials, oids, timeout, retries, port=161):
+        """GET, returns (error_indication, error_status, error_index, var_binds)"""
+        return await self._command(ip, credentials, PDU_GET, oids, timeout, retries, port)
+    
+    async def get_next(self, ip, credentials, oids, timeout, retries, port=161):
+        """GETNEXT, returns (error_indication, error_status, error_index, var_bind_table)"""
+        error_indication, error_status, error_index, var_binds = await self._command(
+            ip, credentials, PDU_GET_NEXT, oids, timeout, retries, port
+        )
+        return error_indication, error_status, error_index, [var_binds] if var_binds else []
+    
+    async def get_bulk(
+        self, ip, credentials, oids, max_repetitions, timeout, retries, port=161, non_repeaters=0
+    ):
+        """GETBULK, returns (error_indication, error_status, error_index, var_bind_table)"""
+        error_indication, error_status, error_index, var_binds = await self._command(
+            ip, credentials, PDU_GET_BULK, oids, timeout, retries, port,
+            non_repeaters, max_repetitions
+        )
+        
+        # Response is non-repeaters followed by repetitions of the remaining columns
+        width = len(oids) - non_repeaters
+        repeated = var_binds[non_repeaters:]
+        table = [repeated[i:i + width] for i in range(0, len(repeated) - width + 1, width)] if width else []
+        return error_indication, error_status, error_index, table
+
+
+# Global transport instance
+_transport: Optional[SnmpTransport] = None
+_transport_ready: Optional[asyncio.Task] = None
+
+
+async def get_native_backend() -> NativeSnmpBackend:
+    """Get or start the global native SNMP backend for the running loop"""
+    global _transport, _transport_ready
+    loop = asyncio.get_running_loop()
+    if _transport is None or _transport.loop is not loop:
+        # Publish before awaiting so concurrent callers share one socket
+        _transport = SnmpTransport()
+        _transport.loop = loop
+        _transport_ready = loop.create_task(_transport.start())
+        logger.info("Native SNMP transport started")
+    await _transport_ready
+    return NativeSnmpBackend(_transport)
@@ -0,0 +1,131 @@
+"""
+Table Cache - Cross-cycle cache of slow-changing SNMP tables
+Neighbor tables and ifDescr are only re-walked when the device's change
+markers (lldpStatsRemTablesLastChangeTime, ifTableLastChange) move, the
+device reboots, or the cached copy gets too old
+"""
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Any
+
+from app.config import get_settings
+
+
+@dataclass
+class ChangeMarkers:
+    """Change-detection scalars read at the start of a poll (TimeTicks)"""
+    sys_uptime: int
+    lldp_last_change: Optional[int] = None
+    if_last_change: Optional[int] = None
+
+
+@dataclass
+class CachedTables:
+    """Tables walked at the time the markers were read"""
+    markers: ChangeMarkers
+    if_descr: Dict[str, Any] = field(default_factory=dict)
+    lldp_neighbors: Optional[List[Any]] = None
+    cdp_neighbors: Optional[List[Any]] = None
+    walked_at: float = field(default_factory=time.monotonic)
+
+
+@dataclass
+class ReusableTables:
+    """Which cached tables are still valid for this poll"""
+    if_descr: Optional[Dict[str, Any]] = None
+    lldp_neighbors: Optional[List[Any]] = None
+    cdp_neighbors: Optional[List[Any]] = None
+
+
+class TableCache:
+    """Per-device cache of ifDescr and LLDP/CDP neighbor lists"""
+    
+    def __init__(self, max_age: int = 3600):
+        self.max_age = max_age
+        self._entries: Dict[str, CachedTables] = {}
+    
+    def lookup(self, ip: str, markers: ChangeMarkers) -> ReusableTables:
+        """Get the cached tables that are unchanged according to markers"""
+        reusable = ReusableTables()
+        cached = self._entries.get(ip)
+        if cached is None:
+            return reusable
+        
+        previous = cached.markers
+        if (markers.sys_uptime < previous.sys_uptime
+                or time.monotonic() - cached.walked_at >= self.max_age):
+            # Rebooted (or sysUpTime wrapped), or too old to trust
+            self._entries.pop(ip, None)
+            return reusable
+        
+        # ifTableLastChange covers ifDescr, which neighbor port names are built from
+        if markers.if_last_change is None or markers.if_last_change != previous.if_last_change:
+            return reusable
+        reusable.if_descr = cached.if_descr
+        
+        # CDP has no change marker, the LLDP one is used as a proxy, so devices
+        # without lldpStatsRemTablesLastChangeTime get both tables re-walked
+        lldp_unchanged = markers.lldp_last_change == previous.lldp_last_change
+        if markers.lldp_last_change is not None and lldp_unchanged:
+            reusable.lldp_neighbors = cached.lldp_neighbors
+            reusable.cdp_neighbors = cached.cdp_neighbors
+        
+        return reusable
+    
+    def store(
+        self,
+        ip: str,
+        markers: ChangeMarkers,
+        if_descr: Dict[str, Any],
+        lldp_neighbors: Optional[List[Any]],
+        cdp_neighbors: Optional[List[Any]],
+        refreshed: bool
+    ):
+        """
+        Save the tables of a successful poll
+        
+        Args:
+            refreshed: the tables were re-walked, restarts the max_age clock
+        """
+        cached = self._entries.get(ip)
+        walked_at = cached.walked_at if cached is not None and not refreshed else time.monotonic()
+        self._entries[ip] = CachedTables(
+            markers=markers,
+            if_descr=if_descr,
+            lldp_neighbors=lldp_neighbors,
+            cdp_neighbors=cdp_neighbors,
+            walked_at=walked_at
+        )
+    
+    def store_if_descr(self, ip: str, markers: ChangeMarkers, if_descr: Dict[str, Any]):
+        """Save a re-walked ifDescr from a poll that did not read the neighbor tables"""
+        cached = self._entries.get(ip)
+        if cached is None:
+            self._entries[ip] = CachedTables(markers=markers, if_descr=if_descr)
+            return
+        
+        # Neighbor port names came from the old ifDescr, have them re-walked
+        cached.markers = ChangeMarkers(
+            sys_uptime=markers.sys_uptime,
+            lldp_last_change=cached.markers.lldp_last_change,
+            if_last_change=markers.if_last_change
+        )
+        cached.if_descr = if_descr
+        cached.lldp_neighbors = None
+        cached.cdp_neighbors = None
+    
+    def forget(self, ip: str):
+        """Drop the cached tables for a device"""
+        self._entries.pop(ip, None)
+
+
+# Global cache instance
+_cache: Optional[TableCache] = None
+
+
+def get_table_cache() -> TableCache:
+    """Get or create the global table cache"""
+    global _cache
+    if _cache is None:
+        _cache = TableCache(max_age=get_settings().snmp_table_cache_max_age)
+    return _cache
@@ -0,0 +1,531 @@
+"""
+Time Series Store - Columnar storage for interface, link and device metrics
+Samples land on a fixed time grid in dense float32 chunks, one column per
+series, so a sample costs 4 bytes on disk and no per-sample row or index.
+The open chunk lives in memory and in an append-only log; closed chunks are
+written as series-major .npy files and rolled up to 1m/5m/1h avg/max.
+"""
+import logging
+import os
+import threading
+import time
+import warnings
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Span of one raw chunk, every rollup step divides it or is a multiple of it
+_CHUNK_SPAN = 600
+
+# Rollup resolutions and their steps in seconds
+ROLLUPS = {"1m": 60, "5m": 300, "1h": 3600}
+
+# Write-ahead log record of the open chunk: absolute grid slot, series column, value
+_LOG_RECORD = np.dtype([("slot", "<u4"), ("column", "<u4"), ("value", "<f4")])
+
+_LOG_FILE = "head.log"
+_SERIES_FILE = "series.txt"
+
+
+def interface_series(device_id: int, if_index: int, metric: str) -> str:
+    """Series name of an interface metric (in_bps, out_bps)"""
+    return f"if.{device_id}.{if_index}.{metric}"
+
+
+def link_series(device_a_id: int, device_b_id: int, metric: str) -> str:
+    """Series name of a merged link metric (util_in, util_out)"""
+    return f"link.{device_a_id}.{device_b_id}.{metric}"
+
+
+def device_series(device_id: int, metric: str) -> str:
+    """Series name of a device metric (cpu, memory)"""
+    return f"dev.{device_id}.{metric}"
+
+
+def parse_retention(value: str) -> Dict[str, int]:
+    """Parse "raw=2,1m=14,5m=90,1h=730" (days) into {resolution: seconds}"""
+    retention = {}
+    for item in value.split(","):
+        if "=" not in item:
+            continue
+        resolution, days = item.split("=", 1)
+        resolution = resolution.strip()
+        if resolution != "raw" and resolution not in ROLLUPS:
+            logger.warning(f"Ignoring retention for unknown resolution '{resolution}'")
+            continue
+        try:
+            retention[resolution] = int(float(days) * 86400)
+        except ValueError:
+            logger.warning(f"Ignoring invalid retention '{item.strip()}'")
+    return retention
+
+
+@dataclass
+class SeriesData:
+    """Query result on a regular time grid, NaN where there is no sample"""
+    resolution: str
+    step: int
+    timestamps: np.ndarray
+    values: Dict[str, np.ndarray] = field(default_factory=dict)
+    maxima: Dict[str, np.ndarray] = field(default_factory=dict)  # Same as values for raw
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Largest-Triangle-Three-Buckets downsampling to threshold points
+    Keeps the first and last point and, per bucket, the point forming the largest
+    triangle with the previously kept point and the next bucket's average
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return x, y
+    
+    every = (n - 2) / (threshold - 2)
+    # Bucket i covers [bounds[i], bounds[i + 1]), the last bucket's average includes the end point
+    bounds = np.minimum((np.arange(threshold - 1) * every).astype(np.int64) + 1, n - 1)
+    avg_bounds = np.append(bounds[1:], n)
+    avg_x = np.add.reduceat(x, avg_bounds[:-1]) / np.diff(avg_bounds)
+    avg_y = np.add.reduceat(y, avg_bounds[:-1]) / np.diff(avg_bounds)
+    
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = bounds[i], max(bounds[i + 1], bounds[i] + 1)
+        area = np.abs(
+            (x[a] - avg_x[i]) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y[i] - y[a])
+        )
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    return x[keep], y[keep]
+
+
+def _save(path: str, array: np.ndarray):
+    """Write an .npy file atomically"""
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp, path)
+
+
+def _quiet_nan_reduce(func, array: np.ndarray, axis: int) -> np.ndarray:
+    """nanmean/nanmax without the warning for all-NaN slices"""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return func(array, axis=axis)
+
+
+class TimeSeriesStore:
+    """
+    Chunked time series on disk
+    
+    Layout (under path):
+        series.txt           series names, one per line, line number is the column
+        head.log             samples of the open raw chunk
+        raw/<start>.npy      float32 (series, slots) for one chunk
+        1m|5m|1h/<start>.npy float32 (2, series, slots), avg then max
+    
+    Only one process may open the store writable; readers see closed chunks
+    from the files and the open chunk by replaying head.log.
+    """
+    
+    def __init__(
+        self,
+        path: str,
+        step: int = 30,
+        retention: Optional[Dict[str, int]] = None,
+        writable: bool = False
+    ):
+        if step <= 0 or 60 % step:
+            raise ValueError(f"Time series step must divide 60 seconds, got {step}")
+        self.path = path
+        self.step = step
+        self.retention = retention or {}
+        self.writable = writable
+        self._slots = _CHUNK_SPAN // step
+        self._names: List[str] = []
+        self._columns: Dict[str, int] = {}
+        self._series_offset = 0
+        self._series_lock = threading.Lock()  # Readers may query from several threads
+        self._head_lock = threading.Lock()  # The collector writes from its own thread
+        self._head: Optional[np.ndarray] = None  # float32 (slots, capacity)
+        self._head_start: Optional[int] = None
+        
+        if writable:
+            for resolution in ["raw"] + list(ROLLUPS):
+                os.makedirs(os.path.join(path, resolution), exist_ok=True)
+            self._load_series()
+            self._replay_log()
+    
+    def _file(self, *parts: str) -> str:
+        return os.path.join(self.path, *parts)
+    
+    # -- Series registry --
+    
+    def _load_series(self):
+        """Load series added since the last load, the file is append-only"""
+        with self._series_lock:
+            self._read_new_series()
+    
+    def _read_new_series(self):
+        try:
+            with open(self._file(_SERIES_FILE), "rb") as f:
+                f.seek(self._series_offset)
+                data = f.read()
+        except OSError:
+            return
+        # The writer may be in the middle of appending a line
+        complete = data.rfind(b"\n") + 1
+        for name in data[:complete].decode().splitlines():
+            self._columns[name] = len(self._names)
+            self._names.append(name)
+        self._series_offset += complete
+    
+    def _register(self, names: List[str]) -> np.ndarray:
+        """Column numbers for names, adding new series at the end"""
+        with self._series_lock:
+            added = [name for name in dict.fromkeys(names) if name not in self._columns]
+            if added:
+                data = "".join(f"{name}\n" for name in added).encode()
+                with open(self._file(_SERIES_FILE), "ab") as f:
+                    f.write(data)
+                self._series_offset += len(data)
+                for name in added:
+                    self._columns[name] = len(self._names)
+                    self._names.append(name)
+            return np.array([self._columns[name] for name in names], dtype=np.uint32)
+    
+    # -- Writing --
+    
+    def _chunk_start(self, timestamp: float) -> int:
+        return int(timestamp) - int(timestamp) % _CHUNK_SPAN
+    
+    def _open_head(self, start: int):
+        self._head_start = start
+        self._head = np.full((self._slots, max(1024, len(self._names))), np.nan, dtype=np.float32)
+    
+    def _ensure_capacity(self, columns: int):
+        if self._head.shape[1] >= columns:
+            return
+        capacity = max(columns, self._head.shape[1] * 2)
+        grown = np.full((self._slots, capacity), np.nan, dtype=np.float32)
+        grown[:, :self._head.shape[1]] = self._head
+        self._head = grown
+    
+    def _store(self, slots: np.ndarray, columns: np.ndarray, values: np.ndarray):
+        """Put samples into the open chunk, in memory only"""
+        self._ensure_capacity(int(columns.max()) + 1)
+        self._head[slots - self._head_start // self.step, columns] = values
+    
+    def write(self, samples: Dict[str, float], timestamp: Optional[float] = None):
+        """Record samples taken at timestamp (default now)"""
+        self.write_many([(samples, timestamp)])
+    
+    def write_many(self, batch: List[Tuple[Dict[str, float], Optional[float]]]):
+        """Record (samples, timestamp) pairs with one head.log append per chunk they fall in"""
+        if not self.writable:
+            raise RuntimeError("Time series store is open read-only")
+        now = time.time()
+        batch = sorted(
+            ((samples, timestamp if timestamp is not None else now) for samples, timestamp in batch if samples),
+            key=lambda entry: entry[1]
+        )
+        with self._head_lock:
+            i = 0
+            while i < len(batch):
+                start = self._chunk_start(batch[i][1])
+                group = []
+                while i < len(batch) and self._chunk_start(batch[i][1]) == start:
+                    group.append(batch[i])
+                    i += 1
+                self._write_chunk(start, group)
+    
+    def _write_chunk(self, start: int, group: List[Tuple[Dict[str, float], float]]):
+        if self._head_start is not None and start < self._head_start:
+            logger.debug(f"Dropping {sum(len(samples) for samples, _ in group)} samples older than the open chunk")
+            return
+        if self._head_start is not None and start > self._head_start:
+            self._close_head()
+        if self._head_start is None:
+            self._open_head(start)
+        
+        columns = self._register([name for samples, _ in group for name in samples])
+        values = np.fromiter(
+            (value for samples, _ in group for value in samples.values()), dtype=np.float32, count=len(columns)
+        )
+        slots = np.concatenate([
+            np.full(len(samples), int(timestamp) // self.step, dtype=np.uint32) for samples, timestamp in group
+        ])
+        self._store(slots, columns, values)
+        
+        records = np.empty(len(columns), dtype=_LOG_RECORD)
+        records["slot"] = slots
+        records["column"] = columns
+        records["value"] = values
+        with open(self._file(_LOG_FILE), "ab") as f:
+            records.tofile(f)
+    
+    def _read_log(self) -> np.ndarray:
+        try:
+            with open(self._file(_LOG_FILE), "rb") as f:
+                data = f.read()
+        except OSError:
+            return np.empty(0, dtype=_LOG_RECORD)
+        # A record may be half written by the writer right now
+        usable = len(data) - len(data) % _LOG_RECORD.itemsize
+        return np.frombuffer(data[:usable], dtype=_LOG_RECORD)
+    
+    def _replay_log(self):
+        """Rebuild the open chunk after a restart"""
+        records = self._read_log()
+        if not len(records):
+            return
+        self._open_head(self._chunk_start(int(records["slot"][0]) * self.step))
+        first = self._head_start // self.step
+        records = records[(records["slot"] >= first) & (records["slot"] < first + self._slots)]
+        if len(records):
+            self._store(records["slot"].astype(np.int64), records["column"], records["value"])
+        logger.info(f"Recovered {len(records)} time series samples from the open chunk")
+    
+    def _close_head(self):
+        """Write the open chunk and its rollups, then apply retention"""
+        start = self._head_start
+        width = len(self._names)
+        raw = self._head[:, :width]
+        _save(self._file("raw", f"{start}.npy"), np.ascontiguousarray(raw.T))
+        
+        for resolution in ("1m", "5m"):
+            step = ROLLUPS[resolution]
+            buckets = raw.reshape(_CHUNK_SPAN // step, step // self.step, width)
+            rollup = np.stack([
+                _quiet_nan_reduce(np.nanmean, buckets, axis=1).T,
+                _quiet_nan_reduce(np.nanmax, buckets, axis=1).T
+            ])
+            _save(self._file(resolution, f"{start}.npy"), rollup.astype(np.float32))
+        
+        end = start + _CHUNK_SPAN
+        if end % ROLLUPS["1h"] == 0:
+            self._roll_up_hour(end - ROLLUPS["1h"])
+        
+        self._head = None
+        self._head_start = None
+        os.truncate(self._file(_LOG_FILE), 0)
+        self._apply_retention(end)
+    
+    def _roll_up_hour(self, hour: int):
+        """Build the 1h rollup from the 5m rollups of that hour"""
+        parts = [
+            np.load(path) for path in self._chunk_files("5m", hour, hour + ROLLUPS["1h"])
+        ]
+        if not parts:
+            return
+        width = max(part.shape[1] for part in parts)
+        stacked = np.full((2, width, sum(part.shape[2] for part in parts)), np.nan, dtype=np.float32)
+        offset = 0
+        for part in parts:
+            stacked[:, :part.shape[1], offset:offset + part.shape[2]] = part
+            offset += part.shape[2]
+        rollup = np.stack([
+            _quiet_nan_reduce(np.nanmean, stacked[0], axis=1),
+            _quiet_nan_reduce(np.nanmax, stacked[1], axis=1)
+        ])[:, :, np.newaxis]
+        _save(self._file("1h", f"{hour}.npy"), rollup.astype(np.float32))
+    
+    def _apply_retention(self, now: float):
+        for resolution, seconds in self.retention.items():
+            span = max(_CHUNK_SPAN, ROLLUPS.get(resolution, 0))
+            for start, path in self._list_chunks(resolution):
+                if start + span <= now - seconds:
+                    os.remove(path)
+    
+    # -- Reading --
+    
+    def _list_chunks(self, resolution: str) -> List[Tuple[int, str]]:
+        directory = self._file(resolution)
+        try:
+            entries = os.listdir(directory)
+        except OSError:
+            return []
+        chunks = []
+        for entry in entries:
+            if entry.endswith(".npy") and entry[:-4].isdigit():
+                chunks.append((int(entry[:-4]), os.path.join(directory, entry)))
+        return sorted(chunks)
+    
+    def _chunk_files(self, resolution: str, start: float, end: float) -> List[str]:
+        """Chunk files of a resolution that overlap [start, end)"""
+        span = max(_CHUNK_SPAN, ROLLUPS.get(resolution, 0))
+        return [path for chunk_start, path in self._list_chunks(resolution)
+                if chunk_start < end and chunk_start + span > start]
+    
+    def resolution_step(self, resolution: str) -> int:
+        return self.step if resolution == "raw" else ROLLUPS[resolution]
+    
+    def pick_resolution(self, start: float, end: float, points: int = 1000) -> str:
+        """Coarsest resolution that still holds start and gives at least points samples, else the finest that does"""
+        now = time.time()
+        picked = "1h"
+        for resolution in reversed(["raw"] + list(ROLLUPS)):
+            retention = self.retention.get(resolution)
+            if retention is not None and start < now - retention:
+                continue
+            picked = resolution
+            if (end - start) / self.resolution_step(resolution) >= points:
+                break
+        return picked
+    
+    def series_names(self, prefix: str = "") -> List[str]:
+        """Known series, optionally only those starting with prefix"""
+        self._load_series()
+        return [name for name in self._names if name.startswith(prefix)]
+    
+    def query(
+        self,
+        names: List[str],
+        start: float,
+        end: float,
+        resolution: Optional[str] = None
+    ) -> SeriesData:
+        """Read series over [start, end) at a resolution (picked from the range if None)"""
+        self._load_series()
+        resolution = resolution or self.pick_resolution(start, end)
+        step = self.resolution_step(resolution)
+        first = int(start) // step
+        count = max(0, (int(end) - 1) // step - first + 1)
+        
+        known = [name for name in names if name in self._columns]
+        columns = np.array([self._columns[name] for name in known], dtype=np.int64)
+        avg = np.full((len(known), count), np.nan, dtype=np.float32)
+        peak = np.full((len(known), count), np.nan, dtype=np.float32)
+        
+        def place(chunk_first: int, chunk_avg: np.ndarray, chunk_max: np.ndarray):
+            # chunk arrays are (series, slots) starting at grid slot chunk_first
+            lo = max(first, chunk_first)
+            hi = min(first + count, chunk_first + chunk_avg.shape[1])
+            if lo >= hi:
+                return
+            present = columns < chunk_avg.shape[0]
+            rows = np.flatnonzero(present)
+            src = slice(lo - chunk_first, hi - chunk_first)
+            avg[rows, lo - first:hi - first] = chunk_avg[columns[present], src]
+            peak[rows, lo - first:hi - first] = chunk_max[columns[present], src]
+        
+        if len(known) and count:
+            covered = first * step  # Where the chunk files read so far end
+            span = max(_CHUNK_SPAN, step)
+            for path in self._chunk_files(resolution, start, end):
+                chunk_start = int(os.path.basename(path)[:-4])
+                data = np.load(path, mmap_mode="r")
+                if resolution == "raw":
+                    place(chunk_start // step, data, data)
+                else:
+                    place(chunk_start // step, data[0], data[1])
+                covered = max(covered, chunk_start + span)
+            if resolution == "raw":
+                self._query_head(columns, first, count, avg)
+                peak = avg
+            elif covered < (first + count) * step:
+                # Recent samples are not rolled up yet (open chunk, current hour)
+                self._roll_up_tail(known, covered, end, first, step, avg, peak)
+        
+        timestamps = (np.arange(first, first + count, dtype=np.int64) * step).astype(np.float64)
+        return SeriesData(
+            resolution=resolution,
+            step=step,
+            timestamps=timestamps,
+            values={name: avg[i] for i, name in enumerate(known)},
+            maxima={name: peak[i] for i, name in enumerate(known)}
+        )
+    
+    def _roll_up_tail(
+        self,
+        names: List[str],
+        start: int,
+        end: float,
+        first: int,
+        step: int,
+        avg: np.ndarray,
+        peak: np.ndarray
+    ):
+        """Fill rollup query results from [start, end) by aggregating raw samples"""
+        raw = self.query(names, start, end, "raw")
+        samples = len(raw.timestamps)
+        if not samples:
+            return
+        per_bucket = step // self.step
+        buckets = -(-samples // per_bucket)
+        block = np.full((len(names), buckets * per_bucket), np.nan, dtype=np.float32)
+        for i, name in enumerate(names):
+            block[i, :samples] = raw.values[name]
+        block = block.reshape(len(names), buckets, per_bucket)
+        
+        lo = start // step - first
+        hi = min(avg.shape[1], lo + buckets)
+        avg[:, lo:hi] = _quiet_nan_reduce(np.nanmean, block, axis=2)[:, :hi - lo]
+        peak[:, lo:hi] = _quiet_nan_reduce(np.nanmax, block, axis=2)[:, :hi - lo]
+    
+    def _query_head(self, columns: np.ndarray, first: int, count: int, out: np.ndarray):
+        """Fill raw query results from the open chunk"""
+        if self.writable:
+            with self._head_lock:
+                if self._head is None:
+                    return
+                head_first = self._head_start // self.step
+                lo, hi = max(first, head_first), min(first + count, head_first + self._slots)
+                if lo >= hi:
+                    return
+                present = columns < self._head.shape[1]
+                rows = np.flatnonzero(present)
+                out[rows, lo - first:hi - first] = self._head[lo - head_first:hi - head_first][:, columns[present]].T
+            return
+        
+        records = self._read_log()
+        in_range = (records["slot"] >= first) & (records["slot"] < first + count)
+        records = records[in_range]
+        if not len(records):
+            return
+        # Map series columns to result rows, -1 for series not asked for
+        lookup = np.full(int(max(columns.max(), records["column"].max())) + 1, -1, dtype=np.int64)
+        lookup[columns] = np.arange(len(columns))
+        rows = lookup[records["column"]]
+        wanted = rows >= 0
+        out[rows[wanted], records["slot"][wanted].astype(np.int64) - first] = records["value"][wanted]
+    
+    def stats(self) -> Dict[str, int]:
+        """Series count and bytes on disk per resolution"""
+        self._load_series()
+        stats = {"series": len(self._names)}
+        for resolution in ["raw"] + list(ROLLUPS):
+            stats[f"{resolution}_bytes"] = sum(
+                os.path.getsize(path) for _, path in self._list_chunks(resolution)
+            )
+        return stats
+    
+    def close(self):
+        """Nothing to flush, the open chunk is already in head.log"""
+        with self._head_lock:
+            self._head = None
+            self._head_start = None
+
+
+# Global store instance
+_store: Optional[TimeSeriesStore] = None
+
+
+def get_timeseries_store(writable: bool = False) -> TimeSeriesStore:
+    """Get or create the global time series store, the collector opens it writable"""
+    global _store
+    if _store is None:
+        settings = get_settings()
+        _store = TimeSeriesStore(
+            settings.timeseries_path,
+            step=settings.timeseries_step,
+            retention=parse_retention(settings.timeseries_retention),
+            writable=writable
+        )
+    return _store
@@ -7,11 +7,12 @@ from typing import List, Dict, Optional, Tuple
 from dataclasses import dataclass, field
 from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, or_
+from sqlalchemy import select, insert, update, and_, or_
 
 from app.models.device import Device
 from app.models.link import RawLink, MergedLink
 from app.models.group import DeviceGroupMember
+from app.core.identity_index import DeviceIdentityIndex
 
 logger = logging.getLogger(__name__)
 
@@ -25,6 +26,8 @@ class PortInfo:
     in_bps: int = 0
     out_bps: int = 0
     utilization_percent: float = 0.0
+    device_id: Optional[int] = None  # Device reporting the port, for its metric history
+    if_index: Optional[int] = None
 
 
 @dataclass
@@ -42,14 +45,23 @@ class MergedLinkInfo:
     port_details: List[PortInfo] = field(default_factory=list)
 
 
+def _port_key(port_name: Optional[str]) -> Optional[str]:
+    """Port name for matching the reports of both ends of a cable"""
+    if not port_name:
+        return None
+    return "".join(port_name.split()).lower()
+
+
 class TopologyEngine:
     """
     Builds and manages network topology
     Merges multiple links between same device pairs
     """
     
-    def __init__(self, db: AsyncSession):
+    def __init__(self, db: AsyncSession, identity_index: Optional[DeviceIdentityIndex] = None):
         self.db = db
+        # Shared index from the collector, otherwise one is built from the device table
+        self.identity_index = identity_index
     
     async def get_device_map(self) -> Dict[str, Device]:
         """Get mapping of hostname to device"""
@@ -76,35 +88,35 @@ class TopologyEngine:
         
         # Get device hostname map
         device_map = await self.get_device_map()
+        devices_by_id = {d.id: d for d in device_map.values()}
+        index = self.identity_index or DeviceIdentityIndex.from_devices(devices_by_id.values())
         
         # Group links by device pair (sorted to ensure consistent key)
         link_groups: Dict[Tuple[int, int], List[RawLink]] = {}
+        unresolved = []
         
         for raw_link, local_device in raw_links:
-            # Try to find the remote device
-            remote_device = device_map.get(raw_link.remote_hostname)
-            
-            if not remote_device:
-                # Remote device not in our database yet
+            # Try to find the remote device by name (short or FQDN), address or chassis id
+            remote_id = index.lookup(raw_link.remote_hostname, raw_link.remote_address, raw_link.remote_chassis_id)
+            if remote_id is None:
+                unresolved.append((raw_link, local_device))
                 continue
-            
-            # Create consistent key (smaller id first)
-            if local_device.id < remote_device.id:
-                key = (local_device.id, remote_device.id)
-            else:
-                key = (remote_device.id, local_device.id)
-            
-            if key not in link_groups:
-                link_groups[key] = []
-            link_groups[key].append(raw_link)
+            self._group_link(link_groups, raw_link, local_device.id, remote_id)
+            index.learn(remote_id, chassis_id=raw_link.remote_chassis_id, address=raw_link.remote_address)
+        
+        # A chassis id learned from another link can identify a neighbor reported under a different name
+        for raw_link, local_device in unresolved:
+            remote_id = index.lookup(chassis_id=raw_link.remote_chassis_id)
+            if remote_id is not None:
+                self._group_link(link_groups, raw_link, local_device.id, remote_id)
         
         # Build merged links
         merged_links = []
         
         for (device_a_id, device_b_id), links in link_groups.items():
             # Get device info
-            device_a = await self._get_device_by_id(device_a_id)
-            device_b = await self._get_device_by_id(device_b_id)
+            device_a = devices_by_id.get(device_a_id)
+            device_b = devices_by_id.get(device_b_id)
             
             if not device_a or not device_b:
                 continue
@@ -115,17 +127,36 @@ class TopologyEngine:
             total_in_bps = 0
             total_out_bps = 0
             
-            for link in links:
-                # Estimate bandwidth from port name (simplified)
-                bandwidth = self._estimate_bandwidth(link.local_port)
+            for link in self._one_per_cable(links, device_a_id):
+                rate = self._get_port_rate(devices_by_id.get(link.local_device_id), link)
+                
+                # Measured speed when known, else estimate bandwidth from port name (simplified)
+                if rate and rate.get("speed_mbps"):
+                    bandwidth = rate["speed_mbps"]
+                else:
+                    bandwidth = self._estimate_bandwidth(link.local_port)
                 total_bandwidth += bandwidth
                 
+                # In/out are as seen by device A, a link reported by device B is reversed
+                in_bps = out_bps = 0
+                if rate:
+                    if link.local_device_id == device_a_id:
+                        in_bps, out_bps = rate["in_bps"], rate["out_bps"]
+                    else:
+                        in_bps, out_bps = rate["out_bps"], rate["in_bps"]
+                total_in_bps += in_bps
+                total_out_bps += out_bps
+                
+                port_bps = bandwidth * 1_000_000
                 port_details.append(PortInfo(
                     local_port=link.local_port,
                     remote_port=link.remote_port,
                     bandwidth_mbps=bandwidth,
-                    in_bps=0,  # Will be updated by collector
-                    out_bps=0
+                    in_bps=in_bps,
+                    out_bps=out_bps,
+                    utilization_percent=(max(in_bps, out_bps) / port_bps) * 100 if port_bps > 0 else 0.0,
+                    device_id=link.local_device_id,
+                    if_index=link.local_port_index
                 ))
             
             # Calculate utilization
@@ -152,58 +183,56 @@ class TopologyEngine:
         
         return merged_links
     
-    async def update_merged_links_in_db(self):
-        """Update merged_links table from raw_links"""
+    async def update_merged_links_in_db(self) -> List[MergedLinkInfo]:
+        """Update merged_links table from raw_links, returns the merged links"""
         merged = await self.merge_links()
         
+        # One SELECT for the existing links, then one executemany UPDATE and INSERT
+        existing = await self.db.execute(
+            select(MergedLink.id, MergedLink.device_a_id, MergedLink.device_b_id)
+        )
+        link_ids = {(row.device_a_id, row.device_b_id): row.id for row in existing}
+        
+        now = datetime.utcnow()
+        updates = []
+        inserts = []
         for link_info in merged:
-            # Check if merged link exists
-            existing = await self.db.execute(
-                select(MergedLink).where(
-                    and_(
-                        MergedLink.device_a_id == link_info.device_a_id,
-                        MergedLink.device_b_id == link_info.device_b_id
-                    )
-                )
-            )
-            merged_link = existing.scalar_one_or_none()
-            
-            port_details_json = [
-                {
-                    "local_port": p.local_port,
-                    "remote_port": p.remote_port,
-                    "bandwidth_mbps": p.bandwidth_mbps,
-                    "in_bps": p.in_bps,
-                    "out_bps": p.out_bps
-                }
-                for p in link_info.port_details
-            ]
-            
-            if merged_link:
-                # Update existing
-                merged_link.total_bandwidth_mbps = link_info.total_bandwidth_mbps
-                merged_link.current_in_bps = link_info.current_in_bps
-                merged_link.current_out_bps = link_info.current_out_bps
-                merged_link.utilization_in_percent = link_info.utilization_in_percent
-                merged_link.utilization_out_percent = link_info.utilization_out_percent
-                merged_link.port_details = port_details_json
-                merged_link.last_updated = datetime.utcnow()
+            values = {
+                "total_bandwidth_mbps": link_info.total_bandwidth_mbps,
+                "current_in_bps": link_info.current_in_bps,
+                "current_out_bps": link_info.current_out_bps,
+                "utilization_in_percent": link_info.utilization_in_percent,
+                "utilization_out_percent": link_info.utilization_out_percent,
+                "port_pairs": [
+                    {
+                        "local_port": p.local_port,
+                        "remote_port": p.remote_port,
+                        "bandwidth_mbps": p.bandwidth_mbps,
+                        "in_bps": p.in_bps,
+                        "out_bps": p.out_bps,
+                        "utilization_percent": p.utilization_percent,
+                        "device_id": p.device_id,
+                        "if_index": p.if_index
+                    }
+                    for p in link_info.port_details
+                ],
+                "last_updated": now
+            }
+            link_id = link_ids.get((link_info.device_a_id, link_info.device_b_id))
+            if link_id is not None:
+                updates.append(dict(values, id=link_id))
             else:
-                # Create new
-                merged_link = MergedLink(
-                    device_a_id=link_info.device_a_id,
-                    device_b_id=link_info.device_b_id,
-                    total_bandwidth_mbps=link_info.total_bandwidth_mbps,
-                    current_in_bps=link_info.current_in_bps,
-                    current_out_bps=link_info.current_out_bps,
-                    utilization_in_percent=link_info.utilization_in_percent,
-                    utilization_out_percent=link_info.utilization_out_percent,
-                    port_details=port_details_json
-                )
-                self.db.add(merged_link)
+                inserts.append(dict(values, device_a_id=link_info.device_a_id, device_b_id=link_info.device_b_id))
+        
+        if updates:
+            # Bulk UPDATE by primary key
+            await self.db.execute(update(MergedLink), updates)
+        if inserts:
+            await self.db.execute(insert(MergedLink), inserts)
         
         await self.db.commit()
         logger.info(f"Updated {len(merged)} merged links")
+        return merged
     
     async def get_topology_for_view(
         self,
@@ -359,7 +388,7 @@ class TopologyEngine:
                     "utilization_in_percent": link.utilization_in_percent or 0,
                     "utilization_out_percent": link.utilization_out_percent or 0,
                     "status": self._get_link_status(max_util),
-                    "port_details": link.port_details or []
+                    "port_details": link.port_pairs or []
                 })
         
         return {
@@ -368,12 +397,57 @@ class TopologyEngine:
             "last_updated": datetime.utcnow().isoformat()
         }
     
-    async def _get_device_by_id(self, device_id: int) -> Optional[Device]:
-        """Get device by ID"""
-        result = await self.db.execute(
-            select(Device).where(Device.id == device_id)
-        )
-        return result.scalar_one_or_none()
+    def _group_link(
+        self, link_groups: Dict[Tuple[int, int], List[RawLink]], raw_link: RawLink, local_id: int, remote_id: int
+    ):
+        """Add a raw link to its device pair (smaller id first), self-links are dropped"""
+        if local_id == remote_id:
+            return
+        key = (local_id, remote_id) if local_id < remote_id else (remote_id, local_id)
+        link_groups.setdefault(key, []).append(raw_link)
+    
+    def _one_per_cable(self, links: List[RawLink], device_a_id: int) -> List[RawLink]:
+        """
+        Keep one raw link per physical port of a device pair
+        
+        Each cable is usually reported by both ends and by LLDP as well as CDP.
+        Device A's own reports come first, a report from device B is kept only
+        if neither of its port names matches a cable already seen.
+        """
+        kept = []
+        seen_indexes = set()
+        seen_a_ports = set()
+        seen_b_ports = set()
+        ordered = sorted(links, key=lambda link: link.local_device_id != device_a_id)
+        for link in ordered:
+            own = link.local_device_id == device_a_id
+            a_port = _port_key(link.local_port if own else link.remote_port)
+            b_port = _port_key(link.remote_port if own else link.local_port)
+            if own and link.local_port_index is not None:
+                if link.local_port_index in seen_indexes:
+                    continue
+                seen_indexes.add(link.local_port_index)
+            if (a_port and a_port in seen_a_ports) or (b_port and b_port in seen_b_ports):
+                continue
+            if a_port:
+                seen_a_ports.add(a_port)
+            if b_port:
+                seen_b_ports.add(b_port)
+            kept.append(link)
+        return kept
+    
+    def _get_port_rate(self, device: Optional[Device], link: RawLink) -> Optional[Dict]:
+        """Latest collector-measured rates of a link's local port"""
+        if device is None or not device.interface_rates:
+            return None
+        rate = device.interface_rates.get(str(link.local_port_index))
+        if rate is not None:
+            return rate
+        # LLDP local port numbers are not always ifIndex, fall back to the port name
+        for rate in device.interface_rates.values():
+            if rate.get("name") == link.local_port:
+                return rate
+        return None
     
     def _estimate_bandwidth(self, port_name: str) -> int:
         """Estimate bandwidth from port name"""
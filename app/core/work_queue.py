@@ -0,0 +1,246 @@
+"""
+Work Queue - Redis-backed per-device poll jobs shared by several collectors
+Devices sit in a due-time sorted set; a collector claims due devices under a
+lease, keeps the lease alive with heartbeats and reschedules the device when
+done. Leases of dead collectors expire and the reaper puts those devices back.
+"""
+import logging
+import os
+import socket
+import time
+import uuid
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import redis.asyncio as redis
+
+logger = logging.getLogger(__name__)
+
+# Atomically move up to ARGV[3] due devices into the lease set
+_CLAIM_SCRIPT = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'WITHSCORES', 'LIMIT', 0, tonumber(ARGV[3]))
+local claimed = {}
+for i = 1, #due, 2 do
+    local device = due[i]
+    redis.call('ZREM', KEYS[1], device)
+    redis.call('ZADD', KEYS[2], ARGV[2], device)
+    redis.call('HSET', KEYS[3], device, ARGV[4])
+    table.insert(claimed, device)
+    table.insert(claimed, due[i + 1])
+end
+return claimed
+"""
+
+# Extend the leases this collector still owns
+_RENEW_SCRIPT = """
+local renewed = 0
+for i = 1, #ARGV - 2 do
+    if redis.call('HGET', KEYS[2], ARGV[i + 2]) == ARGV[2] then
+        redis.call('ZADD', KEYS[1], 'XX', ARGV[1], ARGV[i + 2])
+        renewed = renewed + 1
+    end
+end
+return renewed
+"""
+
+# Release leases and schedule the next polls, ARGV[2..] are (device, next due) pairs;
+# leases this collector lost are left alone
+_COMPLETE_SCRIPT = """
+local done = 0
+for i = 2, #ARGV, 2 do
+    local device = ARGV[i]
+    if redis.call('HGET', KEYS[3], device) == ARGV[1] then
+        redis.call('ZREM', KEYS[2], device)
+        redis.call('HDEL', KEYS[3], device)
+        if redis.call('SISMEMBER', KEYS[4], device) == 1 then
+            redis.call('ZADD', KEYS[1], ARGV[i + 1], device)
+        end
+        done = done + 1
+    end
+end
+return done
+"""
+
+# Return expired leases to the due set so another collector picks them up
+_REAP_SCRIPT = """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[1])
+for _, device in ipairs(expired) do
+    redis.call('ZREM', KEYS[2], device)
+    redis.call('HDEL', KEYS[3], device)
+    if redis.call('SISMEMBER', KEYS[4], device) == 1 then
+        redis.call('ZADD', KEYS[1], ARGV[1], device)
+    end
+end
+return #expired
+"""
+
+
+class RedisWorkQueue:
+    """
+    Lease-based poll job queue
+    
+    Keys (under prefix):
+        due       ZSET device_id -> next due time
+        leases    ZSET device_id -> lease expiry
+        owners    HASH device_id -> collector id holding the lease
+        devices   SET  device ids that should be polled
+        collectors ZSET collector id -> last heartbeat
+    """
+    
+    def __init__(
+        self,
+        redis_url: str,
+        collector_id: Optional[str] = None,
+        lease_ttl: int = 60,
+        prefix: str = "topomon:poll:",
+        client: Optional[redis.Redis] = None
+    ):
+        self.redis = client or redis.from_url(redis_url, decode_responses=True)
+        self.collector_id = collector_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.lease_ttl = lease_ttl
+        self.prefix = prefix
+        self._held: Dict[int, float] = {}
+        self._claim = self.redis.register_script(_CLAIM_SCRIPT)
+        self._renew = self.redis.register_script(_RENEW_SCRIPT)
+        self._complete = self.redis.register_script(_COMPLETE_SCRIPT)
+        self._reap = self.redis.register_script(_REAP_SCRIPT)
+    
+    def _key(self, name: str) -> str:
+        return f"{self.prefix}{name}"
+    
+    @property
+    def _job_keys(self) -> List[str]:
+        return [self._key("due"), self._key("leases"), self._key("owners")]
+    
+    async def sync_devices(self, device_ids: Iterable[int], interval: int) -> Tuple[int, int]:
+        """
+        Make the queue hold exactly device_ids, safe to call from every collector
+        
+        New devices get due times spread evenly over one interval.
+        
+        Returns:
+            (added, removed)
+        """
+        wanted = {str(device_id) for device_id in device_ids}
+        known = await self.redis.smembers(self._key("devices"))
+        added = sorted(wanted - known, key=int)
+        removed = list(known - wanted)
+        
+        pipe = self.redis.pipeline(transaction=True)
+        if added:
+            now = time.time()
+            step = interval / len(added)
+            pipe.sadd(self._key("devices"), *added)
+            # NX keeps a schedule another collector may have written concurrently
+            pipe.zadd(self._key("due"), {device: now + i * step for i, device in enumerate(added)}, nx=True)
+        if removed:
+            pipe.srem(self._key("devices"), *removed)
+            pipe.zrem(self._key("due"), *removed)
+        replies = await pipe.execute()
+        # SADD/SREM report what this call changed, other collectors may have raced us
+        return (replies[0] if added else 0), (replies[-2] if removed else 0)
+    
+    async def claim(self, limit: int) -> List[Tuple[int, float]]:
+        """Lease up to limit due devices, returns [(device_id, due_time)]"""
+        now = time.time()
+        reply = await self._claim(
+            keys=self._job_keys,
+            args=[now, now + self.lease_ttl, limit, self.collector_id]
+        )
+        jobs = [(int(reply[i]), float(reply[i + 1])) for i in range(0, len(reply), 2)]
+        for device_id, due in jobs:
+            self._held[device_id] = due
+        return jobs
+    
+    async def complete(self, device_id: int, interval: int) -> bool:
+        """Release a lease and schedule the device's next poll, False if the lease was lost"""
+        return await self.complete_many([(device_id, interval)]) == 1
+    
+    async def complete_many(self, jobs: Iterable[Tuple[int, int]]) -> int:
+        """Release leases of (device_id, interval) jobs in one call, returns how many were still held"""
+        now = time.time()
+        schedule = []
+        for device_id, interval in jobs:
+            due = self._held.pop(device_id, now)
+            # Keep the device on its own grid so it doesn't drift by the poll duration
+            next_due = due + interval
+            if next_due <= now:
+                next_due = now + interval
+            schedule.append((device_id, next_due))
+        if not schedule:
+            return 0
+        
+        done = await self._finish(schedule)
+        if done < len(schedule):
+            logger.warning(f"Leases on {len(schedule) - done} devices expired before their polls finished")
+        return done
+    
+    async def release(self, device_ids: Iterable[int], delay: float = 0.0) -> int:
+        """Give back leases without polling, the devices are due again after delay, returns how many"""
+        device_ids = list(device_ids)
+        # Stop renewing first, if Redis is unreachable the leases expire and get reaped
+        for device_id in device_ids:
+            self._held.pop(device_id, None)
+        if not device_ids:
+            return 0
+        return await self._finish([(device_id, time.time() + delay) for device_id in device_ids])
+    
+    async def _finish(self, schedule: List[Tuple[int, float]]) -> int:
+        args = [self.collector_id]
+        for device_id, next_due in schedule:
+            args += [device_id, next_due]
+        return await self._complete(keys=self._job_keys + [self._key("devices")], args=args)
+    
+    async def heartbeat(self) -> int:
+        """Record this collector as alive and renew its leases, returns leases renewed"""
+        now = time.time()
+        await self.redis.zadd(self._key("collectors"), {self.collector_id: now})
+        if not self._held:
+            return 0
+        return await self._renew(
+            keys=[self._key("leases"), self._key("owners")],
+            args=[now + self.lease_ttl, self.collector_id] + list(self._held)
+        )
+    
+    async def reap(self) -> int:
+        """Requeue devices whose lease expired, returns how many"""
+        now = time.time()
+        reaped = await self._reap(
+            keys=self._job_keys + [self._key("devices")],
+            args=[now]
+        )
+        # Forget collectors that stopped heartbeating long ago
+        await self.redis.zremrangebyscore(self._key("collectors"), "-inf", now - 10 * self.lease_ttl)
+        if reaped:
+            logger.info(f"Reassigned {reaped} devices from expired leases")
+        return reaped
+    
+    async def try_lead(self, role: str, ttl: int) -> bool:
+        """Take a role (e.g. running topology/alert updates) for ttl seconds if nobody holds it"""
+        return bool(await self.redis.set(self._key(f"leader:{role}"), self.collector_id, nx=True, ex=ttl))
+    
+    async def next_due_in(self) -> Optional[float]:
+        """Seconds until the earliest scheduled device is due, None if the queue is empty"""
+        first = await self.redis.zrange(self._key("due"), 0, 0, withscores=True)
+        if not first:
+            return None
+        return max(0.0, first[0][1] - time.time())
+    
+    async def stats(self) -> Dict[str, int]:
+        """Queue statistics"""
+        now = time.time()
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.scard(self._key("devices"))
+        pipe.zcount(self._key("due"), "-inf", now)
+        pipe.zcard(self._key("leases"))
+        pipe.zcount(self._key("collectors"), now - 3 * self.lease_ttl, "+inf")
+        devices, due, leased, collectors = await pipe.execute()
+        return {
+            "devices": devices,
+            "due": due,
+            "leased": leased,
+            "held": len(self._held),
+            "collectors": collectors
+        }
+    
+    async def close(self):
+        await self.redis.aclose()
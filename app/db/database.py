@@ -1,10 +1,15 @@
 """
 Database connection and session management
 """
+import logging
+
+from sqlalchemy import inspect, literal, text
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
 from app.config import get_settings
 
+logger = logging.getLogger(__name__)
+
 settings = get_settings()
 
 # Create async engine (SQLite 不需要 pool 設定)
@@ -45,9 +50,47 @@ async def get_db() -> AsyncSession:
             await session.close()
 
 
+def add_missing_columns(conn) -> int:
+    """
+    Add model columns that tables of an older database lack
+    
+    create_all only creates missing tables, so columns added to existing
+    models (e.g. devices.poll_interval, raw_links.remote_address) are added
+    here with ALTER TABLE ... ADD COLUMN; scalar defaults fill existing rows.
+    Only nullable columns are expected, new NOT NULL columns need a migration.
+    
+    Returns:
+        Number of columns added
+    """
+    inspector = inspect(conn)
+    preparer = conn.dialect.identifier_preparer
+    added = 0
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            ddl = (
+                f"ALTER TABLE {preparer.format_table(table)} "
+                f"ADD COLUMN {preparer.format_column(column)} {column.type.compile(dialect=conn.dialect)}"
+            )
+            if column.default is not None and column.default.is_scalar:
+                default = literal(column.default.arg, column.type).compile(
+                    dialect=conn.dialect, compile_kwargs={"literal_binds": True}
+                )
+                ddl += f" DEFAULT {default}"
+            conn.execute(text(ddl))
+            logger.info(f"Added column {table.name}.{column.name}")
+            added += 1
+    return added
+
+
 async def init_db():
-    """Initialize database tables"""
+    """Initialize database tables and add columns missing from older databases"""
     from app.models import device, link, alert, profile, group  # noqa
     
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(add_missing_columns)
@@ -8,10 +8,11 @@ from fastapi.responses import FileResponse
 from contextlib import asynccontextmanager
 import logging
 import os
+import httpx
 
 from app.config import get_settings
 from app.db.database import init_db
-from app.api import devices, topology, alerts, profiles, groups, discovery, snmp, settings
+from app.api import devices, topology, alerts, profiles, groups, discovery, snmp, settings, metrics
 from app.core.discovery_scheduler import start_discovery_scheduler
 from app.api.settings import load_settings as load_app_settings
 
@@ -78,6 +79,7 @@ app.include_router(groups.router, prefix="/api/v1/groups", tags=["Device Groups"
 app.include_router(discovery.router, prefix="/api/v1/discovery", tags=["Discovery"])
 app.include_router(snmp.router, prefix="/api/v1/snmp", tags=["SNMP Testing"])
 app.include_router(settings.router, prefix="/api/v1/settings", tags=["Settings"])
+app.include_router(metrics.router, prefix="/api/v1/metrics", tags=["Metrics"])
 
 # Mount static files
 app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
@@ -115,7 +117,26 @@ async def settings_page():
 
 @app.get("/health")
 async def health():
-    """Health check endpoint"""
-    return {"status": "healthy"}
+    """Health check endpoint, with the collector's metrics summary when collector_metrics_url is set"""
+    status = {"status": "healthy"}
+    if settings_config.collector_metrics_url:
+        url = settings_config.collector_metrics_url.rstrip("/") + "/metrics.json"
+        try:
+            async with httpx.AsyncClient(timeout=2.0) as client:
+                response = await client.get(url)
+                response.raise_for_status()
+            collector_metrics = response.json()
+            status["collector"] = {
+                "status": "reachable",
+                "load_shedding": bool(collector_metrics.get("topomon_load_shedding")),
+                "stale_devices": collector_metrics.get("topomon_stale_devices", 0),
+                "metrics": collector_metrics
+            }
+            if status["collector"]["load_shedding"]:
+                # Polls are being skipped, sampling is slower than configured
+                status["status"] = "degraded"
+        except Exception as e:
+            status["collector"] = {"status": "unreachable", "error": str(e)}
+    return status
 
 
@@ -1,7 +1,7 @@
 """
 Device model - Network device information
 """
-from sqlalchemy import Column, Integer, String, Float, BigInteger, DateTime, ForeignKey, Enum as SQLEnum, Boolean
+from sqlalchemy import Column, Integer, String, Float, BigInteger, DateTime, ForeignKey, Enum as SQLEnum, Boolean, JSON
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.database import Base
@@ -31,13 +31,16 @@ class Device(Base):
     
     # SNMP Settings
     snmp_community = Column(String(255), nullable=True)
-    snmp_version = Column(String(10), default="v2c")  # "v2c" or "v3"
+    snmp_version = Column(String(10), default="v2c")  # "v1", "v2c" or "v3"
     snmpv3_username = Column(String(255), nullable=True)
     snmpv3_auth_protocol = Column(String(20), nullable=True)  # MD5, SHA, SHA256
     snmpv3_auth_password = Column(String(255), nullable=True)
     snmpv3_priv_protocol = Column(String(20), nullable=True)  # DES, AES, AES256
     snmpv3_priv_password = Column(String(255), nullable=True)
     
+    # Poll interval override in seconds (None = per-type or global interval)
+    poll_interval = Column(Integer, nullable=True)
+    
     # Auto-discovery setting (default True)
     auto_discover = Column(Boolean, default=True)
     
@@ -53,6 +56,21 @@ class Device(Base):
     memory_percent = Column(Float)
     uptime_seconds = Column(BigInteger)
     
+    # Measured SNMP round-trip time, drives adaptive per-request timeouts
+    snmp_srtt_ms = Column(Float, nullable=True)
+    snmp_rttvar_ms = Column(Float, nullable=True)
+    snmp_timeout_ms = Column(Float, nullable=True)
+    
+    # Learned SNMP capability profile (bulk, LLDP/CDP, HC counters, metric OIDs)
+    snmp_capabilities = Column(JSON, nullable=True)
+    
+    # Latest per-interface bit rates {ifIndex: {name, speed_mbps, in_bps, out_bps}}
+    interface_rates = Column(JSON, nullable=True)
+    
+    # Set while counters are older than the poll interval (poll missed its deadline or was shed)
+    data_stale = Column(Boolean, default=False)
+    deadline_misses = Column(Integer, default=0)
+    
     # Timestamps
     last_seen = Column(DateTime(timezone=True))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -18,6 +18,7 @@ class RawLink(Base):
     remote_hostname = Column(String(255))
     remote_port = Column(String(100))
     remote_chassis_id = Column(String(255))
+    remote_address = Column(String(45))  # Management address from lldpRemManAddrTable/cdpCacheAddress
     protocol = Column(String(10))  # lldp, cdp
     
     discovered_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -30,6 +30,7 @@ class DeviceUpdate(BaseModel):
     snmp_community: Optional[str] = None
     alert_profile_id: Optional[int] = None
     status: Optional[str] = None
+    poll_interval: Optional[int] = Field(None, ge=10)
 
 
 class DeviceResponse(DeviceBase):
@@ -40,6 +41,13 @@ class DeviceResponse(DeviceBase):
     cpu_percent: Optional[float] = None
     memory_percent: Optional[float] = None
     uptime_seconds: Optional[int] = None
+    poll_interval: Optional[int] = None
+    snmp_srtt_ms: Optional[float] = None
+    snmp_rttvar_ms: Optional[float] = None
+    snmp_timeout_ms: Optional[float] = None
+    snmp_capabilities: Optional[dict] = None
+    data_stale: Optional[bool] = None
+    deadline_misses: Optional[int] = None
     last_seen: Optional[datetime] = None
     created_at: datetime
     updated_at: datetime
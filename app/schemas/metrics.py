@@ -0,0 +1,33 @@
+"""
+Metric history schemas for API response
+"""
+from pydantic import BaseModel, Field
+from typing import Optional, List
+from datetime import datetime
+
+
+class MetricSeries(BaseModel):
+    """One downsampled series, timestamps in epoch seconds"""
+    name: str
+    label: Optional[str] = None
+    unit: Optional[str] = None
+    timestamps: List[float]
+    values: List[float]
+
+
+class MetricsResponse(BaseModel):
+    """Series over a time range"""
+    start: datetime
+    end: datetime
+    resolution: str  # raw, 1m, 5m, 1h
+    step: int  # Seconds between stored samples at this resolution
+    series: List[MetricSeries]
+
+
+class MetricsQuery(BaseModel):
+    """Ad-hoc query of several series by name"""
+    series: List[str] = Field(..., min_length=1, max_length=1000)
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+    points: int = Field(1000, ge=10, le=10000)
+    aggregate: str = Field("avg", pattern="^(avg|max)$")
@@ -13,6 +13,7 @@ class PortDetail(BaseModel):
     bandwidth_mbps: int
     in_bps: Optional[int] = None
     out_bps: Optional[int] = None
+    utilization_percent: Optional[float] = None
 
 
 class TopologyNode(BaseModel):
@@ -0,0 +1,3 @@
+"""
+SNMP agent simulator package
+"""
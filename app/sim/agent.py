@@ -0,0 +1,307 @@
+"""
+SNMP Agent Simulator - Asyncio UDP responder for thousands of virtual devices
+Serves the generated demo hierarchy over SNMPv1/v2c, one socket per device on
+its own 127.x.y.z alias (or consecutive ports of 127.0.0.1), with injectable
+latency, loss and unresponsive devices for load and regression testing
+
+    python -m app.sim.agent --sites 20 --port 1161 --latency 5 --jitter 20 --loss 0.01
+
+then point the collector at it with SNMP_PORT=1161 after seeding the same
+network (python seed_demo.py --sites 20 --sim)
+"""
+import argparse
+import asyncio
+import logging
+import random
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from app.core.snmp_ber import (
+    BerError, decode_request, encode_response, encode_var_bind,
+    PDU_GET, PDU_GET_NEXT, PDU_GET_BULK, VERSION_V1,
+    TAG_NULL, TAG_NO_SUCH_OBJECT, TAG_END_OF_MIB_VIEW
+)
+from app.sim.mib import DeviceMib
+from app.sim.topology import SimTopology, generate_hierarchy, endpoints
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# Error statuses used by the responder
+TOO_BIG = 1
+NO_SUCH_NAME = 2
+
+# Bytes of a Response message around the var-binds, community excluded
+_MESSAGE_OVERHEAD = 32
+
+
+@dataclass
+class FaultProfile:
+    """Injected misbehaviour, rates apply per request and fractions per device"""
+    latency: float = 0.0  # Seconds added to every response
+    jitter: float = 0.0  # Up to this many extra seconds, uniformly random
+    loss: float = 0.0  # Share of requests dropped without an answer
+    dead: float = 0.0  # Share of devices that never answer (timeouts)
+    slow: float = 0.0  # Share of devices answering after slow_latency instead
+    slow_latency: float = 2.0
+    
+    def device_state(self, hostname: str, seed: int = 0) -> str:
+        """"dead", "slow" or "ok" for a device, stable for a given seed"""
+        draw = zlib.crc32(f"{seed}:{hostname}".encode()) / 2 ** 32
+        if draw < self.dead:
+            return "dead"
+        if draw < self.dead + self.slow:
+            return "slow"
+        return "ok"
+
+
+class _DeviceEndpoint(asyncio.DatagramProtocol):
+    """UDP socket of one simulated device"""
+    
+    def __init__(self, simulator: "SnmpSimulator", mib: DeviceMib, state: str):
+        self.simulator = simulator
+        self.mib = mib
+        self.state = state
+        self.transport: Optional[asyncio.DatagramTransport] = None
+    
+    def connection_made(self, transport):
+        self.transport = transport
+    
+    def datagram_received(self, data: bytes, addr):
+        simulator = self.simulator
+        stats = simulator.stats
+        stats["requests"] += 1
+        if self.state == "dead":
+            stats["dropped"] += 1
+            return
+        faults = simulator.faults
+        if faults.loss and simulator.rng.random() < faults.loss:
+            stats["dropped"] += 1
+            return
+        
+        response = simulator.respond(self.mib, data)
+        if response is None:
+            stats["invalid"] += 1
+            return
+        
+        delay = faults.slow_latency if self.state == "slow" else faults.latency
+        if faults.jitter:
+            delay += simulator.rng.uniform(0, faults.jitter)
+        if delay > 0:
+            asyncio.get_running_loop().call_later(delay, self._send, response, addr)
+        else:
+            self._send(response, addr)
+    
+    def _send(self, response: bytes, addr):
+        if self.transport is not None and not self.transport.is_closing():
+            self.transport.sendto(response, addr)
+            self.simulator.stats["responses"] += 1
+
+
+class SnmpSimulator:
+    """
+    SNMP agents for every device of a simulated topology
+    
+    Values are read when the request arrives, so a delayed answer carries
+    counters as they were at request time like a busy real agent
+    """
+    
+    def __init__(
+        self,
+        topology: SimTopology,
+        port: int = 1161,
+        base_port: Optional[int] = None,
+        community: str = "public",
+        faults: Optional[FaultProfile] = None,
+        max_message_size: int = 1472,
+        seed: int = 0
+    ):
+        self.topology = topology
+        self.port = port
+        self.base_port = base_port
+        self.community = community
+        self.faults = faults or FaultProfile()
+        self.max_message_size = max_message_size
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.mibs: Dict[str, DeviceMib] = {}
+        self.endpoints: Dict[str, Tuple[str, int]] = {}
+        self._transports: List[asyncio.DatagramTransport] = []
+        self.stats = {"requests": 0, "responses": 0, "dropped": 0, "invalid": 0, "varbinds": 0}
+    
+    async def start(self):
+        """Build every device's MIB and bind its socket"""
+        loop = asyncio.get_running_loop()
+        _raise_open_files_limit(len(self.topology.devices) + 256)
+        started = time.time()
+        states = {}
+        for device in self.topology.devices:
+            self.mibs[device.hostname] = DeviceMib(device, self.topology, started)
+            states[device.hostname] = self.faults.device_state(device.hostname, self.seed)
+        
+        for hostname, (host, port) in endpoints(self.topology, self.port, self.base_port).items():
+            endpoint = _DeviceEndpoint(self, self.mibs[hostname], states[hostname])
+            try:
+                transport, _ = await loop.create_datagram_endpoint(lambda: endpoint, local_addr=(host, port))
+            except OSError as e:
+                self.stop()
+                raise OSError(f"Cannot bind {hostname} on {host}:{port}: {e}") from e
+            self._transports.append(transport)
+            self.endpoints[hostname] = (host, port)
+        
+        logger.info(
+            f"Simulating {len(self.mibs)} devices, {len(self.topology.links)} links "
+            f"({list(states.values()).count('slow')} slow, {list(states.values()).count('dead')} dead)"
+        )
+    
+    def stop(self):
+        for transport in self._transports:
+            transport.close()
+        self._transports.clear()
+    
+    def respond(self, mib: DeviceMib, data: bytes) -> Optional[bytes]:
+        """Encoded Response to a request message, None to ignore it"""
+        try:
+            version, community, pdu_type, request_id, non_repeaters, max_repetitions, oids = decode_request(data)
+        except BerError:
+            return None
+        if community != self.community:
+            # Wrong community, real agents stay silent
+            return None
+        
+        v1 = version == VERSION_V1
+        var_binds: List[bytes] = []
+        
+        if pdu_type == PDU_GET:
+            for i, oid in enumerate(oids):
+                value = mib.get(tuple(oid))
+                if value is None:
+                    if v1:
+                        return self._error(version, community, request_id, oids, NO_SUCH_NAME, i + 1)
+                    value = (TAG_NO_SUCH_OBJECT, None)
+                var_binds.append(encode_var_bind(oid, *value))
+        elif v1:
+            if pdu_type == PDU_GET_BULK:
+                return None
+            for i, oid in enumerate(oids):
+                found = mib.next(tuple(oid), skip_counter64=True)
+                if found is None:
+                    return self._error(version, community, request_id, oids, NO_SUCH_NAME, i + 1)
+                var_binds.append(encode_var_bind(found[0], *found[1]))
+        else:
+            if pdu_type == PDU_GET_NEXT:
+                non_repeaters, max_repetitions = 0, 1
+            non_repeaters = min(max(0, non_repeaters), len(oids))
+            for oid in oids[:non_repeaters]:
+                var_binds.append(encode_var_bind(*_successor(mib, oid)))
+            
+            # Whole rows of repetitions until max_repetitions, the end of
+            # the MIB or the message size limit, whichever comes first
+            budget = self.max_message_size - _MESSAGE_OVERHEAD - len(community)
+            size = sum(len(vb) for vb in var_binds)
+            cursors = list(oids[non_repeaters:])
+            for _ in range(max(0, max_repetitions) if cursors else 0):
+                row = [_successor(mib, oid) for oid in cursors]
+                encoded = [encode_var_bind(*vb) for vb in row]
+                row_size = sum(len(vb) for vb in encoded)
+                if var_binds and size + row_size > budget:
+                    break
+                var_binds.extend(encoded)
+                size += row_size
+                if all(vb[1] == TAG_END_OF_MIB_VIEW for vb in row):
+                    break
+                cursors = [vb[0] for vb in row]
+        
+        if sum(len(vb) for vb in var_binds) + _MESSAGE_OVERHEAD + len(community) > self.max_message_size:
+            return self._error(version, community, request_id, oids, TOO_BIG, 0)
+        self.stats["varbinds"] += len(var_binds)
+        return encode_response(version, community, request_id, var_binds)
+    
+    @staticmethod
+    def _error(version: int, community: str, request_id: int, oids, status: int, index: int) -> bytes:
+        # Error responses echo the request var-binds
+        request = [encode_var_bind(oid, TAG_NULL) for oid in oids]
+        return encode_response(version, community, request_id, request, status, index)
+
+
+def _successor(mib: DeviceMib, oid) -> Tuple[tuple, int, object]:
+    """(oid, tag, value) var-bind answering a GETNEXT of oid, endOfMibView past the end"""
+    found = mib.next(tuple(oid))
+    if found is None:
+        return tuple(oid), TAG_END_OF_MIB_VIEW, None
+    return found[0], found[1][0], found[1][1]
+
+
+def _raise_open_files_limit(wanted: int):
+    """One socket per device, lift the soft descriptor limit toward the hard one"""
+    try:
+        import resource
+    except ImportError:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft != resource.RLIM_INFINITY and soft < wanted:
+        limit = wanted if hard == resource.RLIM_INFINITY else min(wanted, hard)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (limit, hard))
+        if limit < wanted:
+            logger.warning(f"Open file limit {limit} is below the {wanted} sockets needed")
+
+
+async def main(args):
+    topology = generate_hierarchy(args.sites, args.seed, loopback=args.base_port is None)
+    simulator = SnmpSimulator(
+        topology,
+        port=args.port,
+        base_port=args.base_port,
+        community=args.community,
+        faults=FaultProfile(
+            latency=args.latency / 1000,
+            jitter=args.jitter / 1000,
+            loss=args.loss,
+            dead=args.dead,
+            slow=args.slow,
+            slow_latency=args.slow_latency / 1000
+        ),
+        max_message_size=args.max_message_size,
+        seed=args.seed or 0
+    )
+    await simulator.start()
+    
+    try:
+        last = dict(simulator.stats)
+        while True:
+            await asyncio.sleep(args.report_interval)
+            stats = dict(simulator.stats)
+            rate = (stats["requests"] - last["requests"]) / args.report_interval
+            logger.info(
+                f"{rate:.0f} req/s, totals: {stats['requests']} requests, {stats['responses']} responses, "
+                f"{stats['dropped']} dropped, {stats['varbinds']} var-binds"
+            )
+            last = stats
+    finally:
+        simulator.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SNMP agent simulator for the demo hierarchy")
+    parser.add_argument("--sites", type=int, default=1, help="Copies of the 106-device demo site")
+    parser.add_argument("--seed", type=int, default=1, help="Topology seed, use the same one for seed_demo.py")
+    parser.add_argument("--port", type=int, default=1161, help="UDP port every device alias listens on")
+    parser.add_argument(
+        "--base-port", type=int, default=None,
+        help="Serve all devices on 127.0.0.1 from this port upward instead of per-device aliases"
+    )
+    parser.add_argument("--community", default="public")
+    parser.add_argument("--latency", type=float, default=0.0, help="Response delay in ms")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random extra delay up to this many ms")
+    parser.add_argument("--loss", type=float, default=0.0, help="Share of requests dropped (0-1)")
+    parser.add_argument("--dead", type=float, default=0.0, help="Share of devices that never answer (0-1)")
+    parser.add_argument("--slow", type=float, default=0.0, help="Share of devices answering after --slow-latency")
+    parser.add_argument("--slow-latency", type=float, default=2000.0, help="Response delay of slow devices in ms")
+    parser.add_argument("--max-message-size", type=int, default=1472, help="Largest Response message in bytes")
+    parser.add_argument("--report-interval", type=float, default=10.0, help="Seconds between stats log lines")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,436 @@
+"""
+Collector Benchmark - poll_all_devices against simulated SNMP agents
+Each run seeds a fresh database with N simulated devices, serves them from the
+simulator in its own process and measures whole poll cycles in another, so
+caches, RSS and CPU time never carry over between sizes
+
+    python -m app.sim.benchmark --devices 100,1000 --rtt 2 --loss 0.01
+    python -m app.sim.benchmark --baseline benchmarks/baseline.json   # exit 1 on regression
+    python -m app.sim.benchmark --update-baseline                     # record a new baseline
+
+Devices come in whole demo sites (106 devices), so 100 runs 106 and 1000 runs 1060
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import multiprocessing
+import os
+import platform
+import queue
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from app.sim.agent import FaultProfile, SnmpSimulator
+from app.sim.topology import generate_hierarchy
+
+logger = logging.getLogger(__name__)
+
+SITE_DEVICES = 106
+DEFAULT_BASELINE = os.path.join("benchmarks", "baseline.json")
+
+# Compared against the baseline, True when a higher value is better
+COMPARED_METRICS = {
+    "devices_per_sec": True,
+    "pdus_per_device": False,
+    "cpu_seconds_per_device": False,
+    "peak_rss_mb": False,
+    "db_statements_per_cycle": False,
+    "success_rate": True,
+    "timeouts_per_cycle": False,
+}
+
+
+# =============================================================================
+# Process accounting (Linux /proc, falls back to this process' rusage)
+# =============================================================================
+
+def _cpu_seconds(pid: int) -> float:
+    """User + system CPU time of a live process"""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except (OSError, IndexError, ValueError):
+        if pid != os.getpid():
+            return 0.0
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        return usage.ru_utime + usage.ru_stime
+
+
+def _peak_rss_mb(pid: int) -> float:
+    """High-water mark of a process' resident set"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if pid != os.getpid():
+        return 0.0
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+# =============================================================================
+# Simulator process
+# =============================================================================
+
+def _simulator_main(config: Dict, sites: int, ready, stop, results):
+    async def serve():
+        simulator = SnmpSimulator(
+            generate_hierarchy(sites, config["seed"], loopback=True),
+            port=config["port"],
+            faults=FaultProfile(
+                latency=config["rtt"] / 1000,
+                jitter=config["jitter"] / 1000,
+                loss=config["loss"]
+            ),
+            seed=config["seed"]
+        )
+        await simulator.start()
+        ready.set()
+        loop = asyncio.get_running_loop()
+        while not await loop.run_in_executor(None, stop.wait, 0.5):
+            pass
+        simulator.stop()
+        results.put({
+            **simulator.stats,
+            "cpu_seconds": round(_cpu_seconds(os.getpid()), 3),
+            "peak_rss_mb": round(_peak_rss_mb(os.getpid()), 1)
+        })
+    
+    logging.getLogger().setLevel(logging.WARNING)
+    asyncio.run(serve())
+
+
+# =============================================================================
+# Measured collector process
+# =============================================================================
+
+def _collector_main(config: Dict, sites: int, results):
+    # Settings and the database engine are read at import, configure them first
+    os.environ.update({
+        "DATABASE_URL": config["database_url"],
+        "TIMESERIES_PATH": os.path.join(config["work_dir"], "timeseries"),
+        "SNMP_PORT": str(config["port"]),
+        "SNMP_BACKEND": config["backend"],
+        "COLLECTOR_CONCURRENT": str(config["concurrency"]),
+        "LOG_EXPORT_ENABLED": "false",
+    })
+    try:
+        results.put(asyncio.run(_measure(config, sites)))
+    except Exception as e:
+        results.put({"error": f"{type(e).__name__}: {e}"})
+
+
+async def _seed(topology):
+    """Fresh tables holding the simulated devices"""
+    from sqlalchemy import insert
+    from app.db.database import Base, engine, async_session_maker
+    from app.models.device import Device, DeviceStatus
+    
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    
+    async with async_session_maker() as db:
+        await db.execute(insert(Device), [
+            {
+                "hostname": device.hostname,
+                "ip_address": device.ip_address,
+                "vendor": device.vendor,
+                "model": device.model,
+                "device_type": device.device_type,
+                "status": DeviceStatus.MANAGED,
+                "snmp_community": "public",
+            }
+            for device in topology.devices
+        ])
+        await db.commit()
+
+
+async def _measure(config: Dict, sites: int) -> Dict:
+    from sqlalchemy import event
+    from app.collector import PollWorkerPool, poll_all_devices
+    from app.core.collector_metrics import get_collector_metrics
+    from app.db.database import engine
+    
+    logging.getLogger().setLevel(logging.INFO if config["verbose"] else logging.WARNING)
+    topology = generate_hierarchy(sites, config["seed"], loopback=True)
+    await _seed(topology)
+    
+    statements = [0]
+    
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements[0] += 1
+    
+    metrics = get_collector_metrics()
+    
+    def counters() -> Dict[str, float]:
+        polls = metrics.polls.values
+        return {
+            "pdus": metrics.snmp_requests.values.get((), 0),
+            "timeouts": metrics.snmp_timeouts.values.get((), 0),
+            "ok": sum(count for (tier, result), count in polls.items() if result == "ok"),
+            "polls": sum(polls.values()),
+            "statements": statements[0],
+        }
+    
+    worker_pool = PollWorkerPool(config["workers"]) if config["workers"] > 1 else None
+    if worker_pool:
+        worker_pool.start()
+    try:
+        cycles = []
+        for _ in range(config["cycles"]):
+            pids = [os.getpid()] + [p.pid for p in (worker_pool._processes if worker_pool else []) if p]
+            cpu_before = sum(_cpu_seconds(pid) for pid in pids)
+            before = counters()
+            started = time.monotonic()
+            
+            await poll_all_devices(worker_pool)
+            
+            seconds = time.monotonic() - started
+            after = counters()
+            cycle = {key: after[key] - before[key] for key in after}
+            cycle["seconds"] = round(seconds, 3)
+            cycle["cpu_seconds"] = round(sum(_cpu_seconds(pid) for pid in pids) - cpu_before, 3)
+            cycles.append(cycle)
+        
+        peak_rss = _peak_rss_mb(os.getpid())
+        worker_rss = [_peak_rss_mb(p.pid) for p in (worker_pool._processes if worker_pool else []) if p]
+    finally:
+        if worker_pool:
+            worker_pool.stop()
+    
+    return {"devices": len(topology.devices), "cycles": cycles, "peak_rss_mb": peak_rss,
+            "worker_peak_rss_mb": max(worker_rss) if worker_rss else None}
+
+
+def _summarize(measured: Dict) -> Dict:
+    """Steady-state figures: the first cycle probes capabilities and fills caches, so it is left out"""
+    cycles = measured["cycles"]
+    steady = cycles[1:] or cycles
+    devices = measured["devices"]
+    seconds = sum(c["seconds"] for c in steady)
+    ok = sum(c["ok"] for c in steady)
+    pdus = sum(c["pdus"] for c in steady)
+    count = len(steady)
+    return {
+        "devices": devices,
+        "devices_per_sec": round(ok / seconds, 2) if seconds else None,
+        "pdus_per_sec": round(pdus / seconds, 1) if seconds else None,
+        "pdus_per_device": round(pdus / (devices * count), 2),
+        "cpu_seconds_per_device": round(sum(c["cpu_seconds"] for c in steady) / (devices * count), 5),
+        "peak_rss_mb": round(measured["peak_rss_mb"], 1),
+        "worker_peak_rss_mb": (
+            round(measured["worker_peak_rss_mb"], 1) if measured["worker_peak_rss_mb"] else None
+        ),
+        "db_statements_per_cycle": round(sum(c["statements"] for c in steady) / count),
+        "success_rate": round(ok / (devices * count), 4),
+        "timeouts_per_cycle": round(sum(c["timeouts"] for c in steady) / count, 1),
+        "cycle_seconds": [c["seconds"] for c in cycles],
+        "first_cycle": cycles[0],
+    }
+
+
+def run_size(config: Dict, devices: int) -> Dict:
+    """Benchmark one fleet size, simulator and collector each in a fresh process"""
+    sites = max(1, math.ceil(devices / SITE_DEVICES))
+    context = multiprocessing.get_context("spawn")
+    ready, stop = context.Event(), context.Event()
+    simulator_results, collector_results = context.Queue(), context.Queue()
+    
+    simulator = context.Process(
+        target=_simulator_main, args=(config, sites, ready, stop, simulator_results),
+        name="snmp-simulator", daemon=True
+    )
+    simulator.start()
+    try:
+        if not ready.wait(300):
+            raise RuntimeError("Simulator did not start, is 127.0.0.0/8 bound to the loopback interface?")
+        
+        collector = context.Process(
+            target=_collector_main, args=(config, sites, collector_results), name="collector-benchmark"
+        )
+        collector.start()
+        while True:
+            try:
+                measured = collector_results.get(timeout=5)
+                break
+            except queue.Empty:
+                if not collector.is_alive():
+                    raise RuntimeError(f"Collector benchmark process exited with code {collector.exitcode}")
+        collector.join()
+    finally:
+        stop.set()
+    try:
+        simulator_stats = simulator_results.get(timeout=30)
+    except queue.Empty:
+        simulator_stats = None
+    simulator.join(10)
+    
+    if "error" in measured:
+        raise RuntimeError(f"Collector benchmark failed for {devices} devices: {measured['error']}")
+    result = _summarize(measured)
+    result["simulator"] = simulator_stats
+    return result
+
+
+# =============================================================================
+# Reporting
+# =============================================================================
+
+def _git_version() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"], capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compare(results: List[Dict], baseline: Dict, tolerance: float) -> List[str]:
+    """Print each figure next to the baseline, returns the regressions"""
+    previous = {entry["devices"]: entry for entry in baseline.get("results", [])}
+    regressions = []
+    for entry in results:
+        base = previous.get(entry["devices"])
+        if base is None:
+            print(f"  {entry['devices']} devices: not in the baseline")
+            continue
+        print(f"  {entry['devices']} devices (baseline {baseline.get('version') or 'unknown'}):")
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            new, old = entry.get(metric), base.get(metric)
+            if new is None or old is None:
+                continue
+            if old:
+                change = (new - old) / old
+            else:
+                # Any timeout on a baseline without any is a regression
+                change = math.copysign(math.inf, new) if new else 0.0
+            worse = -change if higher_is_better else change
+            flag = "  REGRESSION" if worse > tolerance else ""
+            print(f"    {metric:<26} {old:>12} -> {new:<12} {change:+.1%}{flag}")
+            if flag:
+                regressions.append(f"{entry['devices']} devices: {metric} {old} -> {new} ({change:+.1%})")
+    return regressions
+
+
+def main(args) -> int:
+    # Scratch space for the time-series store and the default SQLite database
+    work_dir = tempfile.mkdtemp(prefix="topomon-bench-")
+    database_url = args.database_url or f"sqlite+aiosqlite:///{os.path.join(work_dir, 'bench.db')}"
+    
+    config = {
+        "database_url": database_url,
+        "work_dir": work_dir,
+        "port": args.port,
+        "backend": args.backend,
+        "concurrency": args.concurrency,
+        "workers": max(1, args.workers),
+        "cycles": max(1, args.cycles),
+        "rtt": args.rtt,
+        "jitter": args.jitter,
+        "loss": args.loss,
+        "seed": args.seed,
+        "verbose": args.verbose,
+    }
+    report = {
+        "version": _git_version(),
+        "created_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "host": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "config": {
+            key: value for key, value in config.items() if key not in ("database_url", "work_dir", "verbose")
+        },
+        "database": database_url.split(":", 1)[0],
+        "results": [],
+    }
+    
+    try:
+        for devices in args.devices:
+            print(f"Benchmarking {devices} devices...", flush=True)
+            result = run_size(config, devices)
+            report["results"].append(result)
+            print(
+                f"  {result['devices']} devices: {result['devices_per_sec']} devices/s, "
+                f"{result['pdus_per_sec']} PDUs/s ({result['pdus_per_device']}/device), "
+                f"{result['cpu_seconds_per_device'] * 1000:.2f} ms CPU/device, "
+                f"peak RSS {result['peak_rss_mb']} MB, {result['db_statements_per_cycle']} DB statements/cycle, "
+                f"success {result['success_rate']:.1%}",
+                flush=True
+            )
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+    
+    regressions = []
+    baseline_path = args.baseline or (DEFAULT_BASELINE if os.path.exists(DEFAULT_BASELINE) else None)
+    if baseline_path and not args.update_baseline and not os.path.exists(baseline_path):
+        print(f"No baseline at {baseline_path}, nothing to compare with")
+    elif baseline_path and not args.update_baseline:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        if baseline.get("config") != report["config"]:
+            print(f"Note: {baseline_path} was recorded with a different configuration")
+        print(f"Compared with {baseline_path}:")
+        regressions = compare(report["results"], baseline, args.tolerance)
+    
+    if args.update_baseline:
+        path = args.baseline or DEFAULT_BASELINE
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        print(f"Baseline written to {path}")
+    
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+        return 1
+    return 0
+
+
+def _sizes(value: str) -> List[int]:
+    return [int(size) for size in value.split(",") if size.strip()]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Collector throughput benchmark against simulated SNMP agents")
+    parser.add_argument("--devices", type=_sizes, default=[100, 1000], help="Fleet sizes, e.g. 100,1000,10000")
+    parser.add_argument("--cycles", type=int, default=3, help="Poll cycles per size, the first one is warm-up")
+    parser.add_argument("--rtt", type=float, default=2.0, help="Simulated agent response time in ms")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random extra response time up to this many ms")
+    parser.add_argument("--loss", type=float, default=0.0, help="Share of requests the agents drop (0-1)")
+    parser.add_argument("--backend", choices=["pysnmp", "native"], default="native")
+    parser.add_argument("--concurrency", type=int, default=100, help="COLLECTOR_CONCURRENT of the measured collector")
+    parser.add_argument("--workers", type=int, default=1, help="Poll worker processes (1 = poll in the collector)")
+    parser.add_argument("--port", type=int, default=1161, help="UDP port of the simulated agents")
+    parser.add_argument("--seed", type=int, default=1, help="Topology seed")
+    parser.add_argument(
+        "--database-url", default=None,
+        help="Database to benchmark on, its tables are dropped and recreated (default: temporary SQLite)"
+    )
+    parser.add_argument("--output", default=None, help="Write the results JSON here")
+    parser.add_argument("--baseline", default=None, help=f"Baseline JSON to compare with (default: {DEFAULT_BASELINE})")
+    parser.add_argument("--update-baseline", action="store_true", help="Store these results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed relative change before flagging")
+    parser.add_argument("--verbose", action="store_true", help="Show the collector's log")
+    sys.exit(main(parser.parse_args()))
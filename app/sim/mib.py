@@ -0,0 +1,293 @@
+"""
+Simulated MIB - What one simulated device answers over SNMP
+SNMPv2-MIB system group, IF-MIB ifTable/ifXTable with counters that advance
+with time, LLDP-MIB remote and management address tables, the CDP cache on
+Cisco devices and the vendor CPU/memory OIDs the collector reads
+"""
+import bisect
+import math
+import time
+import zlib
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.core.snmp_ber import (
+    TAG_INTEGER, TAG_OCTET_STRING, TAG_OID, TAG_GAUGE32, TAG_TIMETICKS,
+    TAG_COUNTER32, TAG_COUNTER64
+)
+from app.core.snmp_oids import (
+    SYS_DESCR, SYS_OBJECT_ID, SYS_UPTIME, SYS_NAME, IF_TABLE_LAST_CHANGE,
+    LLDP_STATS_REM_LAST_CHANGE, LLDP_REM_TABLE, LLDP_REM_MAN_ADDR_IF_SUBTYPE,
+    CDP_GLOBAL_RUN, CDP_CACHE_ADDRESS, VENDOR_OIDS
+)
+from app.sim.topology import SimDevice, SimTopology
+
+Oid = Tuple[int, ...]
+Value = Tuple[int, Any]  # (BER tag, value)
+
+IF_ENTRY = (1, 3, 6, 1, 2, 1, 2, 2, 1)
+IF_X_ENTRY = (1, 3, 6, 1, 2, 1, 31, 1, 1, 1)
+IF_NUMBER = (1, 3, 6, 1, 2, 1, 2, 1, 0)
+SYS_LOCATION = (1, 3, 6, 1, 2, 1, 1, 6, 0)
+LLDP_REM_ENTRY = tuple(int(x) for x in LLDP_REM_TABLE.split(".")) + (1,)
+LLDP_MAN_ADDR_COLUMN = tuple(int(x) for x in LLDP_REM_MAN_ADDR_IF_SUBTYPE.split("."))
+CDP_CACHE_ENTRY = tuple(int(x) for x in CDP_CACHE_ADDRESS.split("."))[:-1]
+
+# ifTable columns: ifIndex, ifDescr, ifType, ifSpeed, ifAdminStatus, ifOperStatus, ifInOctets, ifOutOctets
+IF_COLUMNS = (1, 2, 3, 5, 7, 8, 10, 16)
+# ifXTable columns: ifName, ifHCInOctets, ifHCOutOctets, ifHighSpeed, ifAlias
+IF_X_COLUMNS = (1, 6, 10, 15, 18)
+
+SYS_DESCRS = {
+    'cisco_ios': "Cisco IOS Software, {model} Software, Version {firmware}, RELEASE SOFTWARE (fc2)",
+    'cisco_nxos': "Cisco NX-OS(tm) {model}, Software (nxos), Version {firmware}",
+    'hp_aruba': "Aruba {model} Switch, revision {firmware}",
+    'fortinet': "FortiGate {model} v{firmware}",
+    'paloalto': "Palo Alto Networks PAN-OS {firmware} {model}",
+    'ruckus': "Ruckus Wireless {model} Unleashed {firmware}",
+    'juniper': "Juniper Networks, Inc. {model} internet router, kernel JUNOS {firmware}",
+    'extreme': "ExtremeXOS ({model}) version {firmware}",
+}
+
+ENTERPRISES = {
+    'cisco_ios': 9, 'cisco_nxos': 9, 'hp_aruba': 11, 'fortinet': 12356,
+    'paloalto': 25461, 'ruckus': 25053, 'juniper': 2636, 'extreme': 1916,
+}
+
+# Traffic swings around each port's mean rate with this period
+TRAFFIC_PERIOD = 300.0
+
+# Change markers (TimeTicks) of the tables that never change in the simulation
+TABLES_LAST_CHANGE = 500
+
+# ifTable key lists only depend on the port count, devices share them
+_if_keys: Dict[Tuple[Oid, Tuple[int, ...], int], List[Oid]] = {}
+
+
+def _oid(text: str) -> Oid:
+    return tuple(int(x) for x in text.split("."))
+
+
+def _table_keys(entry: Oid, columns: Tuple[int, ...], indexes: List[Oid]) -> List[Oid]:
+    return [entry + (column,) + index for column in columns for index in indexes]
+
+
+def _shared_if_keys(entry: Oid, columns: Tuple[int, ...], ports: int) -> List[Oid]:
+    key = (entry, columns, ports)
+    if key not in _if_keys:
+        _if_keys[key] = _table_keys(entry, columns, [(n,) for n in range(1, ports + 1)])
+    return _if_keys[key]
+
+
+def _fraction(*parts) -> float:
+    """Stable pseudo-random number in [0, 1) for the given names"""
+    return zlib.crc32(":".join(str(p) for p in parts).encode()) / 2 ** 32
+
+
+class _Traffic:
+    """Octet counter of one port direction, mean rate plus a slow sine swing"""
+    __slots__ = ("rate", "swing", "phase", "offset")
+    
+    def __init__(self, speed_mbps: int, utilization: float, phase: float, offset: int):
+        self.rate = speed_mbps * 1e6 / 8 * utilization  # bytes per second
+        self.swing = self.rate * 0.4
+        self.phase = phase
+        self.offset = offset
+    
+    def octets(self, elapsed: float) -> int:
+        # Integral of rate + swing * sin(wt + phase), never decreasing since swing < rate
+        w = 2 * math.pi / TRAFFIC_PERIOD
+        total = self.rate * elapsed + self.swing / w * (math.cos(self.phase) - math.cos(w * elapsed + self.phase))
+        return self.offset + int(total)
+
+
+class DeviceMib:
+    """
+    Read-only MIB view of one simulated device
+    Made of a few sorted key segments (system, ifTable, ifXTable, neighbors,
+    vendor); GETNEXT takes the smallest successor over all segments
+    """
+    
+    def __init__(self, device: SimDevice, topology: SimTopology, started: float):
+        self.device = device
+        self.started = started
+        # Devices have been up for a while when the simulation starts
+        self.booted = started - 86400 * (1 + 30 * _fraction(device.hostname, "uptime"))
+        self._segments: List[Tuple[List[Oid], Callable[[Oid], Optional[Value]]]] = []
+        self._build_system()
+        self._build_interfaces()
+        self._build_neighbors(topology)
+        self._build_vendor()
+    
+    # -- construction --
+    
+    def _add(self, keys: List[Oid], resolve: Callable[[Oid], Optional[Value]]):
+        if keys:
+            self._segments.append((keys, resolve))
+    
+    def _build_system(self):
+        device = self.device
+        descr = SYS_DESCRS[device.vendor].format(model=device.model, firmware=device.firmware_version)
+        object_id = (1, 3, 6, 1, 4, 1, ENTERPRISES[device.vendor], 1, zlib.crc32(device.model.encode()) % 5000)
+        location = f"Site {device.site + 1}" + (f", floor {device.floor}" if device.floor else "")
+        scalars: Dict[Oid, Any] = {
+            _oid(SYS_DESCR): (TAG_OCTET_STRING, descr),
+            _oid(SYS_OBJECT_ID): (TAG_OID, object_id),
+            _oid(SYS_UPTIME): lambda: (TAG_TIMETICKS, self.uptime_ticks()),
+            _oid(SYS_NAME): (TAG_OCTET_STRING, device.hostname),
+            SYS_LOCATION: (TAG_OCTET_STRING, location),
+            IF_NUMBER: (TAG_INTEGER, len(device.ports)),
+            _oid(IF_TABLE_LAST_CHANGE): (TAG_TIMETICKS, TABLES_LAST_CHANGE),
+            _oid(LLDP_STATS_REM_LAST_CHANGE): (TAG_TIMETICKS, TABLES_LAST_CHANGE),
+        }
+        if "cisco" in device.vendor:
+            scalars[_oid(CDP_GLOBAL_RUN)] = (TAG_INTEGER, 1)
+        self._scalars = scalars
+        self._add(sorted(scalars), self._resolve_scalar)
+    
+    def _build_interfaces(self):
+        device = self.device
+        self._traffic: List[Tuple[_Traffic, _Traffic]] = []
+        for port in device.ports:
+            if port.link is not None:
+                utilization = 0.05 + 0.5 * _fraction(device.hostname, port.if_index)
+            else:
+                utilization = 0.02 * _fraction(device.hostname, port.if_index)
+            self._traffic.append(tuple(
+                _Traffic(
+                    port.speed_mbps,
+                    utilization * (0.6 + 0.8 * _fraction(device.hostname, port.if_index, direction)),
+                    2 * math.pi * _fraction(device.hostname, port.if_index, direction, "phase"),
+                    int(2 ** 40 * _fraction(device.hostname, port.if_index, direction, "offset"))
+                )
+                for direction in ("in", "out")
+            ))
+        self._add(_shared_if_keys(IF_ENTRY, IF_COLUMNS, len(device.ports)), self._resolve_if)
+        self._add(_shared_if_keys(IF_X_ENTRY, IF_X_COLUMNS, len(device.ports)), self._resolve_if_x)
+    
+    def _build_neighbors(self, topology: SimTopology):
+        device = self.device
+        rows: Dict[Oid, Value] = {}
+        for port, remote, remote_port in topology.neighbors(device):
+            # lldpRemTable index: timeMark.lldpRemLocalPortNum.lldpRemIndex
+            index = (0, port.if_index, 1)
+            for column, value in (
+                (4, (TAG_INTEGER, 4)),  # chassisIdSubtype macAddress
+                (5, (TAG_OCTET_STRING, remote.chassis_id)),
+                (6, (TAG_INTEGER, 5)),  # portIdSubtype interfaceName
+                (7, (TAG_OCTET_STRING, remote_port.name)),
+                (9, (TAG_OCTET_STRING, remote.hostname)),
+            ):
+                rows[LLDP_REM_ENTRY + (column,) + index] = value
+            # lldpRemManAddrTable index adds addrSubtype (1 = IPv4), length and the address
+            address = tuple(int(x) for x in remote.ip_address.split("."))
+            rows[LLDP_MAN_ADDR_COLUMN + index + (1, 4) + address] = (TAG_INTEGER, 2)
+            
+            # Cisco devices only learn other Cisco devices over CDP
+            if "cisco" in device.vendor and "cisco" in remote.vendor:
+                index = (port.if_index, 1)
+                for column, value in (
+                    (4, (TAG_OCTET_STRING, bytes(address))),
+                    (6, (TAG_OCTET_STRING, remote.hostname)),
+                    (7, (TAG_OCTET_STRING, remote_port.name)),
+                    (8, (TAG_OCTET_STRING, f"cisco {remote.model}")),
+                ):
+                    rows[CDP_CACHE_ENTRY + (column,) + index] = value
+        self._neighbors = rows
+        self._add(sorted(rows), rows.get)
+    
+    def _build_vendor(self):
+        device = self.device
+        cpu = 5 + 60 * _fraction(device.hostname, "cpu")
+        memory = 20 + 60 * _fraction(device.hostname, "memory")
+        memory_total = 2 ** 31
+        values: Dict[Oid, Callable[[], Value]] = {}
+        for name, oid in VENDOR_OIDS.get(device.vendor, {}).items():
+            # Scalars end in .0, table columns get a single row
+            key = _oid(oid) if oid.endswith(".0") else _oid(oid) + (1,)
+            if name.startswith("cpu"):
+                values[key] = lambda: (TAG_GAUGE32, self._wobble(cpu, "cpu"))
+            elif name == "memory":
+                values[key] = lambda: (TAG_GAUGE32, self._wobble(memory, "memory"))
+            elif name == "memory_used":
+                values[key] = lambda: (TAG_GAUGE32, int(memory_total * self._wobble(memory, "memory") / 100))
+            elif name == "memory_free":
+                values[key] = lambda: (
+                    TAG_GAUGE32, memory_total - int(memory_total * self._wobble(memory, "memory") / 100)
+                )
+            elif name == "memory_size":
+                values[key] = lambda: (TAG_GAUGE32, memory_total)
+        self._vendor = values
+        self._add(sorted(values), lambda key: values[key]())
+    
+    # -- values --
+    
+    def elapsed(self) -> float:
+        return time.time() - self.started
+    
+    def uptime_ticks(self) -> int:
+        return int((time.time() - self.booted) * 100) % 2 ** 32
+    
+    def _wobble(self, base: float, name: str) -> int:
+        phase = 2 * math.pi * _fraction(self.device.hostname, name, "phase")
+        return max(0, min(100, int(base + 10 * math.sin(2 * math.pi * self.elapsed() / TRAFFIC_PERIOD + phase))))
+    
+    def _resolve_scalar(self, key: Oid) -> Value:
+        value = self._scalars[key]
+        return value() if callable(value) else value
+    
+    def _resolve_if(self, key: Oid) -> Value:
+        column, index = key[-2], key[-1]
+        port = self.device.ports[index - 1]
+        if column == 1:
+            return TAG_INTEGER, index
+        if column == 2:
+            return TAG_OCTET_STRING, port.name
+        if column == 3:
+            return TAG_INTEGER, 6  # ethernetCsmacd
+        if column == 5:
+            return TAG_GAUGE32, min(port.speed_mbps * 1000000, 2 ** 32 - 1)
+        if column == 7:
+            return TAG_INTEGER, 1
+        if column == 8:
+            return TAG_INTEGER, 1 if port.link is not None else 2
+        direction = 0 if column == 10 else 1
+        return TAG_COUNTER32, self._traffic[index - 1][direction].octets(self.elapsed()) % 2 ** 32
+    
+    def _resolve_if_x(self, key: Oid) -> Value:
+        column, index = key[-2], key[-1]
+        port = self.device.ports[index - 1]
+        if column == 1:
+            return TAG_OCTET_STRING, port.name
+        if column == 15:
+            return TAG_GAUGE32, port.speed_mbps
+        if column == 18:
+            return TAG_OCTET_STRING, ""
+        direction = 0 if column == 6 else 1
+        return TAG_COUNTER64, self._traffic[index - 1][direction].octets(self.elapsed()) % 2 ** 64
+    
+    # -- lookups --
+    
+    def get(self, oid: Oid) -> Optional[Value]:
+        """Value of an exact OID, None if the device does not have it"""
+        for keys, resolve in self._segments:
+            i = bisect.bisect_left(keys, oid)
+            if i < len(keys) and keys[i] == oid:
+                return resolve(oid)
+        return None
+    
+    def next(self, oid: Oid, skip_counter64: bool = False) -> Optional[Tuple[Oid, Value]]:
+        """First (oid, value) after oid, None at the end of the MIB"""
+        while True:
+            best = None
+            for keys, resolve in self._segments:
+                i = bisect.bisect_right(keys, oid)
+                if i < len(keys) and (best is None or keys[i] < best[0]):
+                    best = (keys[i], resolve)
+            if best is None:
+                return None
+            value = best[1](best[0])
+            # SNMPv1 has no Counter64, agents skip those objects
+            if skip_counter64 and value[0] == TAG_COUNTER64:
+                oid = best[0]
+                continue
+            return best[0], value
@@ -0,0 +1,278 @@
+"""
+Simulated Topology - The demo network hierarchy as plain data
+Core -> distribution -> access -> AP, with firewalls and routers on the core,
+repeated per site; seed_demo.py stores it in the database and the simulator
+serves it over SNMP, so both sides agree on hostnames, addresses and ports
+"""
+import random
+import zlib
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+# Device models by vendor
+DEVICE_MODELS = {
+    'cisco_ios': ['WS-C3850-48P', 'WS-C2960X-48FPS', 'C9300-48P', 'ISR4331', 'WS-C3650-24PS'],
+    'cisco_nxos': ['N9K-C93180YC-EX', 'N5K-C5672UP', 'N9K-C9336C-FX2'],
+    'hp_aruba': ['2930F-48G', '6300M-48G', '2540-24G', 'JL354A', 'JL322A'],
+    'fortinet': ['FG-100F', 'FG-200F', 'FG-60F', 'FG-400F'],
+    'paloalto': ['PA-3260', 'PA-5250', 'PA-820', 'PA-220'],
+    'ruckus': ['R750', 'R650', 'R550', 'T350', 'H550'],
+    'juniper': ['EX4300-48P', 'EX2300-24P', 'MX204', 'SRX340'],
+    'extreme': ['X465-48P', 'X440-G2-24p', 'X690-48x-2q'],
+}
+
+FIRMWARE_VERSIONS = {
+    'cisco_ios': ['15.2(7)E7', '16.12.8', '17.3.5a', '16.9.8'],
+    'cisco_nxos': ['10.2(5)', '9.3(9)', '10.1(2)'],
+    'hp_aruba': ['WC.16.11.0012', 'YC.16.10.0012', 'KB.16.09.0010'],
+    'fortinet': ['7.0.12', '6.4.14', '7.2.5'],
+    'paloalto': ['10.2.4-h4', '11.0.1', '10.1.9-h3'],
+    'ruckus': ['6.1.2.0.3001', '5.2.2.0.2056'],
+    'juniper': ['21.4R3.14', '22.2R2.17', '20.4R3-S6'],
+    'extreme': ['32.5.1', '31.7.2', '32.1.1'],
+}
+
+# Interface name by vendor, formatted with the 1-based port number
+PORT_NAMES = {
+    'cisco_ios': "GigabitEthernet1/0/{n}",
+    'cisco_nxos': "Ethernet1/{n}",
+    'hp_aruba': "1/1/{n}",
+    'fortinet': "port{n}",
+    'paloalto': "ethernet1/{n}",
+    'ruckus': "eth{m}",
+    'juniper': "ge-0/0/{m}",
+    'extreme': "{n}",
+}
+
+# Ports per device and speed of ports without a link, by device type
+PORT_COUNTS = {"core": 48, "distribution": 48, "access": 48, "ap": 2, "firewall": 16, "router": 8}
+PORT_SPEEDS = {"core": 10000, "distribution": 10000}
+
+# Third octet of each layer's management addresses
+LAYER_OCTETS = {"core": 1, "distribution": 2, "ap": 50, "firewall": 100, "router": 200}
+
+# Layer order, every device's parent comes from an earlier layer
+DEVICE_TYPES = ["core", "distribution", "access", "ap", "firewall", "router"]
+
+FLOORS = 3
+ACCESS_PER_FLOOR = 14
+
+
+@dataclass
+class SimPort:
+    """One interface of a simulated device"""
+    if_index: int
+    name: str
+    speed_mbps: int
+    link: Optional["SimLink"] = None
+
+
+@dataclass
+class SimDevice:
+    """One device of the generated hierarchy"""
+    hostname: str
+    ip_address: str
+    vendor: str
+    model: str
+    firmware_version: str
+    device_type: str
+    site: int
+    parent: Optional[str] = None
+    floor: Optional[int] = None
+    ports: List[SimPort] = field(default_factory=list)
+    
+    @property
+    def chassis_id(self) -> bytes:
+        """Locally administered MAC derived from the hostname"""
+        return b"\x02\x00" + zlib.crc32(self.hostname.encode()).to_bytes(4, "big")
+    
+    def free_port(self) -> SimPort:
+        for port in self.ports:
+            if port.link is None:
+                return port
+        raise ValueError(f"{self.hostname} has no free port")
+
+
+@dataclass
+class SimLink:
+    """Cable(s) between two devices, (port on a, port on b) per cable"""
+    device_a: str
+    device_b: str
+    port_pairs: List[Tuple[SimPort, SimPort]]
+    speed_mbps: int
+    
+    @property
+    def bandwidth_mbps(self) -> int:
+        return self.speed_mbps * len(self.port_pairs)
+
+
+@dataclass
+class SimTopology:
+    devices: List[SimDevice]
+    links: List[SimLink]
+    
+    def __post_init__(self):
+        self._by_hostname = {device.hostname: device for device in self.devices}
+    
+    def device(self, hostname: str) -> SimDevice:
+        return self._by_hostname[hostname]
+    
+    def of_type(self, device_type: str) -> List[SimDevice]:
+        return [device for device in self.devices if device.device_type == device_type]
+    
+    def neighbors(self, device: SimDevice) -> List[Tuple[SimPort, SimDevice, SimPort]]:
+        """(local port, remote device, remote port) for each cabled port of device"""
+        result = []
+        for port in device.ports:
+            if port.link is None:
+                continue
+            for a, b in port.link.port_pairs:
+                if a is port:
+                    result.append((port, self._by_hostname[port.link.device_b], b))
+                elif b is port:
+                    result.append((port, self._by_hostname[port.link.device_a], a))
+        return result
+
+
+def _address(site: int, octet: int, host: int, loopback: bool) -> str:
+    if loopback:
+        # 127.0.0.0/8 is all local on Linux, every device gets its own alias
+        return f"127.{site + 1}.{octet}.{host}"
+    if site == 0:
+        return f"192.168.{octet}.{host}"
+    return f"10.{site}.{octet}.{host}"
+
+
+def _prefix(site: int) -> str:
+    # Site 0 keeps the original demo names (core-sw-01, dist-sw-03, ...)
+    return f"s{str(site + 1).zfill(2)}-" if site else ""
+
+
+def _connect(parent: SimDevice, child: SimDevice, speed: int, cables: int = 1) -> SimLink:
+    link = SimLink(parent.hostname, child.hostname, [], speed)
+    for _ in range(cables):
+        a, b = parent.free_port(), child.free_port()
+        a.link = b.link = link
+        a.speed_mbps = b.speed_mbps = speed
+        link.port_pairs.append((a, b))
+    return link
+
+
+def generate_hierarchy(sites: int = 1, seed: Optional[int] = None, loopback: bool = False) -> SimTopology:
+    """
+    Build the demo hierarchy, 106 devices per site
+    
+    Args:
+        sites: copies of the site, cores of neighboring sites are linked in a ring
+        seed: makes vendor/model choices reproducible (same seed, same network)
+        loopback: 127.x.y.z addresses the simulator can bind on this host
+    """
+    rng = random.Random(seed)
+    devices: List[SimDevice] = []
+    links: List[SimLink] = []
+    
+    def add(hostname: str, ip: str, vendor: str, device_type: str, site: int, **kwargs) -> SimDevice:
+        device = SimDevice(
+            hostname=hostname,
+            ip_address=ip,
+            vendor=vendor,
+            model=rng.choice(DEVICE_MODELS[vendor]),
+            firmware_version=rng.choice(FIRMWARE_VERSIONS[vendor]),
+            device_type=device_type,
+            site=site,
+            **kwargs
+        )
+        name = PORT_NAMES[vendor]
+        speed = PORT_SPEEDS.get(device_type, 1000)
+        device.ports = [
+            SimPort(n, name.format(n=n, m=n - 1), speed) for n in range(1, PORT_COUNTS[device_type] + 1)
+        ]
+        devices.append(device)
+        return device
+    
+    site_cores = []
+    for site in range(sites):
+        prefix = _prefix(site)
+        
+        # Core switches (2), cabled to each other twice
+        cores = [
+            add(f"{prefix}core-sw-{str(i).zfill(2)}", _address(site, LAYER_OCTETS["core"], i, loopback),
+                "cisco_nxos", "core", site)
+            for i in range(1, 3)
+        ]
+        links.append(_connect(cores[0], cores[1], 10000, cables=2))
+        site_cores.append(cores)
+        
+        # Distribution switches (6), alternating between the cores
+        dists = []
+        for i in range(1, 7):
+            parent = cores[(i - 1) % 2]
+            device = add(
+                f"{prefix}dist-sw-{str(i).zfill(2)}", _address(site, LAYER_OCTETS["distribution"], i, loopback),
+                rng.choice(['cisco_ios', 'hp_aruba', 'juniper']), "distribution", site, parent=parent.hostname
+            )
+            links.append(_connect(parent, device, 10000))
+            dists.append(device)
+        
+        # Access switches, 14 per floor on the floor's pair of distribution switches
+        accesses = []
+        for i in range(1, FLOORS * ACCESS_PER_FLOOR + 1):
+            floor = (i - 1) // ACCESS_PER_FLOOR + 1
+            parent = dists[2 * (floor - 1) + (i - 1) % 2]
+            device = add(
+                f"{prefix}access-sw-{str(i).zfill(2)}", _address(site, 10 + floor, i, loopback),
+                rng.choice(['cisco_ios', 'hp_aruba', 'extreme']), "access", site,
+                parent=parent.hostname, floor=floor
+            )
+            links.append(_connect(parent, device, 1000))
+            accesses.append(device)
+        
+        # Access points (50), round-robin over the access switches
+        for i in range(1, 51):
+            parent = accesses[(i - 1) % len(accesses)]
+            device = add(
+                f"{prefix}ap-{str(i).zfill(2)}", _address(site, LAYER_OCTETS["ap"], i, loopback),
+                "ruckus", "ap", site, parent=parent.hostname
+            )
+            links.append(_connect(parent, device, 1000))
+        
+        # Firewalls (3) and routers (3) on the cores
+        for i in range(1, 4):
+            parent = cores[(i - 1) % 2]
+            device = add(
+                f"{prefix}fw-{str(i).zfill(2)}", _address(site, LAYER_OCTETS["firewall"], i, loopback),
+                rng.choice(['fortinet', 'paloalto']), "firewall", site, parent=parent.hostname
+            )
+            links.append(_connect(parent, device, 10000))
+        for i in range(1, 4):
+            parent = cores[(i - 1) % 2]
+            device = add(
+                f"{prefix}rtr-{str(i).zfill(2)}", _address(site, LAYER_OCTETS["router"], i, loopback),
+                rng.choice(['cisco_ios', 'juniper']), "router", site, parent=parent.hostname
+            )
+            links.append(_connect(parent, device, 10000))
+    
+    # Inter-site ring: core-sw-01 of each site to core-sw-02 of the next
+    if sites > 1:
+        for site in range(sites):
+            links.append(_connect(site_cores[site][0], site_cores[(site + 1) % sites][1], 10000))
+    
+    # Parents before children, layer by layer
+    order = {device_type: i for i, device_type in enumerate(DEVICE_TYPES)}
+    devices.sort(key=lambda device: order[device.device_type])
+    return SimTopology(devices, links)
+
+
+def endpoints(topology: SimTopology, port: int = 1161, base_port: Optional[int] = None) -> Dict[str, Tuple[str, int]]:
+    """
+    Where the simulator serves each device, {hostname: (host, port)}
+    
+    By default every device listens on its own (loopback) address and the shared
+    port; with base_port all devices share 127.0.0.1 on consecutive ports instead,
+    for hosts without 127/8 aliases
+    """
+    if base_port is None:
+        return {device.hostname: (device.ip_address, port) for device in topology.devices}
+    return {
+        device.hostname: ("127.0.0.1", base_port + i) for i, device in enumerate(topology.devices)
+    }
@@ -0,0 +1,85 @@
+"""
+DNS resolver: cached answers and failures, shared lookups and lookup slots
+held by getaddrinfo threads that outlive the caller's timeout
+"""
+import asyncio
+import socket
+import threading
+
+from app.core.dns_resolver import DnsResolver
+
+
+def _answer(ip):
+    return [(socket.AF_INET, socket.SOCK_DGRAM, 17, "", (ip, 0))]
+
+
+def test_answers_and_failures_are_cached(monkeypatch):
+    calls = []
+    
+    def getaddrinfo(name, *args):
+        calls.append(name)
+        if name == "missing":
+            raise socket.gaierror(socket.EAI_NONAME, "Name or service not known")
+        return _answer("10.0.0.1")
+    
+    monkeypatch.setattr(socket, "getaddrinfo", getaddrinfo)
+    
+    async def scenario():
+        resolver = DnsResolver()
+        assert await resolver.resolve("Core-SW.") == "10.0.0.1"
+        assert await resolver.resolve("core-sw") == "10.0.0.1"
+        assert await resolver.resolve("missing") is None
+        assert await resolver.resolve("missing") is None
+        assert await resolver.resolve("192.0.2.7") == "192.0.2.7"
+        assert resolver.cached("missing") == (True, None)
+        return resolver.stats
+    
+    stats = asyncio.run(scenario())
+    assert calls == ["core-sw", "missing"]
+    assert stats == {"hits": 1, "negative_hits": 1, "lookups": 2, "failures": 1}
+
+
+def test_concurrent_callers_share_one_lookup(monkeypatch):
+    calls = []
+    
+    def getaddrinfo(name, *args):
+        calls.append(name)
+        return _answer("10.0.0.2")
+    
+    monkeypatch.setattr(socket, "getaddrinfo", getaddrinfo)
+    
+    async def scenario():
+        resolver = DnsResolver()
+        return await asyncio.gather(*(resolver.resolve("dist-sw") for _ in range(5)))
+    
+    assert asyncio.run(scenario()) == ["10.0.0.2"] * 5
+    assert calls == ["dist-sw"]
+
+
+def test_timed_out_lookup_keeps_its_slot(monkeypatch):
+    unblock = threading.Event()
+    
+    def getaddrinfo(name, *args):
+        if name == "slow":
+            unblock.wait(10)
+        return _answer("10.0.0.3")
+    
+    monkeypatch.setattr(socket, "getaddrinfo", getaddrinfo)
+    
+    async def scenario():
+        resolver = DnsResolver(max_concurrent=1, timeout=0.1)
+        assert await resolver.resolve("slow") is None
+        assert resolver.stats["failures"] == 1
+        
+        # The only slot belongs to the thread still stuck in getaddrinfo
+        fast = asyncio.ensure_future(resolver.resolve("fast"))
+        await asyncio.sleep(0.3)
+        assert not fast.done()
+        
+        unblock.set()
+        assert await fast == "10.0.0.3"
+    
+    try:
+        asyncio.run(scenario())
+    finally:
+        unblock.set()
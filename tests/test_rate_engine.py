@@ -0,0 +1,149 @@
+"""
+Rate engine arithmetic: counter wraps, agent restarts, counter width
+switches and resets caught by the interface speed
+"""
+from collections import namedtuple
+
+import pytest
+
+from app.core.rate_engine import RateEngine, make_counter_sample
+
+Stats = namedtuple("Stats", "port_index port_name speed_mbps in_octets out_octets")
+
+# sysUpTime is in hundredths of a second
+TICKS = 100
+
+
+def _sample(in_octets, out_octets, uptime_s, hc=True, speed=1000, device_id=1, if_index=1, sampled_at=None):
+    return make_counter_sample(
+        device_id,
+        [Stats(if_index, f"Gi0/{if_index}", speed, in_octets, out_octets)],
+        None if uptime_s is None else uptime_s * TICKS,
+        hc_counters=hc,
+        sampled_at=sampled_at if sampled_at is not None else 1_000_000.0 + (uptime_s or 0)
+    )
+
+
+def _rate(engine, *samples):
+    """Rates of the last sample, after feeding all of them"""
+    result = {}
+    for sample in samples:
+        result = engine.update([sample])
+    return result.get(1, {}).get(1)
+
+
+def test_first_sample_gives_no_rate():
+    assert RateEngine().update([_sample(0, 0, 100)]) == {}
+
+
+def test_plain_rate_uses_sysuptime_interval():
+    # 1.25 MB in, 0.25 MB out over 10 s of agent time
+    rate = _rate(RateEngine(), _sample(1000, 2000, 100), _sample(1000 + 1_250_000, 2000 + 250_000, 110))
+    assert rate.in_bps == 1_000_000
+    assert rate.out_bps == 200_000
+    assert rate.speed_mbps == 1000
+    assert rate.port_name == "Gi0/1"
+
+
+def test_wall_clock_when_sysuptime_missing():
+    engine = RateEngine()
+    first = _sample(0, 0, None, sampled_at=500.0)
+    second = _sample(125_000, 0, None, sampled_at=510.0)
+    assert _rate(engine, first, second).in_bps == 100_000
+
+
+def test_32bit_wrap():
+    # 1000 octets before the wrap plus 24 after it
+    before = 2 ** 32 - 1000
+    rate = _rate(RateEngine(), _sample(before, 0, 100, hc=False), _sample(24, 0, 101, hc=False))
+    assert rate.in_bps == 1024 * 8
+
+
+def test_64bit_wrap():
+    before = 2 ** 64 - 500
+    rate = _rate(RateEngine(), _sample(before, before, 100), _sample(500, 1500, 101))
+    assert rate.in_bps == 1000 * 8
+    assert rate.out_bps == 2000 * 8
+
+
+def test_32bit_wrap_not_masked_as_64bit():
+    # The same 32-bit wrap read as a 64-bit counter would be ~2^64 octets, a reset
+    rate = _rate(RateEngine(), _sample(2 ** 32 - 1000, 0, 100, hc=True), _sample(24, 0, 101, hc=True))
+    assert rate is None
+
+
+def test_sysuptime_reset_discards_interval():
+    engine = RateEngine()
+    assert _rate(engine, _sample(10_000_000, 0, 5000), _sample(1000, 0, 30)) is None
+    # The restarted sample is the new baseline
+    assert engine.update([_sample(1000 + 125_000, 0, 31)])[1][1].in_bps == 1_000_000
+
+
+def test_counter_width_switch_discards_interval():
+    engine = RateEngine()
+    assert _rate(engine, _sample(1000, 0, 100, hc=False), _sample(5000, 0, 110, hc=True)) is None
+    assert engine.update([_sample(5000 + 1250, 0, 111, hc=True)])[1][1].in_bps == 10_000
+
+
+def test_counter_reset_over_speed_is_discarded():
+    # A 64-bit counter cleared to zero looks like a wrap of ~2^64 octets, far above 1 Gbps
+    engine = RateEngine()
+    assert _rate(engine, _sample(5_000_000, 0, 100), _sample(100, 0, 110)) is None
+
+
+def test_32bit_wrap_over_speed_is_discarded():
+    # A genuine 32-bit backwards step on a 10 Mbps port can't be a wrap within 1 s
+    engine = RateEngine()
+    assert _rate(engine, _sample(100, 0, 100, hc=False, speed=10), _sample(50, 0, 101, hc=False, speed=10)) is None
+
+
+def test_rate_just_under_speed_tolerance_is_kept():
+    # 1.05 Gbps on a 1 Gbps port is within the 10% tolerance, 1.2 Gbps is not
+    kept = _rate(RateEngine(), _sample(0, 0, 100), _sample(131_250_000, 0, 101))
+    assert kept.in_bps == 1_050_000_000
+    dropped = _rate(RateEngine(), _sample(0, 0, 100), _sample(150_000_000, 0, 101))
+    assert dropped is None
+
+
+def test_unknown_speed_64bit_backwards_is_reset():
+    engine = RateEngine()
+    assert _rate(engine, _sample(5000, 0, 100, speed=0), _sample(10, 0, 101, speed=0)) is None
+
+
+def test_unknown_speed_32bit_backwards_is_wrap():
+    rate = _rate(RateEngine(), _sample(2 ** 32 - 8, 0, 100, hc=False, speed=0), _sample(8, 0, 101, hc=False, speed=0))
+    assert rate.in_bps == 16 * 8
+
+
+def test_batch_of_devices_and_new_interfaces():
+    engine = RateEngine()
+    first = [
+        make_counter_sample(1, [Stats(1, "a", 1000, 0, 0), Stats(2, "b", 1000, 0, 0)], 100 * TICKS, True),
+        make_counter_sample(2, [Stats(7, "c", 100, 0, 0)], 50 * TICKS, False)
+    ]
+    second = [
+        make_counter_sample(
+            1, [Stats(1, "a", 1000, 1250, 0), Stats(2, "b", 1000, 2500, 0), Stats(3, "new", 1000, 9, 9)],
+            101 * TICKS, True
+        ),
+        make_counter_sample(2, [Stats(7, "c", 100, 125, 250)], 51 * TICKS, False)
+    ]
+    engine.update(first)
+    rates = engine.update(second)
+    assert {device: sorted(ports) for device, ports in rates.items()} == {1: [1, 2], 2: [7]}
+    assert rates[1][2].in_bps == 20_000
+    assert (rates[2][7].in_bps, rates[2][7].out_bps) == (1000, 2000)
+
+
+def test_forget_drops_baseline():
+    engine = RateEngine()
+    engine.update([_sample(0, 0, 100)])
+    engine.forget(1)
+    assert engine.update([_sample(1250, 0, 101)]) == {}
+
+
+@pytest.mark.parametrize("hc", [True, False])
+def test_zero_interval_gives_no_rate(hc):
+    engine = RateEngine()
+    sample = _sample(0, 0, 100, hc=hc)
+    assert _rate(engine, sample, _sample(100, 0, 100, hc=hc, sampled_at=sample.sampled_at)) is None
@@ -0,0 +1,60 @@
+"""
+RTT estimator: RFC 6298 timeouts, the 1 s floor that keeps loop lag from
+firing timeouts on fast devices, backoff and unresponsive devices
+"""
+import pytest
+
+from app.core.rtt_estimator import RttEstimator, RttTracker
+
+
+def test_initial_timeout_before_any_sample():
+    assert RttEstimator().timeout() == 1.0
+
+
+def test_fast_device_is_held_at_the_floor():
+    estimator = RttEstimator()
+    for _ in range(20):
+        estimator.observe(0.002)
+    assert estimator.srtt < 0.01
+    assert estimator.timeout() == 1.0
+
+
+def test_slow_device_gets_srtt_plus_four_rttvar():
+    estimator = RttEstimator()
+    estimator.observe(0.5)
+    # srtt 0.5 + 4 * rttvar 0.25
+    assert estimator.rto == pytest.approx(1.5)
+    assert estimator.timeout() == 1.5
+
+
+def test_backoff_doubles_up_to_the_cap():
+    estimator = RttEstimator(max_timeout=5.0)
+    estimator.observe(0.002)
+    estimator.on_timeout()
+    assert estimator.timeout() == 2.0
+    estimator.on_timeout()
+    estimator.on_timeout()
+    assert estimator.timeout() == 5.0
+    estimator.observe(0.002)
+    assert estimator.timeout() == 1.0
+
+
+def test_unresponsive_device_gets_one_short_probe():
+    estimator = RttEstimator()
+    for _ in range(4):
+        estimator.on_timeout()
+    estimator.on_failure()
+    assert estimator.is_unresponsive
+    assert estimator.retries(2) == 0
+    assert estimator.timeout() == 2.0
+    estimator.on_response()
+    assert estimator.retries(2) == 2
+
+
+def test_tracker_seeds_only_unknown_devices():
+    tracker = RttTracker(min_timeout=0.5)
+    tracker.seed("10.0.0.1", 300.0, None)
+    tracker.seed("10.0.0.1", 900.0, 10.0)
+    estimator = tracker.get("10.0.0.1")
+    assert (estimator.srtt, estimator.rttvar, estimator.min_timeout) == (0.3, 0.15, 0.5)
+    assert tracker.get("10.0.0.2").srtt is None
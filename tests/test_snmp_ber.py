@@ -0,0 +1,137 @@
+"""
+SNMP BER codec round trips: responses encoded by the agent side decode to
+the same values on the collector side, and requests the other way round
+"""
+import pytest
+
+from app.core.snmp_ber import (
+    BerError, decode_oid, decode_request, decode_response, encode_integer, encode_oid,
+    encode_request, encode_response, encode_var_bind, is_exception_value, peek_request_id,
+    END_OF_MIB_VIEW, NO_SUCH_INSTANCE, NO_SUCH_OBJECT,
+    PDU_GET, PDU_GET_BULK, PDU_GET_NEXT, VERSION_V1, VERSION_V2C,
+    TAG_COUNTER32, TAG_COUNTER64, TAG_END_OF_MIB_VIEW, TAG_GAUGE32, TAG_INTEGER,
+    TAG_IP_ADDRESS, TAG_NO_SUCH_INSTANCE, TAG_NO_SUCH_OBJECT, TAG_NULL, TAG_OCTET_STRING,
+    TAG_OID, TAG_TIMETICKS
+)
+
+IF_HC_IN_OCTETS = (1, 3, 6, 1, 2, 1, 31, 1, 1, 1, 6, 1)
+
+
+def _round_trip(tag, value, oid=IF_HC_IN_OCTETS):
+    message = encode_response(VERSION_V2C, "public", 42, [encode_var_bind(oid, tag, value)])
+    request_id, error_status, error_index, var_binds = decode_response(message)
+    assert (request_id, error_status, error_index) == (42, 0, 0)
+    [(decoded_oid, decoded)] = var_binds
+    assert decoded_oid == oid
+    return decoded
+
+
+@pytest.mark.parametrize("value", [0, 1, 2 ** 31, 2 ** 32, 2 ** 63, 2 ** 64 - 1])
+def test_counter64_round_trip(value):
+    assert _round_trip(TAG_COUNTER64, value) == value
+
+
+@pytest.mark.parametrize("tag", [TAG_COUNTER32, TAG_GAUGE32, TAG_TIMETICKS])
+@pytest.mark.parametrize("value", [0, 127, 128, 255, 2 ** 31, 2 ** 32 - 1])
+def test_unsigned32_round_trip(tag, value):
+    # High-bit values need a leading zero octet to stay positive
+    assert _round_trip(tag, value) == value
+
+
+@pytest.mark.parametrize("value", [0, 1, -1, 127, 128, -128, -129, 255, -256, 2 ** 31 - 1, -2 ** 31])
+def test_integer_round_trip(value):
+    assert _round_trip(TAG_INTEGER, value) == value
+
+
+def test_negative_integer_is_minimal_twos_complement():
+    assert encode_integer(-1) == b"\x02\x01\xff"
+    assert encode_integer(-128) == b"\x02\x01\x80"
+    assert encode_integer(-129) == b"\x02\x02\xff\x7f"
+    assert encode_integer(128) == b"\x02\x02\x00\x80"
+
+
+@pytest.mark.parametrize("oid", [
+    (1, 3, 6, 1, 4, 1, 9, 9, 23, 1, 2, 1, 1, 6),
+    (1, 3, 6, 1, 4, 1, 128, 255, 16383, 16384, 2 ** 32 - 1),
+    (1, 3, 6, 1, 2, 1, 2, 2, 1, 2, 100000),
+])
+def test_oid_round_trip_with_multibyte_arcs(oid):
+    assert decode_oid(encode_oid(oid)[2:]) == oid
+    assert _round_trip(TAG_OID, oid) == oid
+    assert _round_trip(TAG_NULL, None, oid=oid) is None
+
+
+def test_oid_arc_encoding():
+    # 128 -> 0x81 0x00, 16384 -> 0x81 0x80 0x00
+    assert encode_oid((1, 3, 128)) == b"\x06\x03\x2b\x81\x00"
+    assert encode_oid((1, 3, 16384)) == b"\x06\x04\x2b\x81\x80\x00"
+    with pytest.raises(BerError):
+        encode_oid((1,))
+
+
+def test_octet_string_and_ip_address():
+    assert bytes(_round_trip(TAG_OCTET_STRING, b"\x00\x1b\x54\xff")) == b"\x00\x1b\x54\xff"
+    assert str(_round_trip(TAG_OCTET_STRING, "core-sw-01")) == "core-sw-01"
+    assert bytes(_round_trip(TAG_IP_ADDRESS, bytes([192, 168, 1, 1]))) == bytes([192, 168, 1, 1])
+
+
+@pytest.mark.parametrize("length", [127, 128, 255, 256, 1400, 70000])
+def test_long_form_lengths(length):
+    value = bytes(range(256)) * (length // 256) + bytes(length % 256)
+    assert bytes(_round_trip(TAG_OCTET_STRING, value)) == value
+
+
+def test_long_form_message_with_many_var_binds():
+    var_binds = [
+        encode_var_bind(IF_HC_IN_OCTETS[:-1] + (i,), TAG_COUNTER64, 2 ** 40 + i) for i in range(1, 101)
+    ]
+    message = encode_response(VERSION_V2C, "public", 7, var_binds)
+    assert message[1] & 0x80
+    _, _, _, decoded = decode_response(message)
+    assert [value for _, value in decoded] == [2 ** 40 + i for i in range(1, 101)]
+
+
+@pytest.mark.parametrize("tag, expected", [
+    (TAG_NO_SUCH_OBJECT, NO_SUCH_OBJECT),
+    (TAG_NO_SUCH_INSTANCE, NO_SUCH_INSTANCE),
+    (TAG_END_OF_MIB_VIEW, END_OF_MIB_VIEW),
+])
+def test_exception_values(tag, expected):
+    value = _round_trip(tag, None)
+    assert value is expected
+    assert is_exception_value(value)
+    assert not value
+    assert value.prettyPrint() == expected.name
+
+
+def test_error_status_round_trip():
+    message = encode_response(VERSION_V1, "public", 9, [encode_var_bind(IF_HC_IN_OCTETS, TAG_NULL)], 2, 1)
+    request_id, error_status, error_index, _ = decode_response(message)
+    assert (request_id, error_status, error_index) == (9, 2, 1)
+
+
+@pytest.mark.parametrize("pdu_type, non_repeaters, max_repetitions", [
+    (PDU_GET, 0, 0),
+    (PDU_GET_NEXT, 0, 0),
+    (PDU_GET_BULK, 1, 25),
+])
+def test_request_round_trip(pdu_type, non_repeaters, max_repetitions):
+    oids = [(1, 3, 6, 1, 2, 1, 1, 3, 0), IF_HC_IN_OCTETS]
+    message = encode_request(VERSION_V2C, "s3cret", pdu_type, 2 ** 31 - 1, oids, non_repeaters, max_repetitions)
+    assert decode_request(message) == (
+        VERSION_V2C, "s3cret", pdu_type, 2 ** 31 - 1, non_repeaters, max_repetitions, oids
+    )
+    assert peek_request_id(message) == 2 ** 31 - 1
+
+
+def test_negative_request_id():
+    message = encode_request(VERSION_V2C, "public", PDU_GET, -5, [IF_HC_IN_OCTETS])
+    assert decode_request(message)[3] == -5
+
+
+def test_truncated_messages_raise():
+    message = encode_response(VERSION_V2C, "public", 1, [encode_var_bind(IF_HC_IN_OCTETS, TAG_COUNTER64, 5)])
+    for cut in (1, 2, len(message) // 2, len(message) - 1):
+        with pytest.raises(BerError):
+            decode_response(message[:cut])
+    assert peek_request_id(message[:5]) is None
@@ -0,0 +1,209 @@
+"""
+Time series store: chunks and rollups written when the open chunk closes,
+head.log replay after a restart, rollups of the not yet rolled up tail and
+retention
+"""
+import os
+import time
+
+import numpy as np
+import pytest
+
+from app.core.timeseries import TimeSeriesStore, parse_retention
+
+# Hour aligned, so the first hour of samples fills six whole chunks
+BASE = 1_700_000_000 - 1_700_000_000 % 3600
+STEP = 30
+
+
+def _store(path, **kwargs) -> TimeSeriesStore:
+    return TimeSeriesStore(str(path), step=STEP, writable=True, **kwargs)
+
+
+def _fill(store, start, end, name="if.1.1.in_bps"):
+    """One sample per step in [start, end), the value is its slot number since BASE"""
+    for timestamp in range(start, end, STEP):
+        store.write({name: float((timestamp - BASE) // STEP)}, timestamp)
+
+
+def _chunks(path, resolution):
+    return sorted(int(entry[:-4]) - BASE for entry in os.listdir(os.path.join(path, resolution)))
+
+
+def test_closed_hour_at_every_resolution(tmp_path):
+    store = _store(tmp_path)
+    _fill(store, BASE, BASE + 3600)
+    # The first sample of the next hour closes the last chunk and builds the 1h rollup
+    store.write({"if.1.1.in_bps": -1.0}, BASE + 3600)
+    
+    assert _chunks(tmp_path, "raw") == list(range(0, 3600, 600))
+    assert _chunks(tmp_path, "1h") == [0]
+    
+    raw = store.query(["if.1.1.in_bps"], BASE, BASE + 3600, "raw")
+    assert raw.step == STEP
+    assert raw.timestamps[0] == BASE
+    np.testing.assert_array_equal(raw.values["if.1.1.in_bps"], np.arange(120))
+    
+    minute = store.query(["if.1.1.in_bps"], BASE, BASE + 3600, "1m")
+    np.testing.assert_array_equal(minute.values["if.1.1.in_bps"], np.arange(60) * 2 + 0.5)
+    np.testing.assert_array_equal(minute.maxima["if.1.1.in_bps"], np.arange(60) * 2 + 1)
+    
+    five = store.query(["if.1.1.in_bps"], BASE, BASE + 3600, "5m")
+    np.testing.assert_array_equal(five.values["if.1.1.in_bps"], np.arange(12) * 10 + 4.5)
+    np.testing.assert_array_equal(five.maxima["if.1.1.in_bps"], np.arange(12) * 10 + 9)
+    
+    hour = store.query(["if.1.1.in_bps"], BASE, BASE + 3600, "1h")
+    assert hour.timestamps.tolist() == [BASE]
+    assert hour.values["if.1.1.in_bps"].tolist() == [59.5]
+    assert hour.maxima["if.1.1.in_bps"].tolist() == [119]
+
+
+def test_series_added_later_and_gaps_are_nan(tmp_path):
+    store = _store(tmp_path)
+    store.write({"a": 1.0}, BASE)
+    store.write({"a": 2.0, "b": 5.0}, BASE + 60)
+    store.write({"a": 0.0}, BASE + 600)
+    
+    raw = store.query(["a", "b", "unknown"], BASE, BASE + 90, "raw")
+    assert sorted(raw.values) == ["a", "b"]
+    np.testing.assert_array_equal(raw.values["a"], [1, np.nan, 2])
+    np.testing.assert_array_equal(raw.values["b"], [np.nan, np.nan, 5])
+    assert store.series_names("b") == ["b"]
+
+
+def test_write_many_spans_chunks(tmp_path):
+    # A batch straddling a chunk boundary closes the open chunk on the way, in time order
+    store = _store(tmp_path)
+    store.write_many([
+        ({"a": 3.0}, BASE + 600),
+        ({"a": 1.0, "b": 2.0}, BASE + 570),
+        ({}, BASE + 30),
+        ({"b": 4.0}, BASE + 630)
+    ])
+    assert _chunks(tmp_path, "raw") == [0]
+    
+    raw = store.query(["a", "b"], BASE + 570, BASE + 660, "raw")
+    np.testing.assert_array_equal(raw.values["a"], [1, 3, np.nan])
+    np.testing.assert_array_equal(raw.values["b"], [2, np.nan, 4])
+
+
+def test_samples_older_than_open_chunk_are_dropped(tmp_path):
+    store = _store(tmp_path)
+    store.write({"a": 1.0}, BASE + 600)
+    store.write({"a": 9.0}, BASE)
+    assert _chunks(tmp_path, "raw") == []
+    assert np.isnan(store.query(["a"], BASE, BASE + 600, "raw").values["a"]).all()
+
+
+def test_head_log_replay_after_restart(tmp_path):
+    store = _store(tmp_path)
+    _fill(store, BASE, BASE + 300)
+    store.close()
+    
+    # A reader sees the open chunk straight from head.log
+    reader = TimeSeriesStore(str(tmp_path), step=STEP)
+    np.testing.assert_array_equal(
+        reader.query(["if.1.1.in_bps"], BASE, BASE + 300, "raw").values["if.1.1.in_bps"], np.arange(10)
+    )
+    
+    restarted = _store(tmp_path)
+    raw = restarted.query(["if.1.1.in_bps"], BASE, BASE + 600, "raw").values["if.1.1.in_bps"]
+    np.testing.assert_array_equal(raw[:10], np.arange(10))
+    assert np.isnan(raw[10:]).all()
+    
+    # Recovered samples end up in the chunk written when it closes
+    _fill(restarted, BASE + 300, BASE + 600)
+    restarted.write({"if.1.1.in_bps": 0.0}, BASE + 600)
+    assert os.path.getsize(os.path.join(tmp_path, "head.log")) > 0
+    chunk = np.load(os.path.join(tmp_path, "raw", f"{BASE}.npy"))
+    np.testing.assert_array_equal(chunk[0], np.arange(20))
+
+
+def test_torn_log_record_is_ignored(tmp_path):
+    store = _store(tmp_path)
+    _fill(store, BASE, BASE + 90)
+    with open(os.path.join(tmp_path, "head.log"), "ab") as f:
+        f.write(b"\x01\x02\x03")
+    
+    restarted = _store(tmp_path)
+    np.testing.assert_array_equal(
+        restarted.query(["if.1.1.in_bps"], BASE, BASE + 90, "raw").values["if.1.1.in_bps"], [0, 1, 2]
+    )
+
+
+def test_rollup_of_open_chunk(tmp_path):
+    # Nothing closed yet, the 1m and 5m answers come from the open chunk
+    store = _store(tmp_path)
+    _fill(store, BASE, BASE + 450)
+    
+    minute = store.query(["if.1.1.in_bps"], BASE, BASE + 600, "1m")
+    np.testing.assert_array_equal(minute.values["if.1.1.in_bps"][:8], [0.5, 2.5, 4.5, 6.5, 8.5, 10.5, 12.5, 14])
+    np.testing.assert_array_equal(minute.maxima["if.1.1.in_bps"][:8], [1, 3, 5, 7, 9, 11, 13, 14])
+    assert np.isnan(minute.values["if.1.1.in_bps"][8:]).all()
+    
+    five = store.query(["if.1.1.in_bps"], BASE, BASE + 600, "5m")
+    np.testing.assert_array_equal(five.values["if.1.1.in_bps"], [4.5, 12])
+    np.testing.assert_array_equal(five.maxima["if.1.1.in_bps"], [9, 14])
+
+
+def test_rollup_of_tail_after_closed_chunks(tmp_path):
+    # Two closed chunks and part of the open one: the 5m files cover the start,
+    # the open chunk is rolled up from raw and the unfinished hour from all of it
+    store = _store(tmp_path)
+    _fill(store, BASE, BASE + 1500)
+    assert _chunks(tmp_path, "5m") == [0, 600]
+    assert _chunks(tmp_path, "1h") == []
+    
+    five = store.query(["if.1.1.in_bps"], BASE, BASE + 1800, "5m")
+    np.testing.assert_array_equal(five.values["if.1.1.in_bps"], [4.5, 14.5, 24.5, 34.5, 44.5, np.nan])
+    
+    hour = store.query(["if.1.1.in_bps"], BASE, BASE + 3600, "1h")
+    assert hour.values["if.1.1.in_bps"].tolist() == [24.5]
+    assert hour.maxima["if.1.1.in_bps"].tolist() == [49]
+
+
+def test_retention_deletes_old_chunks(tmp_path):
+    store = _store(tmp_path, retention={"raw": 1200, "1m": 2400})
+    _fill(store, BASE, BASE + 3000)
+    
+    # Closing the chunk ending at BASE + 2400 keeps raw chunks ending after BASE + 1200
+    assert _chunks(tmp_path, "raw") == [1200, 1800]
+    assert _chunks(tmp_path, "1m") == [0, 600, 1200, 1800]
+    assert _chunks(tmp_path, "5m") == [0, 600, 1200, 1800]
+    
+    _fill(store, BASE + 3000, BASE + 3600)
+    store.write({"if.1.1.in_bps": 0.0}, BASE + 3600)
+    assert _chunks(tmp_path, "raw") == [2400, 3000]
+    assert _chunks(tmp_path, "1m") == [1200, 1800, 2400, 3000]
+    assert _chunks(tmp_path, "1h") == [0]
+    
+    raw = store.query(["if.1.1.in_bps"], BASE, BASE + 3600, "raw").values["if.1.1.in_bps"]
+    assert np.isnan(raw[:80]).all()
+    np.testing.assert_array_equal(raw[80:], np.arange(80, 120))
+
+
+def test_pick_resolution_gives_at_least_the_requested_points(tmp_path):
+    store = TimeSeriesStore(str(tmp_path), step=STEP, retention=parse_retention("raw=2,1m=14,5m=90,1h=730"))
+    now = time.time()
+    day = 86400
+    # 30 days: 1h gives 720 samples, 5m 8640
+    assert store.pick_resolution(now - 30 * day, now, 1000) == "5m"
+    assert store.pick_resolution(now - 30 * day, now, 500) == "1h"
+    # 24 hours: 5m gives 288 samples, 1m 1440
+    assert store.pick_resolution(now - day, now, 1000) == "1m"
+    # Nothing gives 1000 samples over an hour, raw is the finest
+    assert store.pick_resolution(now - 3600, now, 1000) == "raw"
+    # Past the retention of 5m and finer only 1h is left
+    assert store.pick_resolution(now - 120 * day, now, 1000) == "1h"
+
+
+def test_parse_retention():
+    assert parse_retention("raw=2, 1m=14,5m=0.5,1h=730") == {
+        "raw": 2 * 86400, "1m": 14 * 86400, "5m": 43200, "1h": 730 * 86400
+    }
+    assert parse_retention("raw=x,10m=5,junk") == {}
+
+
+def test_step_must_divide_a_minute(tmp_path):
+    with pytest.raises(ValueError):
+        TimeSeriesStore(str(tmp_path), step=45)
@@ -0,0 +1,252 @@
+"""
+Work queue tests, always against in-process fakeredis (with Lua through
+lupa) and also against a real Redis server when there is one: TEST_REDIS_URL
+when set, otherwise redis-server from PATH on a free port
+"""
+import asyncio
+import os
+import shutil
+import socket
+import subprocess
+import time
+import uuid
+
+import fakeredis
+import pytest
+import redis
+
+from app.core.work_queue import RedisWorkQueue
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture(scope="module", params=["fakeredis", "redis-server"])
+def server(request):
+    """A fakeredis server, or the URL of a real one"""
+    if request.param == "fakeredis":
+        yield fakeredis.FakeServer()
+        return
+    
+    url = os.environ.get("TEST_REDIS_URL")
+    if url:
+        yield url
+        return
+    
+    binary = shutil.which("redis-server")
+    if binary is None:
+        pytest.skip("needs TEST_REDIS_URL or redis-server on PATH")
+    port = _free_port()
+    process = subprocess.Popen(
+        [binary, "--port", str(port), "--bind", "127.0.0.1", "--save", "", "--appendonly", "no"],
+        stdout=subprocess.DEVNULL
+    )
+    url = f"redis://127.0.0.1:{port}/0"
+    try:
+        client = redis.Redis.from_url(url)
+        for _ in range(50):
+            try:
+                client.ping()
+                break
+            except redis.ConnectionError:
+                time.sleep(0.1)
+        else:
+            pytest.fail("redis-server did not start")
+        client.close()
+        yield url
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+@pytest.fixture
+def prefix(server):
+    """Key prefix of one test, deleted afterwards"""
+    prefix = f"test:{uuid.uuid4().hex[:8]}:"
+    yield prefix
+    if isinstance(server, str):
+        client = redis.Redis.from_url(server)
+    else:
+        client = fakeredis.FakeRedis(server=server)
+    keys = list(client.scan_iter(f"{prefix}*"))
+    if keys:
+        client.delete(*keys)
+    client.close()
+
+
+def _queue(server, prefix: str, name: str, lease_ttl: int = 60) -> RedisWorkQueue:
+    if isinstance(server, str):
+        return RedisWorkQueue(server, collector_id=name, lease_ttl=lease_ttl, prefix=prefix)
+    client = fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+    return RedisWorkQueue("redis://fakeredis", collector_id=name, lease_ttl=lease_ttl, prefix=prefix, client=client)
+
+
+async def _due_now(queue: RedisWorkQueue, device_ids):
+    """Add devices and make all of them due immediately"""
+    await queue.sync_devices(device_ids, interval=60)
+    await queue.redis.zadd(queue._key("due"), {str(device_id): time.time() - 1 for device_id in device_ids})
+
+
+def test_claim_leases_each_device_once(server, prefix):
+    async def scenario():
+        first = _queue(server, prefix, "first")
+        second = _queue(server, prefix, "second")
+        try:
+            await _due_now(first, [1, 2, 3])
+
+            claimed = await first.claim(2)
+            rest = await second.claim(10)
+            assert len(claimed) == 2
+            assert len(rest) == 1
+            assert {device_id for device_id, _ in claimed + rest} == {1, 2, 3}
+            assert await first.claim(10) == []
+
+            stats = await first.stats()
+            assert stats["leased"] == 3
+            assert stats["held"] == 2
+            assert stats["due"] == 0
+        finally:
+            await first.close()
+            await second.close()
+
+    asyncio.run(scenario())
+
+
+def test_expired_lease_is_reaped_and_reclaimed(server, prefix):
+    async def scenario():
+        dead = _queue(server, prefix, "dead", lease_ttl=1)
+        alive = _queue(server, prefix, "alive", lease_ttl=1)
+        try:
+            await _due_now(dead, [7])
+            assert [device_id for device_id, _ in await dead.claim(1)] == [7]
+
+            # Still leased, nothing to reap or claim
+            assert await alive.reap() == 0
+            assert await alive.claim(1) == []
+
+            await asyncio.sleep(1.2)
+            assert await alive.reap() == 1
+            assert [device_id for device_id, _ in await alive.claim(1)] == [7]
+
+            # The old owner lost the lease and must not reschedule the device
+            assert await dead.complete(7, interval=60) is False
+            assert await alive.redis.hget(alive._key("owners"), "7") == "alive"
+        finally:
+            await dead.close()
+            await alive.close()
+
+    asyncio.run(scenario())
+
+
+def test_complete_releases_and_reschedules(server, prefix):
+    async def scenario():
+        queue = _queue(server, prefix, "worker")
+        try:
+            await _due_now(queue, [4])
+            [(device_id, due)] = await queue.claim(1)
+
+            assert await queue.complete(device_id, interval=120) is True
+            stats = await queue.stats()
+            assert stats["leased"] == 0
+            assert stats["held"] == 0
+            assert await queue.redis.hget(queue._key("owners"), "4") is None
+
+            # Overdue devices are rescheduled one interval from now
+            next_due = await queue.redis.zscore(queue._key("due"), "4")
+            assert next_due == pytest.approx(time.time() + 120, abs=5)
+            assert await queue.claim(1) == []
+            assert await queue.next_due_in() == pytest.approx(120, abs=5)
+        finally:
+            await queue.close()
+
+    asyncio.run(scenario())
+
+
+def test_complete_drops_removed_devices(server, prefix):
+    async def scenario():
+        queue = _queue(server, prefix, "worker")
+        try:
+            await _due_now(queue, [5, 6])
+            await queue.claim(2)
+            assert await queue.sync_devices([6], interval=60) == (0, 1)
+
+            assert await queue.complete(5, interval=60) is True
+            assert await queue.redis.zscore(queue._key("due"), "5") is None
+        finally:
+            await queue.close()
+
+    asyncio.run(scenario())
+
+
+def test_heartbeat_keeps_leases_alive(server, prefix):
+    async def scenario():
+        worker = _queue(server, prefix, "worker", lease_ttl=1)
+        other = _queue(server, prefix, "other", lease_ttl=1)
+        try:
+            await _due_now(worker, [8, 9])
+            await worker.claim(2)
+
+            # Outlive the lease twice over while heartbeating
+            for _ in range(4):
+                await asyncio.sleep(0.5)
+                assert await worker.heartbeat() == 2
+            assert await other.reap() == 0
+            assert await other.claim(2) == []
+
+            collectors = await worker.redis.zrange(worker._key("collectors"), 0, -1)
+            assert "worker" in collectors
+            assert (await worker.stats())["collectors"] >= 1
+        finally:
+            await worker.close()
+            await other.close()
+
+    asyncio.run(scenario())
+
+
+def test_release_hands_leases_back(server, prefix):
+    async def scenario():
+        worker = _queue(server, prefix, "worker", lease_ttl=1)
+        other = _queue(server, prefix, "other", lease_ttl=1)
+        try:
+            await _due_now(worker, [10, 11])
+            await worker.claim(2)
+
+            assert await worker.release([10, 11]) == 2
+            assert (await worker.stats())["held"] == 0
+            # Released leases are no longer renewed
+            assert await worker.heartbeat() == 0
+            assert sorted(device_id for device_id, _ in await other.claim(2)) == [10, 11]
+        finally:
+            await worker.close()
+            await other.close()
+
+    asyncio.run(scenario())
+
+
+def test_complete_many_in_one_call(server, prefix):
+    async def scenario():
+        worker = _queue(server, prefix, "worker", lease_ttl=1)
+        other = _queue(server, prefix, "other", lease_ttl=1)
+        try:
+            await _due_now(worker, [20, 21, 22])
+            await worker.claim(3)
+            # Device 22's lease expires and moves to another collector
+            await worker.redis.zadd(worker._key("leases"), {"22": time.time() - 1})
+            await other.reap()
+            assert [device_id for device_id, _ in await other.claim(1)] == [22]
+            
+            assert await worker.complete_many([(20, 60), (21, 300), (22, 60)]) == 2
+            assert (await worker.stats())["held"] == 0
+            due = dict(await worker.redis.zrange(worker._key("due"), 0, -1, withscores=True))
+            assert sorted(due) == ["20", "21"]
+            assert due["21"] - due["20"] == pytest.approx(240, abs=5)
+            assert await worker.redis.hget(worker._key("owners"), "22") == "other"
+            assert await worker.complete_many([]) == 0
+        finally:
+            await worker.close()
+            await other.close()
+    
+    asyncio.run(scenario())